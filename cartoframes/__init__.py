@@ -1,13 +1,32 @@
+import sys
+import importlib
+
 from ._version import __version__
-from .utils.utils import check_package
-from .io.carto import read_carto, to_carto, list_tables, has_table, delete_table, rename_table, \
-                      copy_table, create_table_from_query, describe_table, update_privacy_table
+
+# The subpackages and the io functions are imported on first access (PEP 562),
+# so `import cartoframes` doesn't load pandas, geopandas, carto, etc.
+_SUBPACKAGES = ['analysis', 'auth', 'data', 'io', 'utils', 'viz']
+_IO_FUNCTIONS = ['read_carto', 'to_carto', 'list_tables', 'has_table', 'delete_table', 'rename_table',
+                 'copy_table', 'create_table_from_query', 'describe_table', 'update_privacy_table']
+
+
+def __getattr__(name):
+    if name in _IO_FUNCTIONS:
+        from .io import carto
+        return getattr(carto, name)
+    if name in _SUBPACKAGES:
+        return importlib.import_module('.{}'.format(name), __name__)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+def __dir__():
+    return sorted(list(globals()) + _SUBPACKAGES + _IO_FUNCTIONS)
 
 
-# Check installed packages versions
-check_package('carto', '>=1.11.2')
-check_package('pandas', '>=0.25.0')
-check_package('geopandas', '>=0.6.0')
+if sys.version_info < (3, 7):  # pragma: no cover
+    # Module __getattr__ is not supported
+    from .io.carto import read_carto, to_carto, list_tables, has_table, delete_table, rename_table, \
+                          copy_table, create_table_from_query, describe_table, update_privacy_table  # noqa: F401
 
 
 __all__ = [
@@ -9,6 +9,7 @@ from .enrichment.enrichment import Enrichment
 from .catalog.entity import CatalogEntity, CatalogList
 from .catalog.subscriptions import Subscriptions
 from .catalog.subscription_info import SubscriptionInfo
+from .catalog.repository.metadata_cache import MetadataCache, set_metadata_cache
 
 __all__ = [
     'Catalog',
@@ -23,4 +24,6 @@ __all__ = [
     'SubscriptionInfo',
     'CatalogEntity',
     'CatalogList',
+    'MetadataCache',
+    'set_metadata_cache'
 ]
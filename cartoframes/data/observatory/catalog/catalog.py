@@ -1,16 +1,27 @@
-from .entity import is_slug_value
+from concurrent.futures import ThreadPoolExecutor
+
+from .entity import CatalogList, is_slug_value
 from .country import Country
 from .category import Category
 from .provider import Provider
 from .dataset import Dataset
 from .geography import Geography
+from .variable import Variable
 from .subscriptions import Subscriptions
+from .repository.metadata_cache import get_metadata_cache
+from .repository.search_index import get_search_index, clear_search_indexes
 from .repository.constants import (COUNTRY_FILTER, CATEGORY_FILTER, GEOGRAPHY_FILTER, GLOBAL_COUNTRY_FILTER,
                                    PROVIDER_FILTER, PUBLIC_FILTER)
 
 from ....utils.logger import log
 from ....utils.utils import get_credentials
 
+SEARCH_ENTITIES = {
+    'variable': Variable,
+    'dataset': Dataset,
+    'geography': Geography
+}
+
 
 class Catalog:
     """This class represents the Data Observatory metadata
@@ -269,6 +280,100 @@ class Catalog:
         """Remove the current filters from this Catalog instance."""
         self.filters = {}
 
+    def prefetch(self, countries=None, categories=None, variables=True, max_workers=8):
+        """Load the metadata of the datasets and geographies that match the current filters into the
+        catalog cache, so later explorations don't need to request it again.
+
+        Args:
+            countries (list, optional): IDs of the countries to prefetch. By default the current country
+                filter (if any) is used.
+            categories (list, optional): IDs of the categories to prefetch. By default the current category
+                filter (if any) is used.
+            variables (bool, optional): prefetch also the variables of each dataset. Default is True.
+            max_workers (int, optional): maximum number of concurrent requests. Default is 8.
+
+        Returns:
+            :py:class:`CatalogList <cartoframes.data.observatory.entity.CatalogList>` List of the
+            prefetched Dataset instances.
+
+        Raises:
+            CatalogError: if there's a problem when connecting to the catalog.
+
+        Examples:
+            >>> Catalog().prefetch(countries=['usa', 'can'], categories=['demographics'])
+
+        """
+        countries = countries or [self.filters.get(COUNTRY_FILTER)]
+        categories = categories or [self.filters.get(CATEGORY_FILTER)]
+
+        filters_list = []
+        for country in countries:
+            for category in categories:
+                filters = dict(self.filters)
+                filters.update({COUNTRY_FILTER: country, CATEGORY_FILTER: category})
+                filters_list.append({k: v for k, v in filters.items() if v is not None})
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            dataset_lists = list(executor.map(Dataset.get_all, filters_list))
+            list(executor.map(Geography.get_all, filters_list))
+
+            datasets = [dataset for dataset_list in dataset_lists for dataset in dataset_list]
+            if variables:
+                list(executor.map(lambda dataset: dataset.variables, datasets))
+
+        return CatalogList(datasets)
+
+    def search(self, query, entity='variable', limit=10):
+        """Search the variables, datasets or geographies whose name, description, column name, slug or ID
+        match the words of a query, sorted by relevance.
+
+        The search runs offline over a local index of the public catalog metadata already fetched (for example,
+        with :py:meth:`prefetch <cartoframes.data.observatory.Catalog.prefetch>`). The index is updated with
+        the entities fetched since the previous search and persisted next to the catalog cache, if it is persistent.
+        The entities fetched with user credentials, like the subscriptions, are not indexed.
+
+        Args:
+            query (str): words to search.
+            entity (str, optional): type of the entities to search: 'variable' (default), 'dataset' or 'geography'.
+            limit (int, optional): maximum number of results. Default is 10.
+
+        Returns:
+            :py:class:`CatalogList <cartoframes.data.observatory.entity.CatalogList>`
+
+        Raises:
+            ValueError: if the entity is not valid.
+
+        Examples:
+            >>> catalog = Catalog()
+            >>> catalog.prefetch(countries=['usa'], categories=['demographics'])
+            >>> catalog.search('median household income')
+
+        """
+        if entity not in SEARCH_ENTITIES:
+            raise ValueError('Wrong entity "{}". Valid entities are: {}'.format(
+                entity, ', '.join(SEARCH_ENTITIES.keys())))
+
+        index = get_search_index(entity)
+        if len(index) == 0:
+            log.info('The search index is empty. Use the `prefetch` method to load the catalog metadata')
+
+        entity_class = SEARCH_ENTITIES[entity]
+        ids = [document['id'] for document in index.search(query, limit)]
+        if len(ids) == 0:
+            return CatalogList([])
+
+        # The index only keeps the searchable fields, the entities are read from the catalog (or its cache)
+        entities = {item.id: item for item in entity_class.get_list(ids)}
+        return CatalogList([entities[id_] for id_ in ids if id_ in entities])
+
+    @staticmethod
+    def clear_cache():
+        """Remove all the catalog metadata stored in the cache, and the search indexes built from it."""
+        clear_search_indexes()
+        cache = get_metadata_cache()
+        if cache is not None:
+            cache.clear()
+
     def subscriptions(self, credentials=None):
         """Get all the subscriptions in the Catalog. You'll get all the `Dataset` or `Geography` instances you have
         previously subscribed to.
@@ -298,6 +403,23 @@ class Catalog:
         """
         return Dataset.get_datasets_spatial_filtered(filter_dataset)
 
+    def datasets_filter_batch(self, filter_datasets):
+        """Get the datasets in the Catalog filtered by each one of many areas.
+
+        Args:
+            filter_datasets (geopandas.GeoDataFrame, list): a GeoDataFrame with an area per row,
+                or a list of areas as WKT strings or shapely geometries.
+
+        Returns:
+            list of :py:class:`CatalogList <cartoframes.data.observatory.entity.CatalogList>`
+            with the datasets of each area, in the same order.
+
+        Examples:
+            >>> stores_datasets = Catalog().datasets_filter_batch(stores_areas_gdf)
+
+        """
+        return Dataset.get_datasets_spatial_filtered_batch(filter_datasets)
+
     def _global_message(self):
         if self.filters and self.filters.get(COUNTRY_FILTER) != GLOBAL_COUNTRY_FILTER:
             log.info('You can find more entities with the Global country filter. To apply that filter run:'
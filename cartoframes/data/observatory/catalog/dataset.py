@@ -3,7 +3,8 @@ import geopandas as gpd
 
 from shapely import wkt
 
-from .entity import CatalogEntity
+from .entity import CatalogEntity, CatalogList, GEOID_COL, GEOM_COL, _remote_full_table_name, _spatial_filter
+from .mirror import DEFAULT_CHUNKSIZE, get_mirror_path, read_manifest, is_mirror_current, read_mirror, write_mirror
 from .repository.dataset_repo import get_dataset_repo, DATASET_TYPE
 from .repository.geography_repo import get_geography_repo
 from .repository.variable_repo import get_variable_repo
@@ -67,6 +68,7 @@ class Dataset(CatalogEntity):
 
     """
     _entity_repo = get_dataset_repo()
+    _query_placeholder = '$dataset$'
 
     @property
     def variables(self):
@@ -232,8 +234,7 @@ class Dataset(CatalogEntity):
             pandas.DataFrame
 
         """
-        data = self._get_summary_data()
-        return head(self.__class__, data) if data else None
+        return self.get_summary_item('head', lambda: self._build_summary_item(head, self.__class__))
 
     def tail(self):
         """"Returns the last ten rows of the dataset"
@@ -244,8 +245,7 @@ class Dataset(CatalogEntity):
             pandas.DataFrame
 
         """
-        data = self._get_summary_data()
-        return tail(self.__class__, data) if data else None
+        return self.get_summary_item('tail', lambda: self._build_summary_item(tail, self.__class__))
 
     def counts(self):
         """Returns a summary of different counts over the actual dataset data.
@@ -263,8 +263,7 @@ class Dataset(CatalogEntity):
                 # null_cells_percent:   percent of cells with null value in the dataset
 
         """
-        data = self._get_summary_data()
-        return counts(data) if data else None
+        return self.get_summary_item('counts', lambda: self._build_summary_item(counts))
 
     def fields_by_type(self):
         """Returns a summary of the number of columns per data type in the dataset.
@@ -281,8 +280,7 @@ class Dataset(CatalogEntity):
                 # integer      number of columns with type integer in the dataset
 
         """
-        data = self._get_summary_data()
-        return fields_by_type(data) if data else None
+        return self.get_summary_item('fields_by_type', lambda: self._build_summary_item(fields_by_type))
 
     def geom_coverage(self):
         """Shows a map to visualize the geographical coverage of the dataset.
@@ -293,13 +291,16 @@ class Dataset(CatalogEntity):
         """
         return geom_coverage(self.geography)
 
-    def describe(self, autoformat=True):
+    def describe(self, autoformat=True, variables=None):
         """Shows a summary of the actual stats of the variables (columns) of the dataset.
         Some of the stats provided per variable are: avg, max, min, sum, range,
         stdev, q1, q3, median and interquartile_range
 
         Args:
             autoformat (boolean): set automatic format for values. Default is True.
+            variables (list, optional): list of :obj:`Variable` instances, IDs or slugs to describe.
+                The variables given by ID or slug are fetched from the catalog, one request per variable.
+                By default all the variables of the dataset are described.
 
         Returns:
             pandas.DataFrame
@@ -325,7 +326,19 @@ class Dataset(CatalogEntity):
         if autoformat:
             pd.set_option(FLOAT_FORMAT, lambda x: '%.3f' % x)
 
-        return dataset_describe(self.variables)
+        if variables is None:
+            variables = self.variables
+        else:
+            variable_ids = [variable for variable in variables if isinstance(variable, str)]
+            variables_by_id = {}
+            for variable in (get_variable_repo().get_by_id_list(variable_ids) if variable_ids else []):
+                variables_by_id[variable.id] = variable
+                variables_by_id[variable.slug] = variable
+            variables = [variables_by_id.get(variable) if isinstance(variable, str) else variable
+                         for variable in variables]
+            variables = [variable for variable in variables if variable is not None]
+
+        return dataset_describe(variables)
 
     @classmethod
     @check_do_enabled
@@ -359,13 +372,42 @@ class Dataset(CatalogEntity):
         user_gdf = cls._get_user_geodataframe(filter_dataset)
 
         # TODO: check if the dataframe has a geometry column if not exception
-        # Saving memory
-        user_gdf = user_gdf[[user_gdf.geometry.name]]
-        catalog_geographies_gdf = get_geography_repo().get_geographies_gdf()
-        matched_geographies_ids = cls._join_geographies_geodataframes(catalog_geographies_gdf, user_gdf)
+        matched_geographies_ids = set()
+        for geographies_ids in get_geography_repo().get_geographies_ids_by_geometry(user_gdf.geometry):
+            matched_geographies_ids.update(geographies_ids)
 
         # Get Dataset objects
-        return get_dataset_repo().get_all({'geography_id': list(matched_geographies_ids)})
+        return get_dataset_repo().get_all({'geography_id': sorted(matched_geographies_ids)})
+
+    @classmethod
+    def get_datasets_spatial_filtered_batch(cls, filter_datasets):
+        """Get the datasets whose geographies intersect each one of the areas.
+
+        Args:
+            filter_datasets (geopandas.GeoDataFrame, list): a GeoDataFrame with an area per row,
+                or a list of areas as WKT strings or shapely geometries.
+
+        Returns:
+            list of :py:class:`CatalogList <cartoframes.data.observatory.entity.CatalogList>`
+            with the datasets of each area, in the same order.
+
+        """
+        geometries = cls._get_user_geometries(filter_datasets)
+        geographies_ids_list = get_geography_repo().get_geographies_ids_by_geometry(geometries)
+
+        # Get Dataset objects with a single request
+        matched_geographies_ids = sorted(set(_id for ids in geographies_ids_list for _id in ids))
+        datasets = get_dataset_repo().get_all({'geography_id': matched_geographies_ids}) \
+            if matched_geographies_ids else []
+
+        datasets_by_geography = {}
+        for dataset in datasets:
+            datasets_by_geography.setdefault(dataset.geography, []).append(dataset)
+
+        return [
+            CatalogList([dataset for _id in geographies_ids for dataset in datasets_by_geography.get(_id, [])])
+            for geographies_ids in geographies_ids_list
+        ]
 
     @staticmethod
     def _get_user_geodataframe(filter_dataset):
@@ -380,12 +422,15 @@ class Dataset(CatalogEntity):
             return gpd.GeoDataFrame(df)
 
     @staticmethod
-    def _join_geographies_geodataframes(geographies_gdf1, geographies_gdf2):
-        join_gdf = gpd.sjoin(geographies_gdf1, geographies_gdf2, how='inner', op='intersects')
-        return join_gdf['id'].unique()
+    def _get_user_geometries(filter_datasets):
+        if isinstance(filter_datasets, gpd.GeoDataFrame):
+            return list(filter_datasets.geometry)
+
+        return [wkt.loads(area) if isinstance(area, str) else area for area in filter_datasets]
 
     @check_do_enabled
-    def to_csv(self, file_path, credentials=None, limit=None, order_by=None, sql_query=None, add_geom=None):
+    def to_csv(self, file_path, credentials=None, limit=None, order_by=None, sql_query=None, add_geom=None,
+               compression=None, resume=False, columns=None, where=None, bbox=None, geometry=None):
         """Download dataset data as a local csv file. You need Data Observatory enabled in your CARTO
         account, please contact us at support@carto.com for more information.
 
@@ -406,11 +451,24 @@ class Dataset(CatalogEntity):
                 `$dataset$` is mandatory and it will be replaced by the actual dataset before running the query.
                 You can build any arbitrary query.
             add_geom (boolean, optional): to include the geography when using the `sql_query` argument. Default to True.
+            compression (str, optional): compression of the file: ``'gzip'``, ``'bz2'`` or ``'xz'``.
+                Default is uncompressed.
+            resume (boolean, optional): continue an interrupted download, appending to the existing file
+                the data after its current size. Use it with the same arguments (and an `order_by` to get the
+                rows in the same order) as the interrupted download. Default is False.
+            columns (list, optional): names of the columns to download. They are validated against the
+                dataset variables, and the `geoid` column is always included. Default is all the columns.
+            where (str, optional): SQL condition to filter the rows to download, e.g. ``"total_pop > 1000"``.
+            bbox (tuple, optional): bounding box ``(minx, miny, maxx, maxy)`` in WGS84 to download only the
+                rows whose geometry intersects it.
+            geometry (str or shapely.geometry, optional): geometry (or WKT) in WGS84 to download only the
+                rows whose geometry intersects it. The `columns`, `where`, `bbox` and `geometry` arguments
+                build the query to run, so they can not be combined with `sql_query`.
 
         Raises:
             DOError: if you have not a valid license for the dataset being downloaded,
                 DO is not enabled or there is an issue downloading the data.
-            ValueError: if the credentials argument is not valid.
+            ValueError: if the credentials, the compression or the columns arguments are not valid.
 
         """
         _credentials = get_credentials(credentials)
@@ -418,10 +476,15 @@ class Dataset(CatalogEntity):
         if not self.is_subscribed(_credentials, DATASET_TYPE):
             raise DOError(DATASET_SUBSCRIPTION_ERROR)
 
-        self._download(_credentials, file_path, limit=limit, order_by=order_by, sql_query=sql_query, add_geom=add_geom)
+        sql_query = self._get_sql_query(sql_query, columns, where, bbox, geometry, _credentials)
+
+        self._download(_credentials, file_path, limit=limit, order_by=order_by, sql_query=sql_query, add_geom=add_geom,
+                       compression=compression, resume=resume)
 
     @check_do_enabled
-    def to_dataframe(self, credentials=None, limit=None, order_by=None, sql_query=None, add_geom=None):
+    def to_dataframe(self, credentials=None, limit=None, order_by=None, sql_query=None, add_geom=None,
+                     chunksize=None, columns=None, where=None, bbox=None, geometry=None, mirror_path=None,
+                     use_mirror=False):
         """Download dataset data as a geopandas.GeoDataFrame. You need Data Observatory enabled in your CARTO
         account, please contact us at support@carto.com for more information.
 
@@ -441,23 +504,137 @@ class Dataset(CatalogEntity):
                 `$dataset$` is mandatory and it will be replaced by the actual dataset before running the query.
                 You can build any arbitrary query.
             add_geom (boolean, optional): to include the geography when using the `sql_query` argument. Default to True.
+            chunksize (int, optional): return an iterator of geopandas.GeoDataFrame with this number of rows,
+                so the data is parsed while it is downloaded. Default is to return a single GeoDataFrame.
+            columns (list, optional): names of the columns to download. They are validated against the
+                dataset variables, and the `geoid` column is always included. Default is all the columns.
+            where (str, optional): SQL condition to filter the rows to download, e.g. ``"total_pop > 1000"``.
+            bbox (tuple, optional): bounding box ``(minx, miny, maxx, maxy)`` in WGS84 to download only the
+                rows whose geometry intersects it.
+            geometry (str or shapely.geometry, optional): geometry (or WKT) in WGS84 to download only the
+                rows whose geometry intersects it. The `columns`, `where`, `bbox` and `geometry` arguments
+                build the query to run, so they can not be combined with `sql_query`.
+            mirror_path (str, optional): directory of the local mirrors created with :py:meth:`sync`.
+                If it is set and the dataset has an up to date mirror, the data is read from it instead of
+                downloading it (unless `sql_query`, `where`, `order_by` or `chunksize` are used).
+            use_mirror (boolean, optional): read the data from the up to date mirror in the user cache
+                directory (or `mirror_path`), if any. Default is False.
+
+        Returns:
+            geopandas.GeoDataFrame, or an iterator of geopandas.GeoDataFrame if `chunksize` is set.
+
+        Raises:
+            DOError: if you have not a valid license for the dataset being downloaded,
+                DO is not enabled or there is an issue downloading the data.
+            ValueError: if the credentials or the columns arguments are not valid.
+
+        Examples:
+            >>> dataset.to_dataframe(columns=['total_pop'], bbox=(-74.03, 40.69, -73.93, 40.80))
+
+        """
+        _credentials = get_credentials(credentials)
 
+        if not self.is_subscribed(_credentials, DATASET_TYPE):
+            raise DOError(DATASET_SUBSCRIPTION_ERROR)
+
+        use_mirror = use_mirror or mirror_path is not None
+        if use_mirror and sql_query is None and where is None and order_by is None and chunksize is None:
+            mirror = get_mirror_path(self.id, mirror_path)
+            manifest = read_manifest(mirror)
+            if is_mirror_current(manifest, self):
+                log.debug('Reading dataset {} from the local mirror {}'.format(self.id, mirror))
+                return self._read_mirror(mirror, manifest, limit, add_geom, columns, bbox, geometry)
+
+        sql_query = self._get_sql_query(sql_query, columns, where, bbox, geometry, _credentials)
+
+        return self._download(_credentials, limit=limit, order_by=order_by, sql_query=sql_query, add_geom=add_geom,
+                              chunksize=chunksize)
+
+    @check_do_enabled
+    def sync(self, path=None, credentials=None, force=False, chunksize=DEFAULT_CHUNKSIZE):
+        """Create or update a local mirror of the dataset data as partitioned GeoParquet files.
+        It requires the `pyarrow` package.
+
+        The rows are sorted and partitioned by the quadkey of their geometry. The mirror records
+        the dataset `version` and `update_frequency`, and it is downloaded again only when they change.
+        Then :py:meth:`to_dataframe` reads the data from the mirror instead of downloading it
+        when `use_mirror` or `mirror_path` are set.
+
+        Args:
+            path (str, optional): directory of the local mirrors. By default the user cache directory is used.
+            credentials (:py:class:`Credentials <cartoframes.auth.Credentials>`, optional):
+                credentials of CARTO user account. If not provided,
+                a default credentials (if set with :py:meth:`set_default_credentials
+                <cartoframes.auth.set_default_credentials>`) will be used.
+            force (boolean, optional): download the data even if the mirror is up to date. Default is False.
+            chunksize (int, optional): number of rows downloaded and written in each file. Default is 100000.
 
         Returns:
-            geopandas.GeoDataFrame
+            str: path of the dataset mirror.
 
         Raises:
             DOError: if you have not a valid license for the dataset being downloaded,
                 DO is not enabled or there is an issue downloading the data.
             ValueError: if the credentials argument is not valid.
 
+        Examples:
+            >>> dataset.sync()
+            >>> gdf = dataset.to_dataframe(columns=['total_pop'], use_mirror=True)
+
         """
+        mirror = get_mirror_path(self.id, path)
+
+        if not force and is_mirror_current(read_manifest(mirror), self):
+            log.info('The dataset {} is up to date: {}'.format(self.id, mirror))
+            return mirror
+
         _credentials = get_credentials(credentials)
 
         if not self.is_subscribed(_credentials, DATASET_TYPE):
             raise DOError(DATASET_SUBSCRIPTION_ERROR)
 
-        return self._download(_credentials, limit=limit, order_by=order_by, sql_query=sql_query, add_geom=add_geom)
+        chunks = self._download(_credentials, chunksize=chunksize)
+        manifest = write_mirror(self, chunks, mirror, GEOM_COL)
+
+        log.info('Success! Dataset synced: {} ({} rows)'.format(mirror, manifest['rows']))
+
+        return mirror
+
+    def _read_mirror(self, mirror, manifest, limit, add_geom, columns, bbox, geometry):
+        spatial_filter = _spatial_filter(bbox, geometry)
+        if columns is not None:
+            columns = [GEOID_COL] + [column for column in columns if column != GEOID_COL]
+
+        gdf = read_mirror(mirror, manifest, GEOM_COL, columns=columns,
+                          spatial_filter=wkt.loads(spatial_filter) if spatial_filter else None,
+                          limit=limit)
+
+        if add_geom is False and GEOM_COL in gdf:
+            gdf = pd.DataFrame(gdf.drop(columns=[GEOM_COL]))
+
+        return gdf
+
+    def _get_query_columns(self, columns):
+        if columns is None:
+            return None
+
+        valid_columns = [variable.column_name for variable in self.variables]
+        invalid_columns = [column for column in columns if column != GEOID_COL and column not in valid_columns]
+        if invalid_columns:
+            raise ValueError('The following columns are not valid for the dataset {}: {}'.format(
+                self.id, ', '.join(invalid_columns)))
+
+        return [GEOID_COL] + [column for column in columns if column != GEOID_COL]
+
+    def _get_spatial_condition(self, spatial_filter, credentials=None):
+        # The dataset rows have no geometry: they are filtered on the server with a semi-join against
+        # the geography table, which for premium geographies is the view in the user project
+        do_credentials = credentials._get_do_credentials()
+        geography_table = _remote_full_table_name(
+            self.geography, do_credentials.bq_project, do_credentials.bq_dataset, do_credentials.bq_public_project)
+        return '{geoid} IN (SELECT {geoid} FROM `{table}` WHERE {condition})'.format(
+            geoid=GEOID_COL, table=geography_table,
+            condition=super(Dataset, self)._get_spatial_condition(spatial_filter))
 
     @check_do_enabled
     def subscribe(self, credentials=None):
@@ -523,6 +700,10 @@ class Dataset(CatalogEntity):
         return subscription_info.SubscriptionInfo(
             subscription_info.fetch_subscription_info(self.id, DATASET_TYPE, _credentials))
 
+    def _build_summary_item(self, build, *args):
+        data = self._get_summary_data()
+        return build(*args, data) if data else None
+
     def _get_summary_data(self):
         data = self.data.get('summary_json')
 
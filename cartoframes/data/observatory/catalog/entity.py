@@ -1,7 +1,14 @@
+import os
+import bz2
+import gzip
+import lzma
+import numpy as np
 import pandas as pd
 
 from abc import ABC
 from geopandas import GeoDataFrame
+from shapely import wkt
+from shapely.geometry import box
 
 from carto.do_dataset import DODataset
 from . import subscriptions
@@ -22,6 +29,16 @@ _GEOGRAPHY_READ_MSG = '''To load it as a GeoDataFrame you can do:
 '''
 
 GEOM_COL = 'geom'
+GEOID_COL = 'geoid'
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # bytes
+# The download query is sent in the URL, so the WKT of the spatial filters is limited
+MAX_SPATIAL_FILTER_LENGTH = 4000  # characters
+COMPRESSION_OPENERS = {
+    'gzip': gzip.open,
+    'bz2': bz2.open,
+    'xz': lzma.open
+}
 
 
 class CatalogEntity(ABC):
@@ -38,10 +55,13 @@ class CatalogEntity(ABC):
     """
     id_field = 'id'
     _entity_repo = None
+    # Placeholder of the entity table in the download queries, replaced by the DO API
+    _query_placeholder = None
     export_excluded_fields = ['summary_json', 'geom_coverage']
 
     def __init__(self, data):
         self.data = data
+        self._summary_cache = {}
 
     @property
     def id(self):
@@ -104,6 +124,14 @@ class CatalogEntity(ABC):
         """Converts the entity instance to a Python dict."""
         return {key: value for key, value in self.data.items() if key not in self.export_excluded_fields}
 
+    def get_summary_item(self, key, build):
+        """Returns a copy of an item built from the entity summary. The item is built once per entity,
+        with the `build` function, and kept by `key`."""
+        if key not in self._summary_cache:
+            self._summary_cache[key] = build()
+        item = self._summary_cache[key]
+        return item.copy() if item is not None else None
+
     def is_subscribed(self, credentials, entity_type):
         """Check if the entity is subscribed"""
         return self.is_public_data or self.id in subscriptions.get_subscription_ids(credentials, entity_type)
@@ -127,7 +155,15 @@ class CatalogEntity(ABC):
 
         return self.id
 
-    def _download(self, credentials, file_path=None, limit=None, order_by=None, sql_query=None, add_geom=None):
+    def _download(self, credentials, file_path=None, limit=None, order_by=None, sql_query=None, add_geom=None,
+                  compression=None, resume=False, chunksize=None):
+        if compression is not None and compression not in COMPRESSION_OPENERS:
+            raise ValueError('Wrong compression "{}". Valid values are: {}'.format(
+                compression, ', '.join(COMPRESSION_OPENERS.keys())))
+
+        if compression is not None and resume:
+            raise ValueError('Compressed downloads can not be resumed.')
+
         auth_client = credentials.get_api_key_auth_client()
 
         is_geography = None
@@ -140,65 +176,260 @@ class CatalogEntity(ABC):
                                                                                 add_geom=add_geom,
                                                                                 is_geography=is_geography)
         if file_path:
-            with open(file_path, 'w') as csvfile:
-                for row in rows:
-                    csvfile.write(row.decode('utf-8'))
+            _write_stream(rows, file_path, compression, resume)
 
             log.info('Data saved: {}'.format(file_path))
             if self.__class__.__name__ == 'Dataset':
                 log.info(_DATASET_READ_MSG.format(file_path))
             elif self.__class__.__name__ == 'Geography':
                 log.info(_GEOGRAPHY_READ_MSG.format(file_path))
+        elif chunksize:
+            return _read_chunks(rows, chunksize)
         else:
-            dataframe = pd.read_csv(rows)
-            gdf = GeoDataFrame(dataframe)
+            return _to_geodataframe(pd.read_csv(rows))
+
+    def _get_sql_query(self, sql_query=None, columns=None, where=None, bbox=None, geometry=None, credentials=None):
+        if columns is None and where is None and bbox is None and geometry is None:
+            return sql_query
+
+        if sql_query is not None:
+            raise ValueError('The sql_query argument can not be combined with columns, where, bbox or geometry.')
+
+        conditions = [where] if where else []
+
+        spatial_filter = _spatial_filter(bbox, geometry)
+        if spatial_filter is not None:
+            if len(spatial_filter) > MAX_SPATIAL_FILTER_LENGTH:
+                raise ValueError('The geometry is too complex to filter the download ({} characters in WKT, '
+                                 'the maximum is {}). Use a bbox or a simplified geometry.'.format(
+                                     len(spatial_filter), MAX_SPATIAL_FILTER_LENGTH))
+            conditions.append(self._get_spatial_condition(spatial_filter, credentials))
 
-            if GEOM_COL in gdf:
-                set_geometry(gdf, GEOM_COL, inplace=True)
+        return _build_sql_query(self._query_placeholder, self._get_query_columns(columns), conditions)
 
-            return gdf
+    def _get_query_columns(self, columns):
+        return columns
+
+    def _get_spatial_condition(self, spatial_filter, credentials=None):
+        return "ST_INTERSECTS({geom}, ST_GEOGFROMTEXT('{wkt}'))".format(geom=GEOM_COL, wkt=spatial_filter)
 
     def _get_remote_full_table_name(self, user_project, user_dataset, public_project):
-        project, dataset, table = self.id.split('.')
-
-        if project != public_project:
-            return '{project}.{dataset}.{table_name}'.format(
-                project=user_project,
-                dataset=user_dataset,
-                table_name='view_{}_{}'.format(dataset, table)
-            )
-        else:
-            return self.id
+        return _remote_full_table_name(self.id, user_project, user_dataset, public_project)
+
+
+def _remote_full_table_name(entity_id, user_project, user_dataset, public_project):
+    project, dataset, table = entity_id.split('.')
+
+    if project != public_project:
+        return '{project}.{dataset}.{table_name}'.format(
+            project=user_project,
+            dataset=user_dataset,
+            table_name='view_{}_{}'.format(dataset, table)
+        )
+    else:
+        return entity_id
+
+
+def _spatial_filter(bbox=None, geometry=None):
+    if bbox is not None and geometry is not None:
+        raise ValueError('The bbox and geometry arguments can not be used together.')
+
+    if bbox is not None:
+        return box(*bbox).wkt
+
+    if geometry is not None:
+        return (wkt.loads(geometry) if isinstance(geometry, str) else geometry).wkt
+
+
+def _build_sql_query(placeholder, columns=None, conditions=None):
+    query = 'SELECT {columns} FROM {table}'.format(
+        columns=', '.join(columns) if columns else '*',
+        table=placeholder)
+
+    if conditions:
+        query += ' WHERE {}'.format(' AND '.join('({})'.format(condition) for condition in conditions))
+
+    return query
+
+
+def _write_stream(stream, file_path, compression=None, resume=False):
+    # When resuming, the bytes already in the file are skipped from the new stream
+    offset = os.path.getsize(file_path) if resume and os.path.exists(file_path) else 0
+
+    if compression is not None:
+        csvfile = COMPRESSION_OPENERS[compression](file_path, 'wb')
+    else:
+        csvfile = open(file_path, 'ab' if offset else 'wb', buffering=DOWNLOAD_CHUNK_SIZE)
+
+    with csvfile:
+        for chunk in iter(lambda: stream.read(DOWNLOAD_CHUNK_SIZE), b''):
+            if offset:
+                if len(chunk) <= offset:
+                    offset -= len(chunk)
+                    continue
+                chunk = chunk[offset:]
+                offset = 0
+            csvfile.write(chunk)
+
+
+def _read_chunks(stream, chunksize):
+    for dataframe in pd.read_csv(stream, chunksize=chunksize):
+        yield _to_geodataframe(dataframe)
+
+
+def _to_geodataframe(dataframe):
+    gdf = GeoDataFrame(dataframe)
+
+    if GEOM_COL in gdf:
+        set_geometry(gdf, GEOM_COL, inplace=True)
+
+    return gdf
 
 
 def is_slug_value(id_value):
     return len(id_value.split('.')) == 1
 
 
+def _resets_table(method):
+    # Wrap the list methods that modify it, so the table of its fields is built again
+    def fn(self, *args, **kwargs):
+        self._table = None
+        return method(self, *args, **kwargs)
+    return fn
+
+
 class CatalogList(list):
     """This is an internal class that represents a list of entities in the catalog of the same type.
 
     It contains:
       - Instance methods to convert to get an instance of the entity by ID and to convert the list to a pandas
         DataFrame for further filtering and exploration.
+      - Instance methods to filter, search and sort the entities by their fields. They run over a table
+        with the fields of all the entities, built only once per list.
 
     As a rule of thumb you don't directly use this class, it is documented for inheritance purposes.
 
     """
+    search_fields = ['id', 'slug', 'name', 'description']
+
     def __init__(self, data):
         super(CatalogList, self).__init__(data)
+        self._table = None
+
+    append = _resets_table(list.append)
+    extend = _resets_table(list.extend)
+    insert = _resets_table(list.insert)
+    remove = _resets_table(list.remove)
+    pop = _resets_table(list.pop)
+    clear = _resets_table(list.clear)
+    sort = _resets_table(list.sort)
+    reverse = _resets_table(list.reverse)
+    __setitem__ = _resets_table(list.__setitem__)
+    __delitem__ = _resets_table(list.__delitem__)
+    __iadd__ = _resets_table(list.__iadd__)
+    __imul__ = _resets_table(list.__imul__)
 
     def to_dataframe(self):
         """Converts a list to a pandas DataFrame.
 
+        The DataFrame is built once and shared by the calls on the same list (until the list is modified),
+        so it must not be modified: use `to_dataframe().copy()` to get a DataFrame to modify.
+
         Examples:
             >>> catalog = Catalog()
             >>> catalog.categories.to_dataframe()
 
         """
-        df = pd.DataFrame([item.data for item in self])
+        return self._get_table()
+
+    def filter(self, **conditions):
+        """Filter the entities by the value of their fields.
+
+        Args:
+            conditions: field names and the condition of each one: a value (equal to), a list of
+                values (any of them) or a function that receives the field column (`pandas.Series`)
+                and returns a boolean mask.
+
+        Returns:
+            :py:class:`CatalogList <cartoframes.data.observatory.entity.CatalogList>` with the matching entities.
+
+        Raises:
+            ValueError: if a field doesn't exist.
+
+        Examples:
+            >>> datasets.filter(provider_id='usa_acs', is_public_data=True)
+            >>> datasets.filter(temporal_aggregation=['yearly', '5yrs'])
+            >>> datasets.filter(version=lambda version: version >= '2018')
+
+        """
+        table = self._get_table()
+        mask = np.ones(len(self), dtype=bool)
+
+        for field, condition in conditions.items():
+            if field not in table:
+                raise ValueError('The field "{}" does not exist. Valid fields are: {}'.format(
+                    field, ', '.join(table.columns)))
+
+            column = table[field]
+            if callable(condition):
+                mask &= np.asarray(condition(column), dtype=bool)
+            elif isinstance(condition, (list, tuple, set)):
+                mask &= column.isin(condition).values
+            else:
+                mask &= (column == condition).values
+
+        return self._take(np.flatnonzero(mask))
+
+    def search(self, text):
+        """Search the entities whose id, slug, name or description contain a text (case insensitive).
+
+        Args:
+            text (str): text to search.
+
+        Returns:
+            :py:class:`CatalogList <cartoframes.data.observatory.entity.CatalogList>` with the matching entities.
+
+        Examples:
+            >>> catalog.country('usa').category('demographics').datasets.search('income')
+
+        """
+        table = self._get_table()
+        mask = np.zeros(len(self), dtype=bool)
 
-        if 'summary_json' in df:
-            del df['summary_json']
+        for field in self.search_fields:
+            if field in table:
+                mask |= table[field].astype(str).str.contains(text, case=False, regex=False).values
 
-        return df
+        return self._take(np.flatnonzero(mask))
+
+    def sort_by(self, by, ascending=True):
+        """Sort the entities by the value of their fields. The list itself is not modified.
+
+        Args:
+            by (str or list): field or fields to sort by.
+            ascending (bool, optional): sort in ascending order. Default is True.
+
+        Returns:
+            :py:class:`CatalogList <cartoframes.data.observatory.entity.CatalogList>` with the sorted entities.
+
+        Examples:
+            >>> datasets.sort_by('name')
+            >>> datasets.sort_by(['provider_id', 'version'], ascending=False)
+
+        """
+        order = self._get_table().reset_index(drop=True).sort_values(
+            by, ascending=ascending, kind='stable', na_position='last').index.values
+
+        return self._take(order)
+
+    def _take(self, positions):
+        return CatalogList([self[position] for position in positions])
+
+    def _get_table(self):
+        # The table is reset by the methods that modify the list
+        if self._table is None:
+            table = pd.DataFrame([item.data for item in self])
+            if 'summary_json' in table:
+                del table['summary_json']
+            self._table = table
+        return self._table
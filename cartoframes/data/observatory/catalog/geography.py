@@ -1,4 +1,4 @@
-from .entity import CatalogEntity
+from .entity import CatalogEntity, GEOID_COL, GEOM_COL
 from .repository.dataset_repo import get_dataset_repo
 from .repository.geography_repo import get_geography_repo, GEOGRAPHY_TYPE
 from .repository.constants import GEOGRAPHY_FILTER
@@ -64,6 +64,7 @@ class Geography(CatalogEntity):
 
     """
     _entity_repo = get_geography_repo()
+    _query_placeholder = '$geography$'
 
     @property
     def datasets(self):
@@ -181,7 +182,8 @@ class Geography(CatalogEntity):
         return cls._entity_repo.get_all(filters, credentials)
 
     @check_do_enabled
-    def to_csv(self, file_path, credentials=None, limit=None, order_by=None, sql_query=None):
+    def to_csv(self, file_path, credentials=None, limit=None, order_by=None, sql_query=None, compression=None,
+               resume=False, columns=None, where=None, bbox=None, geometry=None):
         """Download geography data as a local csv file. You need Data Observatory enabled in your CARTO
         account, please contact us at support@carto.com for more information.
 
@@ -201,11 +203,24 @@ class Geography(CatalogEntity):
                 For instance, to download just one row: `select * from $geography$ limit 1`. The placeholder
                 `$geography$` is mandatory and it will be replaced by the actual geography dataset before running
                 the query. You can build any arbitrary query.
+            compression (str, optional): compression of the file: ``'gzip'``, ``'bz2'`` or ``'xz'``.
+                Default is uncompressed.
+            resume (boolean, optional): continue an interrupted download, appending to the existing file
+                the data after its current size. Use it with the same arguments (and an `order_by` to get the
+                rows in the same order) as the interrupted download. Default is False.
+            columns (list, optional): names of the columns to download. The `geoid` and `geom` columns
+                are always included. Default is all the columns.
+            where (str, optional): SQL condition to filter the rows to download, e.g. ``"geoid LIKE '36%'"``.
+            bbox (tuple, optional): bounding box ``(minx, miny, maxx, maxy)`` in WGS84 to download only the
+                rows whose geometry intersects it.
+            geometry (str or shapely.geometry, optional): geometry (or WKT) in WGS84 to download only the
+                rows whose geometry intersects it. The `columns`, `where`, `bbox` and `geometry` arguments
+                build the query to run, so they can not be combined with `sql_query`.
 
         Raises:
             DOError: if you have not a valid license for the geography being downloaded,
                 DO is not enabled or there is an issue downloading the data.
-            ValueError: if the credentials argument is not valid.
+            ValueError: if the credentials, the compression or the spatial filter arguments are not valid.
 
         """
         _credentials = get_credentials(credentials)
@@ -213,10 +228,14 @@ class Geography(CatalogEntity):
         if not self.is_subscribed(_credentials, GEOGRAPHY_TYPE):
             raise DOError(GEOGRAPHY_SUBSCRIPTION_ERROR)
 
-        self._download(_credentials, file_path, limit=limit, order_by=order_by, sql_query=sql_query)
+        sql_query = self._get_sql_query(sql_query, columns, where, bbox, geometry)
+
+        self._download(_credentials, file_path, limit=limit, order_by=order_by, sql_query=sql_query,
+                       compression=compression, resume=resume)
 
     @check_do_enabled
-    def to_dataframe(self, credentials=None, limit=None, order_by=None, sql_query=None):
+    def to_dataframe(self, credentials=None, limit=None, order_by=None, sql_query=None, chunksize=None,
+                     columns=None, where=None, bbox=None, geometry=None):
         """Download geography data as a pandas.DataFrame. You need Data Observatory enabled in your CARTO
         account, please contact us at support@carto.com for more information.
 
@@ -235,14 +254,24 @@ class Geography(CatalogEntity):
                 For instance, to download just one row: `select * from $geography$ limit 1`. The placeholder
                 `$geography$` is mandatory and it will be replaced by the actual geography dataset before running
                 the query. You can build any arbitrary query.
+            chunksize (int, optional): return an iterator of geopandas.GeoDataFrame with this number of rows,
+                so the data is parsed while it is downloaded. Default is to return a single GeoDataFrame.
+            columns (list, optional): names of the columns to download. The `geoid` and `geom` columns
+                are always included. Default is all the columns.
+            where (str, optional): SQL condition to filter the rows to download, e.g. ``"geoid LIKE '36%'"``.
+            bbox (tuple, optional): bounding box ``(minx, miny, maxx, maxy)`` in WGS84 to download only the
+                rows whose geometry intersects it.
+            geometry (str or shapely.geometry, optional): geometry (or WKT) in WGS84 to download only the
+                rows whose geometry intersects it. The `columns`, `where`, `bbox` and `geometry` arguments
+                build the query to run, so they can not be combined with `sql_query`.
 
         Returns:
-            pandas.DataFrame
+            pandas.DataFrame, or an iterator of pandas.DataFrame if `chunksize` is set.
 
         Raises:
             DOError: if you have not a valid license for the geography being downloaded,
                 DO is not enabled or there is an issue downloading the data.
-            ValueError: if the credentials argument is not valid.
+            ValueError: if the credentials or the spatial filter arguments are not valid.
 
         """
         _credentials = get_credentials(credentials)
@@ -250,7 +279,15 @@ class Geography(CatalogEntity):
         if not self.is_subscribed(_credentials, GEOGRAPHY_TYPE):
             raise DOError(GEOGRAPHY_SUBSCRIPTION_ERROR)
 
-        return self._download(_credentials, limit=limit, order_by=order_by, sql_query=sql_query)
+        sql_query = self._get_sql_query(sql_query, columns, where, bbox, geometry)
+
+        return self._download(_credentials, limit=limit, order_by=order_by, sql_query=sql_query, chunksize=chunksize)
+
+    def _get_query_columns(self, columns):
+        if columns is None:
+            return None
+
+        return [GEOID_COL, GEOM_COL] + [column for column in columns if column not in [GEOID_COL, GEOM_COL]]
 
     @check_do_enabled
     def subscribe(self, credentials=None):
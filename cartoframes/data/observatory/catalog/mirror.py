@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import shutil
+import appdirs
+import numpy as np
+import pandas as pd
+
+from functools import reduce
+from geopandas import GeoDataFrame
+from shapely.geometry import box
+
+from ....utils.geom_utils import set_geometry, has_geometry
+from ....utils.utils import check_package
+
+DEFAULT_MIRROR_DIR = os.path.join(appdirs.user_cache_dir('cartoframes'), 'do_datasets')
+DEFAULT_CHUNKSIZE = 100000
+MANIFEST_FILENAME = 'manifest.json'
+
+# Rows are sorted by the quadkey of their geometry, and stored in a partition
+# (directory) per quadkey prefix, so close rows are stored together
+QUADKEY_ZOOM = 16
+PARTITION_ZOOM = 4
+NO_PARTITION = 'none'
+
+MAX_LATITUDE = 85.05112878
+
+
+def get_mirror_path(dataset_id, path=None):
+    return os.path.join(path or DEFAULT_MIRROR_DIR, dataset_id)
+
+
+def read_manifest(mirror_path):
+    try:
+        with open(os.path.join(mirror_path, MANIFEST_FILENAME), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_mirror_current(manifest, dataset):
+    return (
+        manifest is not None and
+        manifest.get('version') == dataset.version and
+        manifest.get('update_frequency') == dataset.update_frequency
+    )
+
+
+def write_mirror(dataset, chunks, mirror_path, geom_col):
+    """Write the dataset chunks as partitioned Parquet files. The previous mirror (if any)
+    is replaced only when all the data has been written."""
+    check_package('pyarrow', is_optional=True)
+
+    tmp_path = mirror_path + '.tmp'
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+
+    parts = []
+    rows = 0
+    for index, gdf in enumerate(chunks):
+        rows += len(gdf)
+        for partition, partition_gdf in _partitions(gdf, geom_col):
+            part = os.path.join('quadkey={}'.format(partition), 'part-{:05d}.parquet'.format(index))
+            part_path = os.path.join(tmp_path, part)
+            if not os.path.exists(os.path.dirname(part_path)):
+                os.makedirs(os.path.dirname(part_path))
+            _to_parquet(partition_gdf, part_path)
+            parts.append({'path': part, 'bounds': _bounds(partition_gdf, geom_col)})
+
+    manifest = {
+        'id': dataset.id,
+        'version': dataset.version,
+        'update_frequency': dataset.update_frequency,
+        'synced_at': time.time(),
+        'rows': rows,
+        'parts': parts
+    }
+    with open(os.path.join(tmp_path, MANIFEST_FILENAME), 'w') as f:
+        json.dump(manifest, f)
+
+    old_path = mirror_path + '.old'
+    if os.path.exists(mirror_path):
+        os.replace(mirror_path, old_path)
+    os.replace(tmp_path, mirror_path)
+    if os.path.exists(old_path):
+        shutil.rmtree(old_path)
+
+    return manifest
+
+
+def read_mirror(mirror_path, manifest, geom_col, columns=None, spatial_filter=None, limit=None):
+    """Read the mirror Parquet files (memory-mapped) as a GeoDataFrame."""
+    check_package('pyarrow', is_optional=True)
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    parts = manifest.get('parts', [])
+    if spatial_filter is not None:
+        # Skip the parts whose geometries bounds don't intersect the filter
+        parts = [part for part in parts if part['bounds'] is None or box(*part['bounds']).intersects(spatial_filter)]
+
+    tables = []
+    for part in parts:
+        part_path = os.path.join(mirror_path, part['path'])
+        part_columns = None
+        if columns is not None:
+            schema_columns = pq.read_schema(part_path).names
+            invalid_columns = [column for column in columns if column not in schema_columns]
+            if invalid_columns:
+                raise ValueError('The following columns are not valid for the dataset {}: {}'.format(
+                    manifest.get('id'), ', '.join(invalid_columns)))
+            part_columns = [column for column in schema_columns if column in columns or column == geom_col]
+        tables.append(pq.read_table(part_path, columns=part_columns, memory_map=True))
+
+    dataframe = pa.concat_tables(tables).to_pandas() if tables else pd.DataFrame(columns=columns)
+    gdf = GeoDataFrame(dataframe)
+
+    if geom_col in gdf:
+        set_geometry(gdf, geom_col, inplace=True)
+        if spatial_filter is not None:
+            gdf = gdf[gdf.intersects(spatial_filter)]
+
+    if limit is not None:
+        gdf = gdf.head(limit)
+
+    return gdf.reset_index(drop=True)
+
+
+def _partitions(gdf, geom_col):
+    if geom_col in gdf and len(gdf) > 0:
+        quadkeys = _quadkeys(gdf[geom_col].representative_point(), QUADKEY_ZOOM)
+        order = np.argsort(quadkeys, kind='stable')
+        gdf = gdf.iloc[order]
+        prefixes = np.array([quadkey[:PARTITION_ZOOM] or NO_PARTITION for quadkey in quadkeys[order]])
+        for prefix in pd.unique(prefixes):
+            yield prefix, gdf[prefixes == prefix]
+    elif len(gdf) > 0:
+        yield NO_PARTITION, gdf
+
+
+def _quadkeys(points, zoom):
+    x = points.x.values
+    y = points.y.values
+    valid = ~(np.isnan(x) | np.isnan(y))
+    x = np.where(valid, x, 0)
+    y = np.clip(np.where(valid, y, 0), -MAX_LATITUDE, MAX_LATITUDE)
+
+    n = 2 ** zoom
+    lat = np.radians(y)
+    tile_x = np.clip(((x + 180) / 360 * n).astype(int), 0, n - 1)
+    tile_y = np.clip(((1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / np.pi) / 2 * n).astype(int), 0, n - 1)
+
+    digits = []
+    for level in range(zoom, 0, -1):
+        mask = 1 << (level - 1)
+        digits.append((((tile_x & mask) != 0) + 2 * ((tile_y & mask) != 0)).astype(str))
+
+    return np.where(valid, reduce(np.char.add, digits), '')
+
+
+def _bounds(gdf, geom_col):
+    if geom_col in gdf and gdf[geom_col].notnull().any():
+        bounds = gdf[geom_col].total_bounds
+        if not np.isnan(bounds).any():
+            return [float(bound) for bound in bounds]
+    return None
+
+
+def _to_parquet(gdf, path):
+    if has_geometry(gdf):
+        # GeoParquet: the geometry is stored as WKB with its metadata
+        gdf.to_parquet(path, index=False)
+    else:
+        pd.DataFrame(gdf).to_parquet(path, index=False)
@@ -1,8 +1,10 @@
 from abc import ABC, abstractmethod
 
 from .repo_client import RepoClient
+from .search_index import register_entities
 from ..entity import CatalogList, is_slug_value
 from .....exceptions import CatalogError
+from .....utils.logger import log
 from ..subscriptions import get_subscription_ids
 
 
@@ -42,7 +44,8 @@ class EntityRepository(ABC):
         return self._to_catalog_entity(data)
 
     def get_by_id_list(self, id_list):
-        return self._get_filtered_entities(self._get_id_list_filters(id_list))
+        entities = self._get_filtered_entities(self._get_id_list_filters(id_list))
+        return self._sort_by_id_list(entities, id_list)
 
     @check_catalog_connection
     def _get_filtered_entity(self, entity_id):
@@ -57,8 +60,29 @@ class EntityRepository(ABC):
             return CatalogList([])
 
         normalized_data = [self._get_entity_class()(self._map_row(row)) for row in rows]
+        # The search index is shared by all the credentials, so it only keeps the public catalog
+        if self.client.is_public_scope():
+            register_entities(self._get_entity_class().__name__.lower(), normalized_data)
         return CatalogList(normalized_data)
 
+    def _sort_by_id_list(self, entities, id_list):
+        entities_by_id = {}
+        for entity in entities:
+            entities_by_id[entity.id] = entity
+            if self.slug_field is not None and entity.slug is not None:
+                entities_by_id[entity.slug] = entity
+
+        missing_ids = [id_ for id_ in id_list if id_ not in entities_by_id]
+        if missing_ids:
+            log.warning('The following ids do not correspond with any existing entity in the catalog: {}'.format(
+                ', '.join(missing_ids)))
+
+        sorted_entities = [entities_by_id[id_] for id_ in id_list if id_ in entities_by_id]
+        # Entities that can not be matched with the requested ids are kept at the end
+        sorted_ids = set(map(id, sorted_entities))
+        sorted_entities += [entity for entity in entities if id(entity) not in sorted_ids]
+        return CatalogList(sorted_entities)
+
     def _get_filters(self, filters):
         if filters is not None:
             cleaned_filters = {field: value for field, value in filters.items() if field in self.allowed_filters}
@@ -95,11 +119,11 @@ class EntityRepository(ABC):
     def _add_subscription_ids(self, filters, credentials, entity_type):
         ids = get_subscription_ids(credentials, entity_type)
 
-        if not isinstance(ids, list) or len(ids) == 0:
+        if not isinstance(ids, (list, set, frozenset)) or len(ids) == 0:
             return None
 
         filters = filters or {}
-        filters['id'] = ids
+        filters['id'] = sorted(ids)
         return filters
 
     @classmethod
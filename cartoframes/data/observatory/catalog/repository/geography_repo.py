@@ -1,4 +1,7 @@
+import time
+
 from geopandas import GeoDataFrame
+from shapely.prepared import prep
 
 from .....utils.geom_utils import set_geometry
 from .constants import COUNTRY_FILTER, CATEGORY_FILTER, PROVIDER_FILTER, PUBLIC_FILTER
@@ -10,6 +13,9 @@ _GEOGRAPHY_ID_FIELD = 'id'
 _GEOGRAPHY_SLUG_FIELD = 'slug'
 _ALLOWED_FILTERS = [COUNTRY_FILTER, CATEGORY_FILTER, PROVIDER_FILTER, PUBLIC_FILTER]
 
+# Time (in seconds) the geographies coverage GeoDataFrame is reused
+COVERAGE_TTL = 3600
+
 
 def get_geography_repo():
     return _REPO
@@ -19,6 +25,8 @@ class GeographyRepository(EntityRepository):
 
     def __init__(self):
         super(GeographyRepository, self).__init__(_GEOGRAPHY_ID_FIELD, _ALLOWED_FILTERS, _GEOGRAPHY_SLUG_FIELD)
+        self._geographies_gdf = None
+        self._geographies_gdf_time = None
 
     def get_all(self, filters=None, credentials=None):
         if credentials is not None:
@@ -58,11 +66,34 @@ class GeographyRepository(EntityRepository):
             'id': self._normalize_field(row, self.id_field)
         }
 
-    def get_geographies_gdf(self):
-        data = self.client.get_geographies({'get_geoms_coverage': True})
-        gdf = GeoDataFrame(data, crs='epsg:4326')
-        set_geometry(gdf, 'geom_coverage', inplace=True)
-        return gdf
+    def get_geographies_gdf(self, refresh=False):
+        # The coverages are decoded and indexed once, and reused during COVERAGE_TTL seconds
+        if refresh or self._geographies_gdf is None or time.time() - self._geographies_gdf_time > COVERAGE_TTL:
+            data = self.client.get_geographies({'get_geoms_coverage': True})
+            gdf = GeoDataFrame(data)
+            set_geometry(gdf, 'geom_coverage', inplace=True, crs='epsg:4326')
+            gdf.sindex  # Build the spatial index
+            self._geographies_gdf = gdf
+            self._geographies_gdf_time = time.time()
+        return self._geographies_gdf
+
+    def get_geographies_ids_by_geometry(self, geometries):
+        """Return, for each geometry, the list of ids of the geographies whose coverage intersects it."""
+        gdf = self.get_geographies_gdf()
+        coverages = gdf.geometry.values
+        ids = gdf['id'].values
+        sindex = gdf.sindex
+
+        result = []
+        for geometry in geometries:
+            if geometry is None or geometry.is_empty or len(coverages) == 0:
+                result.append([])
+                continue
+            # Filter the candidates with the index bounding boxes, then check the exact geometries
+            prepared_geometry = prep(geometry)
+            candidates = sorted(sindex.intersection(geometry.bounds))
+            result.append([ids[i] for i in candidates if prepared_geometry.intersects(coverages[i])])
+        return result
 
 
 _REPO = GeographyRepository()
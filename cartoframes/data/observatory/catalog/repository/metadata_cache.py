@@ -0,0 +1,170 @@
+import os
+import copy
+import json
+import time
+import appdirs
+import hashlib
+import threading
+
+from collections import OrderedDict
+
+DEFAULT_CACHE_DIR = os.path.join(appdirs.user_cache_dir('cartoframes'), 'do_metadata')
+DEFAULT_TTL = 24 * 3600  # seconds
+DEFAULT_MAXSIZE = 1024
+
+
+class MetadataCache:
+    """Two-level (memory and disk) cache for the Data Observatory catalog metadata.
+
+    Catalog requests are keyed by the entity path, the filters and the credentials scope
+    used to fetch them. The most recently used responses are kept in memory and, if the cache
+    is persistent, all of them are also stored in disk, so they are reused across sessions
+    until they expire.
+
+    Args:
+        ttl (int, optional): time to live of the cached responses in seconds. Defaults to one day.
+        maxsize (int, optional): maximum number of responses kept in memory. The least recently
+            used responses are evicted first. Defaults to 1024.
+        path (str, optional): directory where the responses are stored. By default it is stored in
+            the user cache directory.
+        persistent (bool, optional): store the responses in disk. Defaults to False.
+
+    Example:
+        >>> set_metadata_cache(MetadataCache(ttl=3600, persistent=True))
+
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, maxsize=DEFAULT_MAXSIZE, path=None, persistent=False):
+        self._ttl = ttl
+        self._maxsize = maxsize
+        self._path = path or DEFAULT_CACHE_DIR
+        self._persistent = persistent
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        """Directory where the responses are stored, or None if the cache is not persistent."""
+        return self._path if self._persistent else None
+
+    def get_or_fetch(self, scope, entity, filters, fetch):
+        """Return the cached response for the request, or fetch and cache it."""
+        key = _cache_key(scope, entity, filters)
+
+        value = self.get(key)
+        if value is None:
+            value = fetch()
+            self.set(key, value)
+
+        return value
+
+    def get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+
+        if entry is None and self._persistent:
+            entry = self._read(key)
+            if entry is not None:
+                self._remember(key, entry)
+
+        if entry is None:
+            return None
+
+        if self._is_expired(entry):
+            self._remove(key)
+            return None
+
+        # The callers get their own copy, so modifying it doesn't change the cached value
+        return copy.deepcopy(entry['value'])
+
+    def set(self, key, value):
+        if value is None:
+            return
+
+        entry = {'created': time.time(), 'value': copy.deepcopy(value)}
+        self._remember(key, entry)
+
+        if self._persistent:
+            self._write(key, entry)
+
+    def clear(self):
+        """Remove all the cached responses, in memory and disk."""
+        with self._lock:
+            self._memory.clear()
+
+        if self._persistent and os.path.exists(self._path):
+            for filename in os.listdir(self._path):
+                if filename.endswith('.json'):
+                    os.remove(os.path.join(self._path, filename))
+
+    def _remove(self, key):
+        with self._lock:
+            self._memory.pop(key, None)
+
+        if self._persistent:
+            try:
+                os.remove(self._filepath(key))
+            except OSError:
+                pass
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self._maxsize:
+                self._memory.popitem(last=False)
+
+    def _is_expired(self, entry):
+        return self._ttl is not None and time.time() - entry['created'] > self._ttl
+
+    def _filepath(self, key):
+        return os.path.join(self._path, '{}.json'.format(key))
+
+    def _read(self, key):
+        try:
+            with open(self._filepath(key), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, key, entry):
+        try:
+            if not os.path.exists(self._path):
+                os.makedirs(self._path)
+            # Write to a temporary file first to avoid partial reads from other processes
+            tmp_filepath = '{}.{}.tmp'.format(self._filepath(key), threading.get_ident())
+            with open(tmp_filepath, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_filepath, self._filepath(key))
+        except (OSError, TypeError, ValueError):
+            pass
+
+
+def _cache_key(scope, entity, filters):
+    text = json.dumps([scope, entity, filters], sort_keys=True, default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _create_default_metadata_cache():
+    return MetadataCache()
+
+
+_metadata_cache = _create_default_metadata_cache()
+
+
+def get_metadata_cache():
+    return _metadata_cache
+
+
+def set_metadata_cache(cache):
+    """Set the cache used for the Data Observatory catalog metadata.
+
+    Args:
+        cache (:py:class:`MetadataCache <cartoframes.data.observatory.MetadataCache>`):
+            cache instance. Use None to disable the cache.
+
+    """
+    global _metadata_cache
+    _metadata_cache = cache
@@ -1,8 +1,14 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from carto.do_dataset import DODataset
+from carto.exceptions import CartoException
 
+from .metadata_cache import get_metadata_cache
 from .....auth import Credentials, defaults
 
 DEFAULT_USER = 'do-metadata'
+# Maximum number of concurrent requests when fetching a list of entities
+MAX_WORKERS = 8
 
 
 class RepoClient:
@@ -11,18 +17,28 @@ class RepoClient:
         default_credentials = Credentials(DEFAULT_USER)
         default_auth_client = default_credentials.get_api_key_auth_client()
         self._default_do_dataset = DODataset(auth_client=default_auth_client)
+        self._default_scope = _credentials_scope(default_credentials)
         self._user_do_dataset = None
+        self._user_scope = None
         self._external_do_dataset = None
+        self._external_scope = None
 
     def set_user_credentials(self, credentials):
         if credentials is not None:
             auth_client = credentials.get_api_key_auth_client()
             self._user_do_dataset = DODataset(auth_client=auth_client)
+            self._user_scope = _credentials_scope(credentials)
         else:
             self._user_do_dataset = None
+            self._user_scope = None
 
     def reset_user_credentials(self):
         self._user_do_dataset = None
+        self._user_scope = None
+
+    def is_public_scope(self):
+        """Return True if the metadata is fetched from the public catalog, without user or external credentials."""
+        return self._user_do_dataset is None and self._external_do_dataset is None
 
     def set_external_credentials(self):
         # This must be checked every time to allow the definition of
@@ -32,8 +48,10 @@ class RepoClient:
         if external_credentials is not None:
             external_auth_client = external_credentials.get_api_key_auth_client()
             self._external_do_dataset = DODataset(auth_client=external_auth_client)
+            self._external_scope = _credentials_scope(external_credentials)
         else:
             self._external_do_dataset = None
+            self._external_scope = None
 
     def get_countries(self, filters=None):
         self.set_external_credentials()
@@ -76,8 +94,12 @@ class RepoClient:
     def _get_filter_id(self, filters, use_slug=False):
         if isinstance(filters, dict):
             filter_id = filters.get('id')
-            if not filter_id and use_slug:
-                filter_id = filters.get('slug')
+            if use_slug:
+                filter_slug = filters.get('slug')
+                if isinstance(filter_id, list) and isinstance(filter_slug, list):
+                    return filter_id + filter_slug
+                if not filter_id:
+                    filter_id = filter_slug
             return filter_id
 
     def _get_entity(self, entity, filters=None, use_slug=False):
@@ -89,10 +111,48 @@ class RepoClient:
 
     def _fetch_entity_id(self, entity, filter_id):
         if isinstance(filter_id, list):
-            return list(filter(None, [self._fetch_entity('{0}/{1}'.format(entity, _id)) for _id in filter_id]))
+            return self._fetch_entity_list(entity, filter_id)
         else:
             return self._fetch_entity('{0}/{1}'.format(entity, filter_id))
 
+    def _fetch_entity_list(self, entity, id_list):
+        # The metadata API has no multi-id lookup, so the requests are sent concurrently.
+        # The results keep the order of the ids, and the missing entities are skipped.
+        entities = ['{0}/{1}'.format(entity, _id) for _id in id_list]
+        if len(entities) <= 1:
+            results = [self._fetch_existing_entity(e) for e in entities]
+        else:
+            with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(entities))) as executor:
+                results = list(executor.map(self._fetch_existing_entity, entities))
+        return list(filter(None, results))
+
+    def _fetch_existing_entity(self, entity):
+        # A missing id must not abort the requests of the rest of the list
+        try:
+            return self._fetch_entity(entity)
+        except CartoException as e:
+            if _is_not_found(e):
+                return None
+            raise
+
     def _fetch_entity(self, entity, filters=None):
-        do_dataset = self._user_do_dataset or self._external_do_dataset or self._default_do_dataset
-        return do_dataset.metadata(entity, filters)
+        if self._user_do_dataset:
+            do_dataset, scope = self._user_do_dataset, self._user_scope
+        elif self._external_do_dataset:
+            do_dataset, scope = self._external_do_dataset, self._external_scope
+        else:
+            do_dataset, scope = self._default_do_dataset, self._default_scope
+
+        cache = get_metadata_cache()
+        if cache is None:
+            return do_dataset.metadata(entity, filters)
+
+        return cache.get_or_fetch(scope, entity, filters, lambda: do_dataset.metadata(entity, filters))
+
+
+def _is_not_found(error):
+    return str(error).startswith('404')
+
+
+def _credentials_scope(credentials):
+    return [credentials.base_url, credentials.api_key]
@@ -0,0 +1,211 @@
+import os
+import re
+import json
+import math
+import atexit
+import threading
+
+from collections import OrderedDict
+
+from .metadata_cache import get_metadata_cache
+
+SEARCH_FIELDS = ['name', 'description', 'column_name', 'slug', 'id']
+SEARCHABLE_ENTITIES = ['variable', 'dataset', 'geography']
+# Maximum number of fetched entities waiting to be indexed, by entity type
+MAX_PENDING_ENTITIES = 50000
+
+# BM25 ranking parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+class SearchIndex:
+    """Inverted index of the catalog entities metadata, ranked with BM25.
+
+    The documents are the searchable text fields of the entities (name, description, column name,
+    slug and id), indexed by their words. Adding a document with an existing id replaces the previous one.
+
+    """
+
+    def __init__(self, fields=SEARCH_FIELDS):
+        self._fields = fields
+        self._documents = {}
+        self._postings = {}
+        self._lengths = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._documents)
+
+    def add(self, documents):
+        """Add or update the documents in the index. Returns True if the index has changed."""
+        changed = False
+
+        with self._lock:
+            for document in documents:
+                document = _search_document(document, self._fields)
+                doc_id = document.get('id')
+                if doc_id is None or self._documents.get(doc_id) == document:
+                    continue
+                if doc_id in self._documents:
+                    self._remove(doc_id)
+                self._insert(doc_id, document)
+                changed = True
+
+        return changed
+
+    def search(self, query, limit=None):
+        """Return the documents that match the words of the query, sorted by relevance."""
+        terms = _tokenize(query)
+
+        with self._lock:
+            count = len(self._documents)
+            if count == 0:
+                return []
+            average_length = self._total_length / count
+
+            scores = {}
+            for term in set(terms):
+                postings = self._postings.get(term, {})
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[doc_id] / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+            ranking = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+            return [self._documents[doc_id] for doc_id, _ in ranking]
+
+    def save(self, path):
+        with self._lock:
+            documents = list(self._documents.values())
+
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        # Write to a temporary file first to avoid partial reads from other processes
+        tmp_path = '{}.{}.tmp'.format(path, threading.get_ident())
+        with open(tmp_path, 'w') as f:
+            json.dump(documents, f, default=str)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Load the index documents from a file. The postings are built again from them."""
+        index = cls()
+        try:
+            with open(path, 'r') as f:
+                index.add(json.load(f))
+        except (OSError, ValueError):
+            pass
+        return index
+
+    def _insert(self, doc_id, document):
+        terms = _tokenize(' '.join(str(document.get(field) or '') for field in self._fields))
+        for term in terms:
+            postings = self._postings.setdefault(term, {})
+            postings[doc_id] = postings.get(doc_id, 0) + 1
+        self._documents[doc_id] = document
+        self._lengths[doc_id] = len(terms)
+        self._total_length += len(terms)
+
+    def _remove(self, doc_id):
+        for term in set(_tokenize(' '.join(str(self._documents[doc_id].get(field) or '')
+                                           for field in self._fields))):
+            postings = self._postings.get(term, {})
+            postings.pop(doc_id, None)
+            if not postings:
+                self._postings.pop(term, None)
+        del self._documents[doc_id]
+        self._total_length -= self._lengths.pop(doc_id)
+
+
+def _tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def _search_document(data, fields=SEARCH_FIELDS):
+    return {field: data[field] for field in fields if data.get(field) is not None}
+
+
+_search_indexes = {}
+_dirty_indexes = set()
+_pending_entities = {}
+_search_indexes_lock = threading.Lock()
+_save_registered = False
+
+
+def get_search_index(entity_type):
+    """Return the search index of an entity type, loaded from the catalog cache directory if persisted
+    and updated with the entities fetched since the last call."""
+    global _save_registered
+
+    with _search_indexes_lock:
+        index = _search_indexes.get(entity_type)
+        if index is None:
+            path = _get_index_path(entity_type)
+            index = SearchIndex.load(path) if path is not None else SearchIndex()
+            _search_indexes[entity_type] = index
+            if not _save_registered:
+                atexit.register(save_search_indexes)
+                _save_registered = True
+        pending = _pending_entities.pop(entity_type, {})
+
+    if pending and index.add(pending.values()):
+        with _search_indexes_lock:
+            _dirty_indexes.add(entity_type)
+
+    return index
+
+
+def register_entities(entity_type, entities):
+    """Keep the search fields of the entities fetched from the public catalog to be indexed the next time
+    their index is requested. Only the last `MAX_PENDING_ENTITIES` entities of each type are kept."""
+    if entity_type not in SEARCHABLE_ENTITIES or len(entities) == 0:
+        return
+
+    with _search_indexes_lock:
+        pending = _pending_entities.setdefault(entity_type, OrderedDict())
+        for entity in entities:
+            pending.pop(entity.id, None)
+            pending[entity.id] = _search_document(entity.data)
+        while len(pending) > MAX_PENDING_ENTITIES:
+            pending.popitem(last=False)
+
+
+def save_search_indexes():
+    """Persist the modified search indexes next to the catalog metadata cache."""
+    with _search_indexes_lock:
+        entity_types = list(_dirty_indexes)
+        _dirty_indexes.clear()
+
+    for entity_type in entity_types:
+        path = _get_index_path(entity_type)
+        if path is not None:
+            try:
+                _search_indexes[entity_type].save(path)
+            except (OSError, TypeError, ValueError):
+                pass
+
+
+def clear_search_indexes():
+    """Remove the search indexes, in memory and disk."""
+    with _search_indexes_lock:
+        _search_indexes.clear()
+        _dirty_indexes.clear()
+        _pending_entities.clear()
+
+    for entity_type in SEARCHABLE_ENTITIES:
+        path = _get_index_path(entity_type)
+        if path is not None and os.path.exists(path):
+            os.remove(path)
+
+
+def _get_index_path(entity_type):
+    cache = get_metadata_cache()
+    if cache is None or cache.path is None:
+        return None
+    return os.path.join(cache.path, 'search_index', '{}.json'.format(entity_type))
@@ -1,7 +1,16 @@
 
+import time
+import threading
+
 from json.decoder import JSONDecodeError
 from carto.do_subscriptions import DOSubscriptionManager, DOSubscriptionCreationManager
 
+# Time to live in seconds of the subscriptions index of each credentials
+SUBSCRIPTIONS_TTL = 60
+
+_subscriptions_index = {}
+_subscriptions_lock = threading.Lock()
+
 
 class Subscriptions:
     """This class is used to list the datasets and geographies you have acquired a subscription (or valid license) for.
@@ -48,10 +57,54 @@ class Subscriptions:
             self._geographies = Geography.get_all(self._filters, self._credentials)
         return self._geographies
 
+    def refresh(self):
+        """Discard the cached subscriptions, so they are fetched again on the next access."""
+        invalidate_subscriptions(self._credentials)
+        self._datasets = None
+        self._geographies = None
+
 
 def get_subscription_ids(credentials, stype=None):
-    subs = fetch_subscriptions(credentials)
-    return [s.id for s in subs if (stype is None or stype == s.type) and s.status == 'active']
+    """Return the frozenset of active subscription ids of a type (all the types if None)."""
+    return _get_subscriptions_index(credentials)['ids'].get(stype, frozenset())
+
+
+def invalidate_subscriptions(credentials=None):
+    """Remove the subscriptions index of the credentials, or all of them if no credentials are provided."""
+    with _subscriptions_lock:
+        if credentials is None:
+            _subscriptions_index.clear()
+        else:
+            _subscriptions_index.pop(_credentials_key(credentials), None)
+
+
+def _get_subscriptions_index(credentials):
+    key = _credentials_key(credentials) if credentials else None
+
+    with _subscriptions_lock:
+        index = _subscriptions_index.get(key)
+    if index is not None and time.time() - index['created'] <= SUBSCRIPTIONS_TTL:
+        return index
+
+    # Active subscription ids by type (None for all the types)
+    ids = {None: []}
+    for s in fetch_subscriptions(credentials):
+        if s.status == 'active':
+            ids[None].append(s.id)
+            ids.setdefault(s.type, []).append(s.id)
+
+    # The sets are immutable, so they are shared with the callers without copying them
+    index = {'created': time.time(), 'ids': {stype: frozenset(stype_ids) for stype, stype_ids in ids.items()}}
+
+    if key is not None:
+        with _subscriptions_lock:
+            _subscriptions_index[key] = index
+
+    return index
+
+
+def _credentials_key(credentials):
+    return (credentials.base_url, credentials.api_key)
 
 
 def fetch_subscriptions(credentials):
@@ -69,4 +122,7 @@ def fetch_subscriptions(credentials):
 def trigger_subscription(id, type, credentials):
     api_key_auth_client = credentials.get_api_key_auth_client()
     do_manager = DOSubscriptionCreationManager(api_key_auth_client)
-    return do_manager.create(id=id, type=type)
+    response = do_manager.create(id=id, type=type)
+    if response:
+        invalidate_subscriptions(credentials)
+    return response
@@ -21,10 +21,9 @@ def dataset_describe(variables):
     describe = dict()
 
     for variable in variables:
-        if variable.describe() is None:
-            continue
-
-        describe[variable.column_name] = variable.describe()
+        variable_stats = variable.get_summary_item('describe', lambda: variable_describe(variable.summary))
+        if variable_stats is not None:
+            describe[variable.column_name] = variable_stats
 
     return pd.DataFrame.from_dict(describe)
 
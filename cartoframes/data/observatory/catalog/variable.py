@@ -132,8 +132,7 @@ class Variable(CatalogEntity):
         if autoformat:
             pd.set_option(FLOAT_FORMAT, lambda x: '%.3f' % x)
 
-        data = self.data['summary_json']
-        return variable_describe(data)
+        return self.get_summary_item('describe', lambda: variable_describe(self.summary))
 
     def head(self):
         """Returns a sample of the 10 first values of the variable data.
@@ -142,8 +141,7 @@ class Variable(CatalogEntity):
         (i.e. zip codes of small countries), this method won't return anything
 
         """
-        data = self.data['summary_json']
-        return head(self.__class__, data)
+        return self.get_summary_item('head', lambda: head(self.__class__, self.summary))
 
     def tail(self):
         """Returns a sample of the 10 last values of the variable data.
@@ -152,8 +150,7 @@ class Variable(CatalogEntity):
         (i.e. zip codes of small countries), this method won't return anything
 
         """
-        data = self.data['summary_json']
-        return tail(self.__class__, data)
+        return self.get_summary_item('tail', lambda: tail(self.__class__, self.summary))
 
     def counts(self):
         """Returns a summary of different counts over the actual variable values.
@@ -172,13 +169,11 @@ class Variable(CatalogEntity):
                 # distinct_percent  percent of values that are distinct
 
         """
-        data = self.data['summary_json']
-        return counts(data)
+        return self.get_summary_item('counts', lambda: counts(self.summary))
 
     def quantiles(self):
         """Returns the quantiles of the variable data."""
-        data = self.data['summary_json']
-        return quantiles(data)
+        return self.get_summary_item('quantiles', lambda: quantiles(self.summary))
 
     def top_values(self):
         """Returns information about the top values of the variable data."""
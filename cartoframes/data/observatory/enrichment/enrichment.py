@@ -1,4 +1,5 @@
-from .enrichment_service import EnrichmentService, AGGREGATION_DEFAULT
+from .enrichment_service import EnrichmentService, AGGREGATION_DEFAULT, ENGINE_REMOTE, DEFAULT_CHUNK_SIZE, \
+    DEFAULT_MAX_WORKERS, DEFAULT_RETRY_TIMES
 
 GEOM_TYPE_POINTS = 'points'
 GEOM_TYPE_POLYGONS = 'polygons'
@@ -20,10 +21,27 @@ class Enrichment(EnrichmentService):
             a default credentials (if set with :py:meth:`set_default_credentials
             <cartoframes.auth.set_default_credentials>`) will attempted to be
             used.
+        engine (str, optional): where the enrichment is computed: ``'remote'`` (default) runs an enrichment
+            job in the Data Observatory, and ``'local'`` computes it in-process with the data of the variables
+            datasets, read from their local mirrors (see :py:meth:`Dataset.sync
+            <cartoframes.data.observatory.Dataset.sync>`) or downloaded for the bounding box of the source data.
+            The local engine supports the 'SUM', 'AVG', 'MIN', 'MAX', 'COUNT', 'STRING_AGG' and 'ARRAY_AGG'
+            aggregations, and filters with a comparison operator and a literal value.
+        mirror_path (str, optional): directory of the datasets local mirrors used by the local engine.
+            By default the user cache directory is used.
+        chunk_size (int, optional): number of rows of each chunk uploaded and enriched by the remote engine.
+            The chunks are enriched concurrently and merged as they finish. Default is 100000.
+        max_workers (int, optional): maximum number of chunks enriched at the same time. Default is 4.
+        retry_times (int, optional): number of times a chunk is enriched in case it fails. Default is 3.
+
+    Example:
+        >>> dataset.sync()
+        >>> gdf_enrich = Enrichment(engine='local').enrich_points(df, dataset.variables[:3])
 
     """
-    def __init__(self, credentials=None):
-        super(Enrichment, self).__init__(credentials)
+    def __init__(self, credentials=None, engine=ENGINE_REMOTE, mirror_path=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 max_workers=DEFAULT_MAX_WORKERS, retry_times=DEFAULT_RETRY_TIMES):
+        super(Enrichment, self).__init__(credentials, engine, mirror_path, chunk_size, max_workers, retry_times)
 
     def enrich_points(self, dataframe, variables, geom_col=None, filters=None):
         """Enrich your points `DataFrame` with columns (:obj:`Variable`) from one or more :obj:`Dataset`
@@ -1,12 +1,16 @@
 import uuid
+import numpy
 import pandas
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from geopandas import GeoDataFrame
 from carto.do_dataset import DODataset
+from carto.exceptions import CartoException
 
 from ...observatory import Variable
 from ....auth import get_default_credentials
 from ....exceptions import EnrichmentError
 from ....utils.geom_utils import set_geometry, has_geometry
+from ....utils.logger import log
 from ....utils.utils import timelogger
 
 _ENRICHMENT_ID = '__enrichment_id'
@@ -15,26 +19,52 @@ _TTL_IN_SECONDS = 3600
 
 AGGREGATION_DEFAULT = 'default'
 
+ENGINE_REMOTE = 'remote'
+ENGINE_LOCAL = 'local'
+
+DEFAULT_CHUNK_SIZE = 100000
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_RETRY_TIMES = 3
+
+# Types of the enriched columns. The aggregations that don't keep the type of the variable
+# (see _STRING_AGGREGATIONS) are parsed without an explicit type. The integer variables are
+# nullable integers (the rows not enriched are null) unless an aggregation makes them fractional
+_NUMERIC_DB_TYPES = ['INTEGER', 'INT64', 'NUMERIC', 'FLOAT', 'FLOAT64']
+_INTEGER_DB_TYPES = ['INTEGER', 'INT64']
+_STRING_AGGREGATIONS = ['STRING_AGG', 'ARRAY_AGG']
+_INTEGER_AGGREGATIONS = ['SUM', 'MIN', 'MAX', 'COUNT']
+
 
 class EnrichmentService(object):
     """Base class for the Enrichment utility with commons auxiliary methods"""
 
-    def __init__(self, credentials=None):
-        self.auth_client = _create_auth_client(credentials or get_default_credentials())
+    def __init__(self, credentials=None, engine=ENGINE_REMOTE, mirror_path=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 max_workers=DEFAULT_MAX_WORKERS, retry_times=DEFAULT_RETRY_TIMES):
+        if engine not in [ENGINE_REMOTE, ENGINE_LOCAL]:
+            raise ValueError('Wrong engine "{}". Valid engines are: {}, {}'.format(engine, ENGINE_REMOTE, ENGINE_LOCAL))
+
+        self.credentials = credentials or get_default_credentials()
+        self.auth_client = _create_auth_client(self.credentials)
+        self.engine = engine
+        self.mirror_path = mirror_path
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.retry_times = retry_times
 
     @timelogger
     def _enrich(self, geom_type, dataframe, variables, geom_col=None, filters=None, aggregation=AGGREGATION_DEFAULT):
         filters = filters or {}
         variable_ids = self._prepare_variables(variables)
         geodataframe = self._prepare_data(dataframe, geom_col)
-        temp_table_name = self._get_temp_table_name()
-        uploaded_dataset = self._upload_data(temp_table_name, geodataframe)
-        enriched_dataframe = self._execute_enrichment(uploaded_dataset,
-                                                      temp_table_name,
-                                                      geom_type,
-                                                      variable_ids,
-                                                      filters,
-                                                      aggregation)
+        unique_geodataframe = self._unique_geometries(geodataframe)
+
+        if self.engine == ENGINE_LOCAL:
+            enriched_dataframe = self._execute_local_enrichment(unique_geodataframe, geom_type, variable_ids, filters,
+                                                                aggregation)
+            return self._merge(geodataframe, enriched_dataframe)
+
+        enriched_dataframe = self._execute_remote_enrichment(unique_geodataframe, geom_type, variable_ids, filters,
+                                                             aggregation)
         return self._merge(geodataframe, enriched_dataframe)
 
     def _prepare_variables(self, variables):
@@ -51,7 +81,8 @@ class EnrichmentService(object):
 
     @timelogger
     def _prepare_data(self, dataframe, geom_col):
-        geodataframe = GeoDataFrame(dataframe, copy=True)
+        # Shallow copy: the columns data is shared with the input dataframe
+        geodataframe = GeoDataFrame(dataframe.copy(deep=False))
 
         if geom_col in geodataframe:
             set_geometry(geodataframe, geom_col, inplace=True)
@@ -61,15 +92,22 @@ class EnrichmentService(object):
             raise ValueError('No valid geometry found. Please provide an input source with ' +
                              'a valid geometry or specify the "geom_col" param with a geometry column.')
 
-        # Add extra columns for the enrichment
-        geodataframe[_ENRICHMENT_ID] = range(geodataframe.shape[0])
-        geodataframe[_GEOM_COLUMN] = geodataframe.geometry
+        # Add an extra column for the enrichment. The rows with the same geometry share
+        # the enrichment id, so each distinct geometry is enriched only once
+        geodataframe[_ENRICHMENT_ID] = _geometry_ids(geodataframe.geometry)
 
         return geodataframe
 
+    def _unique_geometries(self, geodataframe):
+        ids = geodataframe[_ENRICHMENT_ID]
+        return geodataframe[~ids.duplicated() & (ids >= 0)]
+
     @timelogger
     def _upload_data(self, temp_table_name, geodataframe):
-        reduced_geodataframe = geodataframe[[_ENRICHMENT_ID, _GEOM_COLUMN]]
+        reduced_geodataframe = pandas.DataFrame({
+            _ENRICHMENT_ID: geodataframe[_ENRICHMENT_ID].values,
+            _GEOM_COLUMN: geodataframe.geometry.values
+        })
 
         dataset = DODataset(auth_client=self.auth_client).name(temp_table_name) \
             .column(_ENRICHMENT_ID, 'INT64') \
@@ -85,7 +123,8 @@ class EnrichmentService(object):
         return dataset
 
     @timelogger
-    def _execute_enrichment(self, dataset, temp_table_name, geom_type, variables, filters, aggregation):
+    def _execute_enrichment(self, dataset, temp_table_name, geom_type, variables, filters, aggregation,
+                            dtypes=None):
         output_name = '{}_result'.format(temp_table_name)
         status = dataset.enrichment(geom_type=geom_type,
                                     variables=variables,
@@ -97,21 +136,132 @@ class EnrichmentService(object):
             raise EnrichmentError('Couldn\'t enrich the dataframe. The job hasn\'t finished successfuly')
 
         result = DODataset(auth_client=self.auth_client).name(output_name).download_stream()
-        enriched_dataframe = pandas.read_csv(result)
+        enriched_dataframe = pandas.read_csv(result, dtype=dtypes)
 
         return enriched_dataframe
 
+    @timelogger
+    def _execute_remote_enrichment(self, geodataframe, geom_type, variables, filters, aggregation):
+        # The rows are split in chunks that are uploaded and enriched concurrently
+        chunks = [
+            geodataframe.iloc[i:i + self.chunk_size] for i in range(0, geodataframe.shape[0], self.chunk_size)
+        ] or [geodataframe]
+        dtypes = self._get_dtypes(variables, aggregation)
+
+        enriched_dataframes = []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as executor:
+            futures = [
+                executor.submit(self._enrich_chunk, chunk, geom_type, variables, filters, aggregation, dtypes)
+                for chunk in chunks
+            ]
+
+            for done, future in enumerate(as_completed(futures), 1):
+                enriched_dataframes.append(future.result())
+                log.info('Enriched %s of %s chunks', done, len(chunks))
+
+        return pandas.concat(enriched_dataframes, ignore_index=True)
+
+    def _enrich_chunk(self, chunk, geom_type, variables, filters, aggregation, dtypes):
+        retry_times = self.retry_times
+        while True:
+            # A failed chunk is uploaded again to a new temporary table
+            temp_table_name = self._get_temp_table_name()
+            try:
+                uploaded_dataset = self._upload_data(temp_table_name, chunk)
+                return self._execute_enrichment(uploaded_dataset,
+                                                temp_table_name,
+                                                geom_type,
+                                                variables,
+                                                filters,
+                                                aggregation,
+                                                dtypes)
+            except (EnrichmentError, CartoException) as err:
+                retry_times -= 1
+                if retry_times <= 0:
+                    raise
+                log.warning('Chunk enrichment failed, retrying (%s): %s', retry_times, err)
+
+    @timelogger
+    def _execute_local_enrichment(self, geodataframe, geom_type, variables, filters, aggregation):
+        from .local_enrichment import enrich
+
+        return enrich(geodataframe, _ENRICHMENT_ID, geom_type, variables, filters, aggregation, AGGREGATION_DEFAULT,
+                      credentials=self.credentials, mirror_path=self.mirror_path)
+
+    def _get_dtypes(self, variables, aggregation):
+        dtypes = {_ENRICHMENT_ID: 'int64'}
+
+        for variable in Variable.get_list(variables):
+            db_type = str(variable.db_type).upper()
+            if db_type not in _NUMERIC_DB_TYPES:
+                continue
+
+            if aggregation == AGGREGATION_DEFAULT:
+                methods = variable.agg_method
+            elif isinstance(aggregation, dict):
+                methods = aggregation.get(variable.id, aggregation.get(variable.slug, variable.agg_method))
+            else:
+                methods = aggregation
+
+            methods = methods if isinstance(methods, list) else [methods]
+            for method in methods:
+                name = get_aggregated_column_name(variable.column_name, method, len(methods))
+                if str(method).upper() in _STRING_AGGREGATIONS:
+                    continue
+                if db_type in _INTEGER_DB_TYPES and (method is None or str(method).upper() in _INTEGER_AGGREGATIONS):
+                    dtypes[name] = 'Int64'
+                else:
+                    dtypes[name] = 'float64'
+
+        return dtypes
+
     def _merge(self, geodataframe, enriched_dataframe):
-        result = geodataframe.merge(enriched_dataframe, on=_ENRICHMENT_ID, how='left')
-        result.drop(_ENRICHMENT_ID, axis=1, inplace=True)
-        result.drop(_GEOM_COLUMN, axis=1, inplace=True)
+        ids = geodataframe.pop(_ENRICHMENT_ID).values
+        enriched_ids = enriched_dataframe[_ENRICHMENT_ID].values
+        enriched_columns = [column for column in enriched_dataframe.columns if column != _ENRICHMENT_ID]
+
+        if not pandas.Index(enriched_ids).is_unique or any(column in geodataframe for column in enriched_columns):
+            # Several enriched rows per geometry (polygons without aggregation) or overlapping columns.
+            # The left merge keeps the order of the source rows, repeated once per enriched row
+            geodataframe[_ENRICHMENT_ID] = ids
+            result = geodataframe.merge(enriched_dataframe, on=_ENRICHMENT_ID, how='left')
+            result.drop(_ENRICHMENT_ID, axis=1, inplace=True)
+            repeats = pandas.Series(enriched_ids).value_counts().reindex(ids, fill_value=1).values
+            result.index = geodataframe.index.repeat(repeats)
+            return result
 
-        return result
+        # The enrichment ids are the positions of the distinct geometries, so the enriched
+        # rows are aligned with the source rows by position (-1 for the rows not enriched)
+        positions = numpy.full(ids.max(initial=-1) + 1, -1)
+        positions[enriched_ids] = numpy.arange(len(enriched_ids))
+        rows = numpy.full(len(ids), -1)
+        rows[ids >= 0] = positions[ids[ids >= 0]]
+
+        for column in enriched_columns:
+            geodataframe[column] = pandas.api.extensions.take(enriched_dataframe[column].values, rows,
+                                                              allow_fill=True)
+
+        return geodataframe
 
     def _get_temp_table_name(self):
         id_tablename = uuid.uuid4().hex
         return 'temp_{id}'.format(id=id_tablename)
 
 
+def get_aggregated_column_name(column_name, method, methods_count=1):
+    """Return the name of an enriched column. When a variable is aggregated with several
+    methods, the name of each column is prefixed with the method (`sum_pop`, `avg_pop`)."""
+    if methods_count <= 1 or method is None:
+        return column_name
+    return '{}_{}'.format(str(method).lower(), column_name)
+
+
+def _geometry_ids(geometries):
+    # Null geometries get the -1 id and are not enriched
+    wkbs = [geometry.wkb if geometry is not None else None for geometry in geometries]
+    ids, _ = pandas.factorize(pandas.Series(wkbs, dtype=object))
+    return ids
+
+
 def _create_auth_client(credentials):
     return credentials.get_api_key_auth_client()
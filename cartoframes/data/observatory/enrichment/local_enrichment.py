@@ -0,0 +1,214 @@
+import re
+import operator
+
+import numpy as np
+import pandas as pd
+import geopandas
+
+from geopandas import GeoSeries
+
+from ..catalog.dataset import Dataset
+from ..catalog.variable import Variable
+from ..catalog.entity import GEOID_COL
+from .enrichment import GEOM_TYPE_POINTS
+from .enrichment_service import get_aggregated_column_name
+from ....exceptions import EnrichmentError
+
+# Equal-area projection used to compute the areas in square meters
+AREA_CRS = 'epsg:6933'
+
+DO_AREA_COL = 'do_area'
+DO_GEOID_COL = 'do_geoid'
+USER_AREA_COL = 'user_area'
+INTERSECTED_AREA_COL = 'intersected_area'
+
+# The spatial index `query` accepts several geometries since geopandas 0.12
+GEOPANDAS_BULK_QUERY = tuple(int(part) for part in re.findall(r'\d+', geopandas.__version__)[:2]) >= (0, 12)
+
+FILTER_PATTERN = re.compile(r'^\s*(=|!=|<>|<=|>=|<|>)\s*(.+?)\s*$')
+FILTER_OPERATORS = {
+    '=': operator.eq,
+    '!=': operator.ne,
+    '<>': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge
+}
+
+
+def _sum(values, weights, groups):
+    return (values * weights).groupby(groups).sum()
+
+
+def _string_agg(values, weights, groups):
+    return values.dropna().astype(str).groupby(groups).agg(','.join)
+
+
+def _array_agg(values, weights, groups):
+    return values.groupby(groups).agg(list)
+
+
+# The SUM aggregation interpolates the values by the proportion of the DO geography intersected
+LOCAL_AGGREGATIONS = {
+    'SUM': _sum,
+    'AVG': lambda values, weights, groups: values.groupby(groups).mean(),
+    'MIN': lambda values, weights, groups: values.groupby(groups).min(),
+    'MAX': lambda values, weights, groups: values.groupby(groups).max(),
+    'COUNT': lambda values, weights, groups: values.groupby(groups).count(),
+    'STRING_AGG': _string_agg,
+    'ARRAY_AGG': _array_agg
+}
+
+
+def enrich(geodataframe, enrichment_id, geom_type, variables, filters, aggregation, aggregation_default,
+           credentials=None, mirror_path=None):
+    """Enrich the geodataframe in-process with the data of the variables datasets, read from their
+    local mirrors (see :py:meth:`Dataset.sync`) or downloaded for the bounding box of the geodataframe.
+    It returns a DataFrame with the enrichment id column and the enriched columns."""
+    variables = Variable.get_list(variables)
+    bbox = tuple(geodataframe.total_bounds)
+    geometries = geodataframe.geometry.reset_index(drop=True)
+    ids = geodataframe[enrichment_id].values
+
+    result = None
+    for dataset_id, dataset_variables in _group_by_dataset(variables):
+        columns = [variable.column_name for variable in dataset_variables]
+        do_gdf = Dataset.get(dataset_id).to_dataframe(credentials, columns=columns, bbox=bbox,
+                                                      mirror_path=mirror_path, use_mirror=True)
+        do_gdf = _apply_filters(do_gdf, dataset_variables, filters)
+
+        left, right = _intersections(geometries, do_gdf.geometry)
+
+        if geom_type == GEOM_TYPE_POINTS:
+            enriched = _enrich_points(do_gdf, dataset_variables, left, right)
+        elif aggregation is None:
+            enriched = _enrich_polygons(geometries, do_gdf, dataset_variables, left, right)
+        else:
+            enriched = _enrich_polygons_aggregated(
+                geometries, do_gdf, dataset_variables, left, right, aggregation, aggregation_default)
+
+        enriched.insert(0, enrichment_id, ids[enriched.pop('__left').values])
+        result = enriched if result is None else result.merge(enriched, on=enrichment_id, how='outer')
+
+    return result if result is not None else pd.DataFrame({enrichment_id: []})
+
+
+def _group_by_dataset(variables):
+    groups = {}
+    for variable in variables:
+        groups.setdefault(variable.dataset, []).append(variable)
+    return groups.items()
+
+
+def _apply_filters(do_gdf, variables, filters):
+    if not filters:
+        return do_gdf
+
+    mask = np.ones(len(do_gdf), dtype=bool)
+    for variable in variables:
+        expressions = filters.get(variable.id, filters.get(variable.slug))
+        if expressions is None:
+            continue
+        if not isinstance(expressions, list):
+            expressions = [expressions]
+        for expression in expressions:
+            mask &= _filter_mask(do_gdf[variable.column_name], expression).values
+
+    return do_gdf[mask]
+
+
+def _filter_mask(series, expression):
+    match = FILTER_PATTERN.match(expression)
+    if match is None:
+        raise EnrichmentError('The filter "{}" is not supported by the local engine. '.format(expression) +
+                              'Valid operators are: {}'.format(', '.join(FILTER_OPERATORS.keys())))
+
+    op, literal = match.groups()
+    if literal[0] == literal[-1] and literal[0] in ['\'', '"']:
+        value = literal[1:-1]
+        series = series.astype(str)
+    else:
+        try:
+            value = float(literal)
+        except ValueError:
+            raise EnrichmentError('The filter value "{}" is not supported by the local engine.'.format(literal))
+
+    return FILTER_OPERATORS[op](series, value).fillna(False)
+
+
+def _intersections(geometries, do_geometries):
+    """Return the positions of the pairs of intersecting geometries, sorted by the source position,
+    with a single query of the spatial index of the DO geometries."""
+    if len(geometries) == 0 or len(do_geometries) == 0:
+        return np.array([], dtype=int), np.array([], dtype=int)
+
+    sindex = do_geometries.sindex
+    query = sindex.query if GEOPANDAS_BULK_QUERY else sindex.query_bulk
+    left, right = query(geometries.values, predicate='intersects')
+    order = np.lexsort((right, left))
+    return left[order].astype(int), right[order].astype(int)
+
+
+def _areas(geometries):
+    return GeoSeries(geometries, crs='epsg:4326').to_crs(AREA_CRS).area.values
+
+
+def _enrich_points(do_gdf, variables, left, right):
+    # Like the remote engine, a point in the boundary of several geographies gets a row for each one
+    enriched = pd.DataFrame({'__left': left})
+    for variable in variables:
+        enriched[variable.column_name] = do_gdf[variable.column_name].values[right]
+    enriched[DO_AREA_COL] = _areas(do_gdf.geometry.values[right])
+    return enriched
+
+
+def _enrich_polygons(geometries, do_gdf, variables, left, right):
+    do_geometries = do_gdf.geometry.values[right]
+    user_geometries = geometries.values[left]
+
+    enriched = pd.DataFrame({'__left': left})
+    for variable in variables:
+        enriched[variable.column_name] = do_gdf[variable.column_name].values[right]
+    enriched[DO_GEOID_COL] = do_gdf[GEOID_COL].values[right] if GEOID_COL in do_gdf else None
+    enriched[DO_AREA_COL] = _areas(do_geometries)
+    enriched[USER_AREA_COL] = _areas(user_geometries)
+    enriched[INTERSECTED_AREA_COL] = _areas(user_geometries.intersection(do_geometries))
+    return enriched
+
+
+def _enrich_polygons_aggregated(geometries, do_gdf, variables, left, right, aggregation, aggregation_default):
+    do_geometries = do_gdf.geometry.values[right]
+    do_areas = _areas(do_geometries)
+    intersected_areas = _areas(geometries.values[left].intersection(do_geometries))
+    weights = pd.Series(np.divide(intersected_areas, do_areas, out=np.zeros(len(left)), where=do_areas > 0))
+    groups = pd.Series(left)
+
+    enriched = pd.DataFrame({'__left': np.unique(left)}).set_index('__left', drop=False)
+    for variable in variables:
+        values = pd.Series(do_gdf[variable.column_name].values[right])
+        methods = _get_aggregations(variable, aggregation, aggregation_default)
+        for method in methods:
+            name = get_aggregated_column_name(variable.column_name, method, len(methods))
+            enriched[name] = LOCAL_AGGREGATIONS[method](values, weights, groups)
+
+    return enriched.reset_index(drop=True)
+
+
+def _get_aggregations(variable, aggregation, aggregation_default):
+    if aggregation == aggregation_default:
+        methods = variable.agg_method
+    elif isinstance(aggregation, dict):
+        methods = aggregation.get(variable.id, aggregation.get(variable.slug, variable.agg_method))
+    else:
+        methods = aggregation
+
+    if not methods:
+        return []
+
+    methods = [method.upper() for method in (methods if isinstance(methods, list) else [methods])]
+    for method in methods:
+        if method not in LOCAL_AGGREGATIONS:
+            raise EnrichmentError('The aggregation "{}" is not supported by the local engine. '.format(method) +
+                                  'Valid aggregations are: {}'.format(', '.join(LOCAL_AGGREGATIONS.keys())))
+    return methods
@@ -1,7 +1,13 @@
 from .geocoding import Geocoding
 from .isolines import Isolines
+from .routing import Routing
+from .preflight import preflight
+from .utils import IsolinesCache
 
 __all__ = [
     'Geocoding',
-    'Isolines'
+    'Isolines',
+    'IsolinesCache',
+    'Routing',
+    'preflight'
 ]
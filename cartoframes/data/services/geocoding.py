@@ -2,15 +2,22 @@
 
 import re
 
+from contextlib import ExitStack
+
 from .service import Service
 from .utils import geocoding_utils
 from .utils import geocoding_constants
 from .utils import TableGeocodingLock
+from .utils import PhaseTimer
 from ...utils.logger import log
 from ...io.managers.source_manager import SourceManager
 from ...io.carto import read_carto, to_carto, has_table, delete_table, rename_table, copy_table, create_table_from_query
 
 CARTO_INDEX_KEY = 'cartodb_id'
+EMPTY_SUMMARY = {s: 0 for s in [
+    'new_geocoded', 'new_nongeocoded',
+    'changed_geocoded', 'changed_nongeocoded',
+    'previously_geocoded', 'previously_nongeocoded']}
 
 
 class Geocoding(Service):
@@ -48,10 +55,17 @@ class Geocoding(Service):
     later ones will reuse the results stored in the ``my_data`` table. This will require extra processing
     time. If the CSV file should ever change, cached results will only be applied to unmodified
     records, and new geocoding will be performed only on new or changed records.
+
+    Args:
+        credentials (:py:class:`Credentials <cartoframes.auth.Credentials>`, optional):
+            instance of Credentials (username, api_key, etc).
+        observer (callable, optional): function called with the name and the elapsed
+            time in seconds of each phase of the process when it finishes.
     """
 
-    def __init__(self, credentials=None):
-        super(Geocoding, self).__init__(credentials=credentials, quota_service=geocoding_constants.QUOTA_SERVICE)
+    def __init__(self, credentials=None, observer=None):
+        super(Geocoding, self).__init__(credentials=credentials, quota_service=geocoding_constants.QUOTA_SERVICE,
+                                        observer=observer)
 
     def geocode(self, source, street,
                 city=None, state=None, country=None,
@@ -92,7 +106,8 @@ class Geocoding(Service):
             cached (bool, optional): Use cache geocoding results, saving the results in a
                 table. This parameter should be used along with ``table_name``.
             dry_run (bool, optional): no actual geocoding will be performed (useful to
-                check the needed quota)
+                check the needed quota). The quota of a dataframe without ``table_name`` is estimated
+                locally, without uploading it, and the metadata has ``estimated`` set to True.
             null_geom_value (Object, optional): value for the `the_geom` column when it's null.
                 Defaults to None
 
@@ -124,6 +139,11 @@ class Geocoding(Service):
             column and in general what attributes are added as columns can be configured by using a ``status``
             dictionary associating column names to status attribute.
 
+            The ``metadata`` also contains the ``timings`` in seconds of each phase of the process
+            (upload, summary, quota, lock, alter, geocode, download, cleanup and total), and the
+            ``rows_per_second`` and ``quota_per_second`` throughput. The phase timings are also
+            reported to the ``observer`` function of the service, if any.
+
         Raises:
             ValueError: if `chached` param is set without `table_name`.
 
@@ -153,6 +173,11 @@ class Geocoding(Service):
             >>> geocoded_gdf, metadata = Geocoding().geocode(gdf, street='address', dry_run=True)
             >>> print(metadata['required_quota'])
 
+            Find the slowest phase of a geocoding:
+
+            >>> geocoded_gdf, metadata = Geocoding().geocode(df, street='address')
+            >>> print(metadata['timings'])
+
             Filter results by relevance:
 
             >>> df = pandas.DataFrame([['Gran Vía 46', 'Madrid'], ['Ebro 1', 'Sevilla']], columns=['address','city'])
@@ -165,7 +190,19 @@ class Geocoding(Service):
             >>> # show rows with relevance greater than 0.7:
             >>> print(geocoded_gdf[geocoded_gdf['carto_geocode_relevance'] > 0.7, axis=1)])
         """
+        timer = PhaseTimer(self._observer)
+
+        result = self._geocode_source(source, street, city, state, country, status, table_name, if_exists,
+                                      dry_run, cached, null_geom_value, timer)
 
+        metadata = result.metadata
+        quota = metadata.get('required_quota') if not (dry_run or metadata.get('aborted')) else None
+        metadata.update(timer.metadata(rows=metadata.get('total_rows'), quota=quota))
+
+        return result
+
+    def _geocode_source(self, source, street, city, state, country, status, table_name, if_exists, dry_run,
+                        cached, null_geom_value, timer):
         self._source_manager = SourceManager(source, self._credentials)
 
         self.columns = self._source_manager.get_column_names()
@@ -174,26 +211,40 @@ class Geocoding(Service):
             if not table_name:
                 raise ValueError('There is no "table_name" to cache the data')
             return self._cached_geocode(source, table_name, street, city=city, state=state, country=country,
-                                        dry_run=dry_run, status=status)
+                                        dry_run=dry_run, status=status, timer=timer)
 
         city, state, country = [
             geocoding_utils.column_or_value_arg(arg, self.columns) for arg in [city, state, country]
         ]
 
-        input_table_name, is_temporary = self._table_for_geocoding(source, table_name, if_exists, dry_run)
+        if dry_run and not table_name and self._source_manager.is_dataframe():
+            # The quota required by a dataframe is estimated locally, without uploading it
+            with timer.phase('summary'):
+                summary = geocoding_utils.local_summary(self._source_manager.gdf, street, city, state, country)
+            metadata = {'estimated': True}
+            geocoding_utils.set_pre_summary_info(dict(EMPTY_SUMMARY, **summary), metadata)
+            return self.result(data=None, metadata=metadata)
+
+        with timer.phase('upload'):
+            input_table_name, is_temporary = self._table_for_geocoding(source, table_name, if_exists, dry_run)
 
-        metadata = self._geocode(input_table_name, street, city, state, country, status, dry_run)
+        metadata = self._geocode(input_table_name, street, city, state, country, status, dry_run, timer)
 
         if dry_run:
+            if is_temporary:
+                with timer.phase('cleanup'):
+                    delete_table(input_table_name, self._credentials, log_enabled=False)
             return self.result(data=None, metadata=metadata)
 
-        gdf = read_carto(input_table_name, self._credentials, null_geom_value=null_geom_value)
+        with timer.phase('download'):
+            gdf = read_carto(input_table_name, self._credentials, null_geom_value=null_geom_value)
 
         if self._source_manager.is_dataframe() and CARTO_INDEX_KEY in gdf:
             del gdf[CARTO_INDEX_KEY]
 
         if is_temporary:
-            delete_table(input_table_name, self._credentials, log_enabled=False)
+            with timer.phase('cleanup'):
+                delete_table(input_table_name, self._credentials, log_enabled=False)
 
         result = self.result(data=gdf, metadata=metadata)
 
@@ -201,7 +252,7 @@ class Geocoding(Service):
 
         return result
 
-    def _cached_geocode(self, source, table_name, street, city, state, country, status, dry_run):
+    def _cached_geocode(self, source, table_name, street, city, state, country, status, dry_run, timer):
         """Geocode a dataframe caching results into a table.
         If the same dataframe if geocoded repeatedly no credits will be spent.
         But note there is a time overhead related to uploading the dataframe to a
@@ -218,15 +269,17 @@ class Geocoding(Service):
                 raise ValueError('Cache table {} exists but is not a valid geocode table'.format(table_name))
 
         if geocoding_constants.HASH_COLUMN in self.columns or not has_cache:
-            return self.geocode(
-                source, street=street, city=city, state=state, status=status,
-                country=country, table_name=table_name, dry_run=dry_run, if_exists='replace')
+            return self._geocode_source(
+                source, street=street, city=city, state=state, status=status, country=country,
+                table_name=table_name, if_exists='replace', dry_run=dry_run, cached=None, null_geom_value=None,
+                timer=timer)
 
         tmp_table_name = self._new_temporary_table_name()
         if self._source_manager.is_table():
             raise ValueError('cached geocoding cannot be used with tables')
 
-        to_carto(source, tmp_table_name, self._credentials, log_enabled=False)
+        with timer.phase('upload'):
+            to_carto(source, tmp_table_name, self._credentials, log_enabled=False)
 
         _, status_columns = geocoding_utils.status_assignment_columns(status)
         add_columns = [c for c in status_columns if c[0] in cache_columns]
@@ -237,7 +290,8 @@ class Geocoding(Service):
             tmp_table=tmp_table_name,
             add_columns=','.join([
                 'ADD COLUMN IF NOT EXISTS {} {}'.format(name, type) for name, type in add_columns]))
-        self._execute_query(alter_sql)
+        with timer.phase('alter'):
+            self._execute_query(alter_sql)
 
         hcity, hstate, hcountry = [
             geocoding_utils.column_or_value_arg(arg, self.columns) for arg in [city, state, country]
@@ -247,34 +301,36 @@ class Geocoding(Service):
         columns_to_update = [c[0] for c in add_columns]
         columns_to_update.append('the_geom')
         columns_expr = ','.join(["""{c} = {t}.{c} """.format(t=table_name, c=c) for c in columns_to_update])
-        self._execute_query(
-            """
-            UPDATE {tmp_table}
-            SET {columns_to_update}
-            FROM {table} WHERE {hash_expr}={table}.{hash}
-            """.format(
-                tmp_table=tmp_table_name,
-                columns_to_update=columns_expr,
-                table=table_name,
-                hash=geocoding_constants.HASH_COLUMN,
-                hash_expr=hash_expr
-            ))
-
-        rename_table(
-            table_name=tmp_table_name,
-            new_table_name=table_name,
-            credentials=self._credentials,
-            if_exists='replace',
-            log_enabled=False
-        )
+        with timer.phase('cache'):
+            self._execute_query(
+                """
+                UPDATE {tmp_table}
+                SET {columns_to_update}
+                FROM {table} WHERE {hash_expr}={table}.{hash}
+                """.format(
+                    tmp_table=tmp_table_name,
+                    columns_to_update=columns_expr,
+                    table=table_name,
+                    hash=geocoding_constants.HASH_COLUMN,
+                    hash_expr=hash_expr
+                ))
+
+            rename_table(
+                table_name=tmp_table_name,
+                new_table_name=table_name,
+                credentials=self._credentials,
+                if_exists='replace',
+                log_enabled=False
+            )
 
         # TODO: should remove the cartodb_id column from the result
         # TODO: refactor to share code with geocode() and call self._geocode() here instead
         # actually to keep hashing knowledge encapsulated (AFW) this should be handled by
         # _geocode using an additional parameter for an input table
-        gdf, metadata = self.geocode(table_name, street=street, city=city, status=status,
-                                     state=state, country=country, dry_run=dry_run)
-        return self.result(data=gdf, metadata=metadata)
+        return self._geocode_source(
+            table_name, street=street, city=city, state=state, status=status, country=country,
+            table_name=None, if_exists='fail', dry_run=dry_run, cached=None, null_geom_value=None,
+            timer=timer)
 
     def _table_for_geocoding(self, source, table_name, if_exists, dry_run):
         is_temporary = False
@@ -301,9 +357,11 @@ class Geocoding(Service):
     # receiving geocoding results instead of storing in a table, etc.
     # But that would make transition to using AFW harder.
 
-    def _geocode(self, table_name, street, city=None, state=None, country=None, status=None, dry_run=False):
+    def _geocode(self, table_name, street, city=None, state=None, country=None, status=None, dry_run=False,
+                 timer=None):
         # Internal Geocoding implementation.
         # Geocode a table's rows not already geocoded in a dataset'
+        timer = timer or PhaseTimer(self._observer)
 
         log.debug('table_name = "%s"', table_name)
         log.debug('street = "%s"', street)
@@ -315,10 +373,7 @@ class Geocoding(Service):
 
         output = {}
 
-        summary = {s: 0 for s in [
-            'new_geocoded', 'new_nongeocoded',
-            'changed_geocoded', 'changed_nongeocoded',
-            'previously_geocoded', 'previously_nongeocoded']}
+        summary = dict(EMPTY_SUMMARY)
 
         # TODO: Use a single transaction so that reported changes (posterior - prior queries)
         # are only caused by the geocoding process. Note that no rollback should be
@@ -327,7 +382,8 @@ class Geocoding(Service):
         # hence a Python `with` statement is not used here.
         # transaction = connection.begin()
 
-        result = self._execute_prior_summary(table_name, street, city, state, country)
+        with timer.phase('summary'):
+            result = self._execute_prior_summary(table_name, street, city, state, country)
         if result:
             for row in result.get('rows'):
                 gc_state = row.get('gc_state')
@@ -339,18 +395,21 @@ class Geocoding(Service):
         aborted = False
 
         if not dry_run:
-            provider = self.provider()
+            with timer.phase('quota'):
+                provider = self.provider()
 
-            if provider not in ['google']:  # Geocoder providers without server quota (use the client API key)
-                available_quota = self.available_quota()
-                if output['required_quota'] > available_quota:
-                    raise Exception('Your CARTO account does not have enough Geocoding quota: {}/{}'.format(
-                        output['required_quota'],
-                        available_quota
-                    ))
+                if provider not in ['google']:  # Geocoder providers without server quota (use the client API key)
+                    available_quota = self.available_quota()
+                    if output['required_quota'] > available_quota:
+                        raise Exception('Your CARTO account does not have enough Geocoding quota: {}/{}'.format(
+                            output['required_quota'],
+                            available_quota
+                        ))
 
             if output['required_quota'] > 0:
-                with TableGeocodingLock(self._execute_query, table_name) as locked:
+                with ExitStack() as stack:
+                    with timer.phase('lock'):
+                        locked = stack.enter_context(TableGeocodingLock(self._execute_query, table_name))
                     if not locked:
                         output['error'] = 'The table is already being geocoded'
                         output['aborted'] = aborted = True
@@ -366,12 +425,14 @@ class Geocoding(Service):
                             table=table_name,
                             add_columns=','.join([
                                 'ADD COLUMN IF NOT EXISTS {} {}'.format(name, type) for name, type in add_columns]))
-                        self._execute_query(alter_sql)
+                        with timer.phase('alter'):
+                            self._execute_query(alter_sql)
 
                         log.debug("Executing query: %s", sql)
                         result = None
                         try:
-                            result = self._execute_long_running_query(sql)
+                            with timer.phase('geocode'):
+                                result = self._execute_long_running_query(sql)
                         except Exception as err:
                             log.error(err)
                             msg = str(err)
@@ -390,6 +451,8 @@ class Geocoding(Service):
                             # TODO
                             # transaction.commit()
 
+                        self._reset_quota_info()
+
                         if result and not aborted:
                             # Number of updated rows not available for batch queries
                             # output['updated_rows'] = result.rowcount
@@ -399,7 +462,8 @@ class Geocoding(Service):
                 if not aborted:
                     sql = geocoding_utils.posterior_summary_query(table_name)
                     log.debug("Executing result summary query: %s", sql)
-                    result = self._execute_query(sql)
+                    with timer.phase('summary'):
+                        result = self._execute_query(sql)
                     geocoding_utils.set_post_summary_info(summary, result, output)
 
         if not aborted:
@@ -1,8 +1,11 @@
+from geopandas import GeoDataFrame, GeoSeries
+
 from .service import Service
+from .utils.isolines_cache import cache_params
+from .utils.phase_timer import PhaseTimer
 from ...utils.logger import log
-from ...utils.geom_utils import set_geometry, has_geometry
 from ...io.managers.source_manager import SourceManager
-from ...io.carto import read_carto, to_carto, delete_table
+from ...io.carto import read_carto, to_carto, delete_table, GEOM_COLUMN_NAME
 
 QUOTA_SERVICE = 'isolines'
 DATA_RANGE_KEY = 'data_range'
@@ -12,10 +15,16 @@ CARTO_INDEX_KEY = 'cartodb_id'
 
 class Isolines(Service):
     """Time and distance Isoline services using CARTO dataservices.
+
+    Args:
+        credentials (:py:class:`Credentials <cartoframes.auth.Credentials>`, optional):
+            instance of Credentials (username, api_key, etc).
+        observer (callable, optional): function called with the name and the elapsed
+            time in seconds of each phase of the process when it finishes.
     """
 
-    def __init__(self, credentials=None):
-        super(Isolines, self).__init__(credentials, quota_service=QUOTA_SERVICE)
+    def __init__(self, credentials=None, observer=None):
+        super(Isolines, self).__init__(credentials, quota_service=QUOTA_SERVICE, observer=observer)
 
     def isochrones(self, source, ranges, **args):
         """isochrone areas.
@@ -32,6 +41,9 @@ class Isolines(Service):
                 containing the areas for smaller time values (so the area is reachable from the source
                 within the given time). When True, areas are exclusive, each one corresponding
                 time values between the immediately smaller range value (or zero) and the area range value.
+            local_rings (bool, optional): only applicable if exclusive is True. When True, the inclusive areas
+                are downloaded and the exclusive rings are computed locally instead of in the database.
+                Defaults to False.
             ascending (bool, optional): when True, the isochornes are sorted ascending by travel time,
                 and False (default) for the opposite case.
             table_name (str, optional): the resulting areas will be saved in a new
@@ -56,6 +68,9 @@ class Isolines(Service):
             source_col (str, optional): string indicating the source column name. This column will be used to reference
                 the generated isolines with the original geometry. By default it uses the `cartodb_id` column if exists,
                 or the index of the source `DataFrame`.
+            cache (:py:class:`IsolinesCache <cartoframes.data.services.IsolinesCache>`, optional): cache of
+                previously computed areas. Only the source points not found in the cache are sent to the
+                service, and the new areas are stored in it.
 
         Returns:
             A named-tuple ``(data, metadata)`` containing a ``data`` geopandas.GeoDataFrame
@@ -64,6 +79,10 @@ class Isolines(Service):
             geometry with the corresponding area. It will also contain a ``source_id`` column
             that identifies the source point corresponding to each area if the source has a
             ``cartodb_id`` column.
+            The metadata also contains the ``timings`` in seconds of each phase of the process
+            (upload, isolines, save, cleanup and total), and the ``rows_per_second`` and
+            ``quota_per_second`` throughput. The phase timings are also reported to the
+            ``observer`` function of the service, if any.
         """
         return self._iso_areas(source, ranges, function='isochrone', **args)
 
@@ -83,6 +102,9 @@ class Isolines(Service):
                 containing the areas for smaller distance values (so the area is reachable from the source
                 within the given distance). When True, areas are exclusive, each one corresponding
                 distance values between the immediately smaller range value (or zero) and the area range value.
+            local_rings (bool, optional): only applicable if exclusive is True. When True, the inclusive areas
+                are downloaded and the exclusive rings are computed locally instead of in the database.
+                Defaults to False.
             ascending (bool, optional): when True, the isochornes are sorted ascending by travel time,
                 and False (default) for the opposite case.
             table_name (str, optional): the resulting areas will be saved in a new
@@ -107,6 +129,9 @@ class Isolines(Service):
             source_col (str, optional): string indicating the source column name. This column will be used to reference
                 the generated isolines with the original geometry. By default it uses the `cartodb_id` column if exists,
                 or the index of the source `DataFrame`.
+            cache (:py:class:`IsolinesCache <cartoframes.data.services.IsolinesCache>`, optional): cache of
+                previously computed areas. Only the source points not found in the cache are sent to the
+                service, and the new areas are stored in it.
 
         Returns:
             A named-tuple ``(data, metadata)`` containing a ``data`` geopandas.GeoDataFrame
@@ -115,6 +140,10 @@ class Isolines(Service):
             geometry with the corresponding area. It will also contain a ``source_id`` column
             that identifies the source point corresponding to each area if the source has a
             ``cartodb_id`` column.
+            The metadata also contains the ``timings`` in seconds of each phase of the process
+            (upload, isolines, save, cleanup and total), and the ``rows_per_second`` and
+            ``quota_per_second`` throughput. The phase timings are also reported to the
+            ``observer`` function of the service, if any.
 
         Raises:
             Exception: if the available quota is less than the required quota.
@@ -136,71 +165,114 @@ class Isolines(Service):
                    maxpoints=None,
                    quality=None,
                    exclusive=False,
+                   local_rings=False,
                    ascending=False,
                    function=None,
                    geom_col=None,
-                   source_col=None):
+                   source_col=None,
+                   cache=None):
         metadata = {}
+        timer = PhaseTimer(self._observer)
 
         source_manager = SourceManager(source, self._credentials)
 
-        num_rows = source_manager.get_num_rows()
+        if source_col is None:
+            source_col = CARTO_INDEX_KEY
+
+        iso_function = '_cdb_{function}_exception_safe'.format(function=function)
+        options = {
+            'is_destination': is_destination,
+            'mode_type': mode_type,
+            'mode_traffic': mode_traffic,
+            'resolution': resolution,
+            'maxpoints': maxpoints,
+            'quality': quality
+        }
+
+        if cache is None:
+            num_rows = source_manager.get_num_rows()
+        else:
+            with timer.phase('cache'):
+                source_gdf = self._source_gdf(source_manager, geom_col)
+                params = cache_params(function, mode, options, self.provider())
+                origins = [cache.origin(geom) for geom in source_gdf.geometry]
+                areas = cache.get([o for o in origins if o is not None], params)
+                missing = _missing_origins(source_gdf, origins, areas, ranges)
+            num_rows = len(missing)
+            metadata['cached_rows'] = sum(1 for o in origins if o in areas and o not in missing)
+
         metadata['required_quota'] = num_rows * len(ranges)
 
         if dry_run:
             return self.result(data=None, metadata=metadata)
         else:
-            available_quota = self.available_quota()
+            with timer.phase('quota'):
+                available_quota = self.available_quota()
             if metadata['required_quota'] > available_quota:
                 raise Exception('Your CARTO account does not have enough Isolines quota: {}/{}'.format(
                     metadata['required_quota'],
                     available_quota
                 ))
 
-        if source_manager.is_remote():
-            temporary_table_name = False
-            source_query = source_manager.get_query()
-        else:
-            # upload to temporary table
-            temporary_table_name = self._new_temporary_table_name()
-            source_gdf = source_manager.gdf
-
-            if geom_col in source_gdf:
-                set_geometry(source_gdf, geom_col, inplace=True)
+        iso_options = ["'{}={}'".format(k, v) for k, v in options.items() if v is not None]
+        iso_options = "ARRAY[{opts}]".format(opts=','.join(iso_options))
+        iso_ranges = 'ARRAY[{ranges}]'.format(ranges=','.join([str(r) for r in ranges]))
 
-            if not has_geometry(source_gdf):
-                raise ValueError('No valid geometry found. Please provide an input source with ' +
-                                 'a valid geometry or specify the "geom_col" param with a geometry column.')
+        temporary_table_name = False
+
+        if cache is not None:
+            if missing:
+                # upload only the missing origins to a temporary table
+                temporary_table_name = self._new_temporary_table_name()
+                missing_gdf = GeoDataFrame(
+                    {CARTO_INDEX_KEY: range(1, len(missing) + 1)},
+                    geometry=list(missing.values()),
+                    crs=source_gdf.crs)
+                with timer.phase('upload'):
+                    to_carto(missing_gdf, temporary_table_name, self._credentials, log_enabled=False)
+                source_query = 'SELECT * FROM {table}'.format(table=temporary_table_name)
+
+                sql = _areas_query(source_query, CARTO_INDEX_KEY, iso_function, mode, iso_ranges, iso_options)
+                with timer.phase('isolines'):
+                    missing_areas = _areas_by_origin(read_carto(sql, self._credentials), list(missing.keys()))
+                with timer.phase('cache'):
+                    cache.set({o: a for o, a in missing_areas.items() if isinstance(o, str)}, params)
+                areas.update(missing_areas)
+
+            gdf = _cached_areas_gdf(source_gdf, source_col, origins, areas, ranges)
+
+            if exclusive:
+                with timer.phase('rings'):
+                    gdf = _rings(gdf)
+        else:
+            if source_manager.is_remote():
+                source_query = source_manager.get_query()
+            else:
+                # upload to temporary table
+                temporary_table_name = self._new_temporary_table_name()
+                source_gdf = self._source_gdf(source_manager, geom_col)
 
-            index_as_cartodbid = CARTO_INDEX_KEY not in source_gdf.columns
+                index_as_cartodbid = CARTO_INDEX_KEY not in source_gdf.columns
 
-            to_carto(source_gdf, temporary_table_name, self._credentials, index=index_as_cartodbid,
-                     index_label=CARTO_INDEX_KEY, log_enabled=False)
-            source_query = 'SELECT * FROM {table}'.format(table=temporary_table_name)
+                with timer.phase('upload'):
+                    to_carto(source_gdf, temporary_table_name, self._credentials, index=index_as_cartodbid,
+                             index_label=CARTO_INDEX_KEY, log_enabled=False)
+                source_query = 'SELECT * FROM {table}'.format(table=temporary_table_name)
 
-        if source_col is None:
-            source_col = CARTO_INDEX_KEY
+            sql = _areas_query(source_query, source_col, iso_function, mode, iso_ranges, iso_options)
 
-        iso_function = '_cdb_{function}_exception_safe'.format(function=function)
-        options = {
-            'is_destination': is_destination,
-            'mode_type': mode_type,
-            'mode_traffic': mode_traffic,
-            'resolution': resolution,
-            'maxpoints': maxpoints,
-            'quality': quality
-        }
-        iso_options = ["'{}={}'".format(k, v) for k, v in options.items() if v is not None]
-        iso_options = "ARRAY[{opts}]".format(opts=','.join(iso_options))
-        iso_ranges = 'ARRAY[{ranges}]'.format(ranges=','.join([str(r) for r in ranges]))
+            if exclusive and not local_rings:
+                sql = _rings_query(sql)
 
-        sql = _areas_query(source_query, source_col, iso_function, mode, iso_ranges, iso_options)
+            # Execute and download the query to generate the isolines
+            with timer.phase('isolines'):
+                gdf = read_carto(sql, self._credentials)
 
-        if exclusive:
-            sql = _rings_query(sql)
+            if exclusive and local_rings:
+                with timer.phase('rings'):
+                    gdf = _rings(gdf)
 
-        # Execute and download the query to generate the isolines
-        gdf = read_carto(sql, self._credentials)
+        self._reset_quota_info()
 
         # Recalculating `cartodb_id`
         gdf.reset_index(drop=True, inplace=True)
@@ -209,18 +281,21 @@ class Isolines(Service):
 
         if exclusive:
             # Add range label column
-            if len(gdf) > 0:
-                gdf[RANGE_LABEL_KEY] = gdf.apply(lambda r: '%.0f min.' % (r[DATA_RANGE_KEY]/60), axis=1)
+            gdf[RANGE_LABEL_KEY] = _range_labels(gdf[DATA_RANGE_KEY])
 
         if table_name:
             # save result in a table
-            to_carto(gdf, table_name, self._credentials, if_exists, log_enabled=dry_run)
+            with timer.phase('save'):
+                to_carto(gdf, table_name, self._credentials, if_exists, log_enabled=dry_run)
 
         if source_manager.is_dataframe() and CARTO_INDEX_KEY in gdf:
             del gdf[CARTO_INDEX_KEY]
 
         if temporary_table_name:
-            delete_table(temporary_table_name, self._credentials, log_enabled=False)
+            with timer.phase('cleanup'):
+                delete_table(temporary_table_name, self._credentials, log_enabled=False)
+
+        metadata.update(timer.metadata(rows=num_rows, quota=metadata['required_quota']))
 
         result = self.result(data=gdf, metadata=metadata)
 
@@ -228,6 +303,93 @@ class Isolines(Service):
 
         return result
 
+    def rings(self, data):
+        """Compute the exclusive ring areas from inclusive areas.
+
+        This allows to get both the inclusive and the exclusive areas from a single computation.
+
+        Args:
+            data (geopandas.GeoDataFrame): inclusive areas returned by :py:meth:`isochrones`
+                or :py:meth:`isodistances` with ``exclusive=False``.
+
+        Returns:
+            geopandas.GeoDataFrame with the same rows, where each area excludes the area of the
+            immediately smaller range of the same source. A ``lower_data_range`` column and a
+            ``range_label`` column are added.
+
+        Example:
+            >>> areas = Isolines().isochrones(df, [300, 600, 900]).data
+            >>> rings = Isolines().rings(areas)
+
+        """
+        gdf = _rings(data)
+        gdf[RANGE_LABEL_KEY] = _range_labels(gdf[DATA_RANGE_KEY])
+        return gdf
+
+
+def _missing_origins(source_gdf, origins, areas, ranges):
+    """Return the source geometries that need to be computed, indexed by their origin.
+    Geometries that can not be cached are indexed by their row position."""
+    ranges = [int(round(r)) for r in ranges]
+    missing = {}
+    for i, (origin, geom) in enumerate(zip(origins, source_gdf.geometry)):
+        if origin is None:
+            if geom is not None and not geom.is_empty:
+                missing[i] = geom
+        elif origin not in missing and any(r not in areas.get(origin, {}) for r in ranges):
+            missing[origin] = geom
+    return missing
+
+
+def _areas_by_origin(gdf, keys):
+    areas = {}
+    for source_id, data_range, geom in zip(gdf['source_id'], gdf[DATA_RANGE_KEY], gdf.geometry):
+        if geom is not None:
+            areas.setdefault(keys[int(source_id) - 1], {})[int(data_range)] = geom
+    return areas
+
+
+def _cached_areas_gdf(source_gdf, source_col, origins, areas, ranges):
+    if source_col in source_gdf.columns:
+        source_ids = source_gdf[source_col]
+    elif source_col == CARTO_INDEX_KEY:
+        source_ids = source_gdf.index
+    else:
+        raise ValueError('Source column "{}" not found.'.format(source_col))
+
+    rows = []
+    for i, (source_id, origin) in enumerate(zip(source_ids, origins)):
+        origin_areas = areas.get(i if origin is None else origin, {})
+        for data_range in ranges:
+            geom = origin_areas.get(int(round(data_range)))
+            if geom is not None:
+                rows.append((source_id, int(round(data_range)), geom))
+
+    gdf = GeoDataFrame(rows, columns=['source_id', DATA_RANGE_KEY, GEOM_COLUMN_NAME])
+    gdf.set_geometry(GEOM_COLUMN_NAME, inplace=True, crs='epsg:4326')
+    gdf.insert(0, CARTO_INDEX_KEY, range(1, len(gdf) + 1))
+    return gdf
+
+
+def _rings(gdf):
+    """Compute the exclusive ring areas locally, equivalent to `_rings_query`."""
+    geom_col = gdf.geometry.name
+    sorted_gdf = gdf.sort_values(['source_id', DATA_RANGE_KEY])
+    grouped = sorted_gdf.groupby('source_id', sort=False)
+    lower_geoms = GeoSeries(grouped[geom_col].shift(1), index=sorted_gdf.index, crs=gdf.crs)
+    has_lower = lower_geoms.notna()
+
+    rings = sorted_gdf.geometry.copy()
+    rings[has_lower] = sorted_gdf.geometry[has_lower].difference(lower_geoms[has_lower])
+
+    sorted_gdf.insert(
+        sorted_gdf.columns.get_loc(DATA_RANGE_KEY) + 1,
+        'lower_data_range',
+        grouped[DATA_RANGE_KEY].shift(1).fillna(0).astype(sorted_gdf[DATA_RANGE_KEY].dtype))
+    sorted_gdf[geom_col] = rings
+
+    return sorted_gdf.sort_index()
+
 
 def _areas_query(source_query, source_col, iso_function, mode, iso_ranges, iso_options):
     return """
@@ -259,6 +421,10 @@ def _areas_query(source_query, source_col, iso_function, mode, iso_ranges, iso_o
     )
 
 
+def _range_labels(data_range):
+    return (data_range / 60).round().astype(int).astype(str) + ' min.'
+
+
 def _rings_query(areas_query):
     return """
         SELECT
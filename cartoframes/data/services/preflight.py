@@ -0,0 +1,81 @@
+from pandas import DataFrame, Series
+
+from .geocoding import Geocoding
+from .isolines import Isolines
+from .routing import Routing
+
+JOB_SERVICES = {
+    'geocode': Geocoding,
+    'isochrones': Isolines,
+    'isodistances': Isolines,
+    'routes': Routing,
+    'matrix': Routing
+}
+
+# Geocoder providers without server quota (use the client API key)
+UNLIMITED_PROVIDERS = ['google']
+
+
+def preflight(jobs, credentials=None):
+    """Check the quota required by many planned data services jobs.
+
+    The required quota of each job is computed with a dry run, and the quota info of
+    all the services is fetched with a single query.
+
+    Args:
+        jobs (list): list of ``(method, args)`` tuples, where ``method`` is one of
+            ``'geocode'``, ``'isochrones'``, ``'isodistances'``, ``'routes'`` or ``'matrix'`` and ``args``
+            is a dictionary with the arguments of the method, e.g. ``('geocode', {'source': df, 'street': 'address'})``.
+        credentials (:py:class:`Credentials <cartoframes.auth.Credentials>`, optional):
+            instance of Credentials (username, api_key, etc).
+
+    Returns:
+        pandas.DataFrame with a row per job and the columns ``method``, ``service``, ``required_quota``,
+        ``cumulative_quota`` (the quota required by the job and all the previous jobs of the same service),
+        ``available_quota`` and ``fits`` (whether the cumulative quota is available).
+        The available quota is null for providers without server quota.
+
+    Raises:
+        ValueError: if a job method is not valid.
+
+    Example:
+        >>> preflight([
+        ...     ('geocode', {'source': 'stores', 'street': 'address'}),
+        ...     ('isochrones', {'source': 'depots', 'ranges': [600, 1200]})
+        ... ])
+
+    """
+    services = {}
+    rows = []
+
+    for method, args in jobs:
+        if method not in JOB_SERVICES:
+            raise ValueError('Wrong job method "{}". Valid methods are: {}'.format(
+                method, ', '.join(JOB_SERVICES.keys())))
+
+        service_class = JOB_SERVICES[method]
+        if service_class not in services:
+            services[service_class] = service_class(credentials)
+        service = services[service_class]
+
+        metadata = getattr(service, method)(dry_run=True, **args).metadata
+        rows.append((method, service._quota_service, metadata.get('required_quota', 0)))
+
+    quota_info = next(iter(services.values()))._quota_info_snapshot() if services else {}
+
+    df = DataFrame(rows, columns=['method', 'service', 'required_quota'])
+    df['cumulative_quota'] = df.groupby('service')['required_quota'].cumsum()
+    df['available_quota'] = Series(
+        [_available_quota(quota_info.get(service)) for service in df['service']], index=df.index, dtype=object)
+    df['fits'] = [
+        available is None or required <= available
+        for required, available in zip(df['cumulative_quota'], df['available_quota'])
+    ]
+
+    return df
+
+
+def _available_quota(info):
+    if info is None or info.get('provider') in UNLIMITED_PROVIDERS:
+        return None
+    return info.get('monthly_quota') - info.get('used_quota')
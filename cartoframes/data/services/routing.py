@@ -0,0 +1,288 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from pandas import concat
+from geopandas import GeoDataFrame
+
+from .service import Service
+from ...utils.logger import log
+from ...utils.geom_utils import set_geometry
+from ...io.managers.source_manager import SourceManager
+from ...io.carto import GEOM_COLUMN_NAME
+
+QUOTA_SERVICE = 'routing'
+CARTO_INDEX_KEY = 'cartodb_id'
+DEFAULT_CHUNK_SIZE = 100
+DEFAULT_MAX_WORKERS = 4
+ROUTE_COLUMNS = ['origin_id', 'destination_id', 'duration', 'length']
+POSITION_KEY = '__position'
+
+
+class Routing(Service):
+    """Routing services using CARTO dataservices.
+    """
+
+    def __init__(self, credentials=None):
+        super(Routing, self).__init__(credentials, quota_service=QUOTA_SERVICE)
+
+    def routes(self, origins, destinations, **args):
+        """Routes between pairs of points.
+
+        This method computes the route from each origin point to the destination point in the same position.
+
+        Args:
+            origins (str, pandas.DataFrame, geopandas.GeoDataFrame):
+                table, SQL query or DataFrame containing the origin points.
+            destinations (str, pandas.DataFrame, geopandas.GeoDataFrame):
+                table, SQL query or DataFrame containing the destination points. It must have the
+                same number of rows as the origins.
+            mode (str, optional): defines the travel mode: ``'car'`` (the default), ``'walk'``,
+                ``'bicycle'`` or ``'public_transport'``.
+            mode_type (str, optional): type of routes computed: ``'shortest'`` (default) or ``'fastest'``.
+            units (str, optional): units of the route length: ``'kilometers'`` (default) or ``'miles'``.
+            geometry (bool, optional): include the route geometries in the result. Defaults to True.
+            dry_run (bool, optional): no actual computation will be performed,
+                and metadata will be returned including the required quota.
+            chunk_size (int, optional): number of routes computed in each request. Defaults to 100.
+            max_workers (int, optional): maximum number of concurrent requests. Defaults to 4.
+            geom_col (str, optional): string indicating the geometry column name in the source `DataFrame`.
+            source_col (str, optional): string indicating the column used to identify the points.
+                By default it uses the `cartodb_id` column if exists, or the index of the source `DataFrame`.
+
+        Returns:
+            A named-tuple ``(data, metadata)`` containing a ``data`` geopandas.GeoDataFrame
+            and a ``metadata`` dictionary. For dry runs the data will be ``None``.
+            The data contains the ``origin_id`` and ``destination_id`` columns, the route ``duration``
+            in seconds, the route ``length`` and the route geometry.
+
+        Raises:
+            Exception: if the available quota is less than the required quota.
+            ValueError: if the origins and destinations don't have the same number of rows.
+        """
+        return self._routes(origins, destinations, matrix=False, **args)
+
+    def matrix(self, origins, destinations=None, **args):
+        """Origin-destination matrix.
+
+        This method computes the routes from every origin point to every destination point.
+        The pairs are computed in chunks by concurrent requests, and repeated pairs are computed only once.
+
+        Args:
+            origins (str, pandas.DataFrame, geopandas.GeoDataFrame):
+                table, SQL query or DataFrame containing the origin points.
+            destinations (str, pandas.DataFrame, geopandas.GeoDataFrame, optional):
+                table, SQL query or DataFrame containing the destination points.
+                By default the origins are used as destinations.
+            symmetric (bool, optional): when True, the route from A to B is considered equivalent to the
+                route from B to A, so only one of them is computed. Note that the geometry of the
+                reused routes keeps the direction of the computed one. Defaults to False.
+            mode (str, optional): defines the travel mode: ``'car'`` (the default), ``'walk'``,
+                ``'bicycle'`` or ``'public_transport'``.
+            mode_type (str, optional): type of routes computed: ``'shortest'`` (default) or ``'fastest'``.
+            units (str, optional): units of the route length: ``'kilometers'`` (default) or ``'miles'``.
+            geometry (bool, optional): include the route geometries in the result. Defaults to True.
+            dry_run (bool, optional): no actual computation will be performed,
+                and metadata will be returned including the required quota.
+            chunk_size (int, optional): number of routes computed in each request. Defaults to 100.
+            max_workers (int, optional): maximum number of concurrent requests. Defaults to 4.
+            geom_col (str, optional): string indicating the geometry column name in the source `DataFrame`.
+            source_col (str, optional): string indicating the column used to identify the points.
+                By default it uses the `cartodb_id` column if exists, or the index of the source `DataFrame`.
+
+        Returns:
+            A named-tuple ``(data, metadata)`` containing a ``data`` geopandas.GeoDataFrame
+            and a ``metadata`` dictionary. For dry runs the data will be ``None``.
+            The data contains the ``origin_id`` and ``destination_id`` columns, the route ``duration``
+            in seconds, the route ``length`` and the route geometry.
+
+        Raises:
+            Exception: if the available quota is less than the required quota.
+
+        Example:
+            >>> travel_times = Routing().matrix(stores, geometry=False, symmetric=True).data
+        """
+        return self._routes(origins, destinations, matrix=True, **args)
+
+    def iter_matrix(self, origins, destinations=None, **args):
+        """Origin-destination matrix computed incrementally.
+
+        It accepts the same arguments as :py:meth:`matrix` (except ``dry_run``), but instead of
+        returning the whole result at the end, it yields a geopandas.GeoDataFrame for each chunk of
+        routes as soon as it is computed.
+
+        Example:
+            >>> for chunk in Routing().iter_matrix(stores, warehouses, geometry=False):
+            ...     to_carto(chunk, 'travel_times', if_exists='append')
+        """
+        pairs, tasks = self._prepare_pairs(origins, destinations, matrix=True, **_pairs_args(args))
+        self._check_quota(len(tasks))
+        for gdf in self._compute_routes(pairs, tasks, **_routes_args(args)):
+            yield gdf.drop(columns=[POSITION_KEY])
+
+    def _routes(self, origins, destinations, matrix, dry_run=False, **args):
+        metadata = {}
+
+        pairs, tasks = self._prepare_pairs(origins, destinations, matrix=matrix, **_pairs_args(args))
+
+        metadata['required_quota'] = len(tasks)
+
+        if dry_run:
+            return self.result(data=None, metadata=metadata)
+
+        self._check_quota(metadata['required_quota'])
+
+        chunks = list(self._compute_routes(pairs, tasks, **_routes_args(args)))
+        if chunks:
+            gdf = concat(chunks).sort_values(POSITION_KEY).drop(columns=[POSITION_KEY])
+            gdf.reset_index(drop=True, inplace=True)
+        else:
+            gdf = _routes_gdf([], args.get('geometry', True))
+
+        result = self.result(data=gdf, metadata=metadata)
+
+        log.info('Success! Routes computed correctly')
+
+        return result
+
+    def _check_quota(self, required_quota):
+        available_quota = self.available_quota()
+        if required_quota > available_quota:
+            raise Exception('Your CARTO account does not have enough Routing quota: {}/{}'.format(
+                required_quota,
+                available_quota
+            ))
+
+    def _prepare_pairs(self, origins, destinations, matrix, symmetric=False, geom_col=None, source_col=None):
+        origin_points = self._source_points(origins, geom_col, source_col)
+        if destinations is None:
+            destination_points = origin_points
+        else:
+            destination_points = self._source_points(destinations, geom_col, source_col)
+
+        if matrix:
+            pairs = [(o, d) for o in origin_points for d in destination_points]
+        elif len(origin_points) != len(destination_points):
+            raise ValueError('The origins and destinations must have the same number of rows.')
+        else:
+            pairs = list(zip(origin_points, destination_points))
+
+        # Each distinct pair of coordinates is a task, computed only once
+        tasks = {}
+        task_pairs = []
+        for (o_id, o_point), (d_id, d_point) in pairs:
+            key = _task_key(o_point, d_point, symmetric)
+            if o_point != d_point:
+                tasks.setdefault(key, (o_point, d_point))
+            task_pairs.append((o_id, d_id, key))
+
+        return task_pairs, tasks
+
+    def _source_points(self, source, geom_col, source_col):
+        source_manager = SourceManager(source, self._credentials)
+        source_gdf = self._source_gdf(source_manager, geom_col)
+
+        if source_col is None:
+            source_col = CARTO_INDEX_KEY
+
+        if source_col in source_gdf.columns:
+            source_ids = source_gdf[source_col]
+        elif source_col == CARTO_INDEX_KEY:
+            source_ids = source_gdf.index
+        else:
+            raise ValueError('Source column "{}" not found.'.format(source_col))
+
+        points = []
+        for source_id, geom in zip(source_ids, source_gdf.geometry):
+            if geom is None or geom.is_empty:
+                continue
+            if geom.geom_type != 'Point':
+                raise ValueError('Wrong geometry type "{}". Only points are supported.'.format(geom.geom_type))
+            points.append((source_id, (geom.x, geom.y)))
+        return points
+
+    def _compute_routes(self, pairs, tasks, mode='car', mode_type=None, units='kilometers', geometry=True,
+                        chunk_size=DEFAULT_CHUNK_SIZE, max_workers=DEFAULT_MAX_WORKERS):
+        # Pairs with the same origin and destination don't need a route
+        pairs_by_task = {}
+        zero_routes = []
+        for position, (o_id, d_id, key) in enumerate(pairs):
+            if key in tasks:
+                pairs_by_task.setdefault(key, []).append((position, o_id, d_id))
+            else:
+                zero_routes.append((position, o_id, d_id, 0, 0, None))
+
+        if zero_routes:
+            yield _routes_gdf(zero_routes, geometry)
+
+        keys = list(tasks.keys())
+        chunks = [keys[i:i + chunk_size] for i in range(0, len(keys), chunk_size)]
+        options = ["'mode_type={}'".format(mode_type)] if mode_type is not None else []
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(self._execute_query, _routes_query(
+                    [tasks[key] for key in chunk], mode, options, units, geometry))
+                for chunk in chunks
+            ]
+            chunk_by_future = dict(zip(futures, chunks))
+
+            for future in as_completed(futures):
+                chunk = chunk_by_future[future]
+                result = future.result()
+                rows = []
+                for row in result.get('rows'):
+                    for position, o_id, d_id in pairs_by_task[chunk[row.get('pair_id')]]:
+                        rows.append((position, o_id, d_id, row.get('duration'), row.get('length'),
+                                     row.get(GEOM_COLUMN_NAME)))
+                yield _routes_gdf(rows, geometry)
+
+        self._reset_quota_info()
+
+
+def _pairs_args(args):
+    return {k: args[k] for k in ['symmetric', 'geom_col', 'source_col'] if k in args}
+
+
+def _routes_args(args):
+    return {k: v for k, v in args.items() if k not in ['symmetric', 'geom_col', 'source_col']}
+
+
+def _task_key(o_point, d_point, symmetric):
+    return tuple(sorted([o_point, d_point])) if symmetric else (o_point, d_point)
+
+
+def _routes_gdf(rows, geometry):
+    columns = [POSITION_KEY] + ROUTE_COLUMNS + [GEOM_COLUMN_NAME]
+    gdf = GeoDataFrame(rows, columns=columns)
+    if geometry:
+        set_geometry(gdf, GEOM_COLUMN_NAME, inplace=True, crs='epsg:4326')
+    else:
+        del gdf[GEOM_COLUMN_NAME]
+    return gdf
+
+
+def _routes_query(points, mode, options, units, geometry):
+    return """
+        SELECT
+          pair_id,
+          (_route).duration,
+          (_route).length{the_geom}
+        FROM (
+          SELECT
+            pair_id,
+            cdb_route_point_to_point(
+                ST_SetSRID(ST_MakePoint(o_x, o_y), 4326),
+                ST_SetSRID(ST_MakePoint(d_x, d_y), 4326),
+                '{mode}',
+                ARRAY[{options}]::text[],
+                '{units}'
+            ) AS _route
+          FROM (VALUES {values}) AS _pairs(pair_id, o_x, o_y, d_x, d_y)
+        ) _routes
+    """.format(
+        the_geom=',\n          (_route).shape AS {}'.format(GEOM_COLUMN_NAME) if geometry else '',
+        mode=mode,
+        options=','.join(options),
+        units=units,
+        values=','.join(
+            '({}, {}, {}, {}, {})'.format(i, o[0], o[1], d[0], d[1]) for i, (o, d) in enumerate(points))
+    )
@@ -1,10 +1,16 @@
+import time
+import threading
+
 from collections import namedtuple
 
+from ...io.carto import read_carto
 from ...io.managers.context_manager import ContextManager
+from ...utils.geom_utils import set_geometry, has_geometry
 from ...utils.utils import create_tmp_name
 
-SERVICE_KEYS = ('hires_geocoder', 'isolines')
+SERVICE_KEYS = ('hires_geocoder', 'isolines', 'routing')
 QUOTA_INFO_KEYS = ('monthly_quota', 'used_quota', 'soft_limit', 'provider')
+QUOTA_INFO_TTL = 10  # seconds
 
 
 Result = namedtuple('Result', ['data', 'metadata'])
@@ -12,10 +18,14 @@ Result = namedtuple('Result', ['data', 'metadata'])
 
 class Service:
 
-    def __init__(self, credentials=None, quota_service=None):
+    def __init__(self, credentials=None, quota_service=None, observer=None):
         self._context_manager = ContextManager(credentials)
         self._credentials = self._context_manager.credentials
         self._quota_service = quota_service
+        self._observer = observer
+        self._quota_snapshot = None
+        self._quota_snapshot_time = None
+        self._quota_snapshot_lock = threading.Lock()
         if self._quota_service not in SERVICE_KEYS:
             raise ValueError('Invalid service "{}" valid services are: {}'.format(
                 self._quota_service,
@@ -23,11 +33,25 @@ class Service:
             ))
 
     def _quota_info(self, service):
-        result = self._execute_query('SELECT * FROM cdb_service_quota_info()')
-        for row in result.get('rows'):
-            if row.get('service') == service:
-                return {k: row.get(k) for k in QUOTA_INFO_KEYS}
-        return None
+        return self._quota_info_snapshot().get(service)
+
+    def _quota_info_snapshot(self):
+        # The quota info of all the services is fetched in a single query and reused by this
+        # service during QUOTA_INFO_TTL seconds, or until it is reset after spending quota
+        with self._quota_snapshot_lock:
+            if self._quota_snapshot is not None and time.time() - self._quota_snapshot_time <= QUOTA_INFO_TTL:
+                return self._quota_snapshot
+
+            result = self._execute_query('SELECT * FROM cdb_service_quota_info()')
+            self._quota_snapshot = {
+                row.get('service'): {k: row.get(k) for k in QUOTA_INFO_KEYS} for row in result.get('rows')
+            }
+            self._quota_snapshot_time = time.time()
+            return self._quota_snapshot
+
+    def _reset_quota_info(self):
+        with self._quota_snapshot_lock:
+            self._quota_snapshot = None
 
     def provider(self):
         info = self._quota_info(self._quota_service)
@@ -55,3 +79,18 @@ class Service:
 
     def _execute_long_running_query(self, query):
         return self._context_manager.execute_long_running_query(query)
+
+    def _source_gdf(self, source_manager, geom_col):
+        if source_manager.is_remote():
+            return read_carto(source_manager.get_query(), self._credentials)
+
+        source_gdf = source_manager.gdf
+
+        if geom_col in source_gdf:
+            set_geometry(source_gdf, geom_col, inplace=True)
+
+        if not has_geometry(source_gdf):
+            raise ValueError('No valid geometry found. Please provide an input source with ' +
+                             'a valid geometry or specify the "geom_col" param with a geometry column.')
+
+        return source_gdf
@@ -1,9 +1,13 @@
 from . import geocoding_constants
 from . import geocoding_utils
 from .table_geocoding_lock import TableGeocodingLock
+from .isolines_cache import IsolinesCache
+from .phase_timer import PhaseTimer
 
 __all__ = [
   'geocoding_constants',
   'geocoding_utils',
-  'TableGeocodingLock'
+  'TableGeocodingLock',
+  'IsolinesCache',
+  'PhaseTimer'
 ]
@@ -1,7 +1,12 @@
 
+import math
 import logging
 import hashlib
+import numpy as np
+
+from decimal import Decimal
 from . import geocoding_constants
+from ....utils.geom_utils import has_geometry
 
 __all__ = [
     'lock',
@@ -13,6 +18,7 @@ __all__ = [
     'prior_summary_query',
     'first_time_summary_query',
     'posterior_summary_query',
+    'local_summary',
     'geocode_query',
     'status_column',
     'column_assignment',
@@ -119,6 +125,77 @@ def first_time_summary_query(table, street, city, state, country):
     )
 
 
+def local_summary(gdf, street, city, state, country):
+    """Estimate the count of the rows of a local GeoDataFrame by geocoding state, like the prior summary
+    queries do with the rows of a table. The hashes are computed with the text output of PostgreSQL
+    for strings, numbers, booleans and nulls; the rows with other types may be counted as changed."""
+    summary = {}
+    has_geom = gdf.geometry.notnull().values if has_geometry(gdf) else [False] * len(gdf)
+
+    if geocoding_constants.HASH_COLUMN in gdf:
+        hashes = gdf[geocoding_constants.HASH_COLUMN].values
+        expected_hashes = local_hashes(gdf, street, city, state, country)
+    else:
+        hashes = expected_hashes = [None] * len(gdf)
+
+    for row_hash, expected_hash, geom in zip(hashes, expected_hashes, has_geom):
+        if not isinstance(row_hash, str):
+            prefix = 'new'
+        elif row_hash != expected_hash:
+            prefix = 'changed'
+        else:
+            prefix = 'previously'
+        gc_state = '{}_{}'.format(prefix, 'geocoded' if geom else 'nongeocoded')
+        summary[gc_state] = summary.get(gc_state, 0) + 1
+
+    return summary
+
+
+def local_hashes(gdf, street, city, state, country):
+    """Compute for each row of a local DataFrame the (estimated) value of `hash_expr`."""
+    values = [_local_values(gdf, arg) for arg in (street, city, state, country)]
+    return [hashlib.md5('<>'.join(row).encode('utf-8')).hexdigest() for row in zip(*values)]
+
+
+def _local_values(gdf, arg):
+    if arg is None:
+        return [''] * len(gdf)
+    if arg[0] == "'":
+        return [arg[1:-1]] * len(gdf)
+    return [_local_text(value) for value in gdf[arg].values]
+
+
+def _local_text(value):
+    # Text output of the values in the database (concat ignores the nulls)
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ''
+    if isinstance(value, (bool, np.bool_)):
+        return 'true' if value else 'false'
+    if isinstance(value, float):
+        return _float_text(value)
+    return str(value)
+
+
+def _float_text(value):
+    # Shortest text that reads back as the same double precision value, like PostgreSQL 12+:
+    # positional notation for decimal exponents from -4 to 14, and scientific notation for the rest
+    if math.isinf(value):
+        return 'Infinity' if value > 0 else '-Infinity'
+    if value == 0:
+        return '-0' if math.copysign(1, value) < 0 else '0'
+
+    number = Decimal(repr(float(value))).normalize()
+    exponent = number.adjusted()
+    if -4 <= exponent < 15:
+        return '{:f}'.format(number)
+
+    sign, digits, _ = number.as_tuple()
+    mantissa = ''.join(map(str, digits))
+    if len(mantissa) > 1:
+        mantissa = '{}.{}'.format(mantissa[0], mantissa[1:])
+    return '{}{}e{:+03d}'.format('-' if sign else '', mantissa, exponent)
+
+
 def posterior_summary_query(table):
     return """
     SELECT COUNT(*) AS count
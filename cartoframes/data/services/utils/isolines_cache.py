@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import sqlite3
+import appdirs
+
+from shapely import wkb
+
+DEFAULT_CACHE_DIR = appdirs.user_cache_dir('cartoframes')
+DEFAULT_CACHE_FILENAME = 'isolines_cache.sqlite'
+DEFAULT_PRECISION = 5
+
+# Maximum number of origins included in a single lookup statement
+LOOKUP_CHUNK_SIZE = 500
+
+
+class IsolinesCache:
+    """Persistent local cache of isoline areas.
+
+    Areas are stored in a SQLite file and keyed by the origin coordinates (rounded to
+    ``precision`` decimals), the isoline function, the travel mode, the range, the
+    routing options and the data services provider, so a change in any of them
+    produces a cache miss.
+
+    Args:
+        path (str, optional): path of the cache file. By default it is stored in the
+            user cache directory.
+        ttl (int, optional): time to live of the cached areas in seconds.
+            By default cached areas never expire.
+        precision (int, optional): number of decimals of the origin coordinates
+            used in the cache keys. Defaults to 5 (about 1 meter).
+
+    Example:
+        >>> cache = IsolinesCache(ttl=7 * 24 * 3600)
+        >>> Isolines().isochrones(df, [300, 600], cache=cache)
+
+    """
+
+    def __init__(self, path=None, ttl=None, precision=DEFAULT_PRECISION):
+        if path is None:
+            if not os.path.exists(DEFAULT_CACHE_DIR):
+                os.makedirs(DEFAULT_CACHE_DIR)
+            path = os.path.join(DEFAULT_CACHE_DIR, DEFAULT_CACHE_FILENAME)
+
+        self._path = path
+        self._ttl = ttl
+        self._precision = precision
+        self._connection = sqlite3.connect(path)
+        with self._connection:
+            self._connection.execute(_create_table_query())
+
+    @property
+    def path(self):
+        return self._path
+
+    def origin(self, geometry):
+        """Return the cache key of a source point, or None if it can not be cached."""
+        if geometry is None or geometry.is_empty or geometry.geom_type != 'Point':
+            return None
+        return '{x:.{p}f},{y:.{p}f}'.format(x=geometry.x, y=geometry.y, p=self._precision)
+
+    def get(self, origins, params):
+        """Return the cached areas for the given origins as a dictionary
+        ``{origin: {data_range: geometry}}``. Expired areas are ignored."""
+        origins = list(set(origins))
+        min_created = time.time() - self._ttl if self._ttl is not None else None
+        areas = {}
+
+        for i in range(0, len(origins), LOOKUP_CHUNK_SIZE):
+            chunk = origins[i:i + LOOKUP_CHUNK_SIZE]
+            rows = self._connection.execute(
+                _select_query(len(chunk), min_created is not None),
+                [params] + chunk + ([min_created] if min_created is not None else []))
+            for origin, data_range, geom in rows:
+                areas.setdefault(origin, {})[data_range] = wkb.loads(geom)
+
+        return areas
+
+    def set(self, areas, params):
+        """Store areas given as a dictionary ``{origin: {data_range: geometry}}``."""
+        created = time.time()
+        values = [
+            (params, origin, data_range, wkb.dumps(geom), created)
+            for origin, ranges in areas.items()
+            for data_range, geom in ranges.items()
+            if geom is not None
+        ]
+        with self._connection:
+            self._connection.executemany(_insert_query(), values)
+
+    def purge(self):
+        """Remove the expired areas from the cache."""
+        if self._ttl is not None:
+            with self._connection:
+                self._connection.execute(_delete_expired_query(), [time.time() - self._ttl])
+
+    def clear(self):
+        """Remove all the areas from the cache."""
+        with self._connection:
+            self._connection.execute('DELETE FROM isolines')
+
+    def close(self):
+        self._connection.close()
+
+
+def cache_params(function, mode, options, provider):
+    return json.dumps({
+        'function': function,
+        'mode': mode,
+        'options': {k: v for k, v in options.items() if v is not None},
+        'provider': provider
+    }, sort_keys=True)
+
+
+def _create_table_query():
+    return '''
+        CREATE TABLE IF NOT EXISTS isolines (
+            params TEXT NOT NULL,
+            origin TEXT NOT NULL,
+            data_range INTEGER NOT NULL,
+            geom BLOB NOT NULL,
+            created REAL NOT NULL,
+            PRIMARY KEY (params, origin, data_range)
+        )
+    '''
+
+
+def _select_query(num_origins, expires):
+    return '''
+        SELECT origin, data_range, geom FROM isolines
+        WHERE params = ? AND origin IN ({origins}){expires}
+    '''.format(
+        origins=','.join(['?'] * num_origins),
+        expires=' AND created >= ?' if expires else ''
+    )
+
+
+def _insert_query():
+    return 'INSERT OR REPLACE INTO isolines VALUES (?, ?, ?, ?, ?)'
+
+
+def _delete_expired_query():
+    return 'DELETE FROM isolines WHERE created < ?'
@@ -0,0 +1,48 @@
+import time
+
+from contextlib import contextmanager
+
+from ....utils.logger import log
+
+
+class PhaseTimer:
+    """Measure the time spent in each phase of a data services operation.
+
+    Args:
+        observer (callable, optional): function called with the phase name and
+            its elapsed time in seconds each time a phase finishes.
+
+    Example:
+        >>> timer = PhaseTimer(lambda phase, seconds: print(phase, seconds))
+        >>> with timer.phase('upload'):
+        ...     to_carto(df, 'table_name')
+
+    """
+
+    def __init__(self, observer=None):
+        self._observer = observer
+        self._start = time.time()
+        self.timings = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.time()
+        try:
+            yield
+        finally:
+            elapsed = time.time() - start
+            self.timings[name] = self.timings.get(name, 0) + elapsed
+            log.debug('%s in %s s', name, round(elapsed, 2))
+            if self._observer is not None:
+                self._observer(name, elapsed)
+
+    def metadata(self, rows=None, quota=None):
+        """Return the timings (including the total time) and the throughput of the operation."""
+        total = time.time() - self._start
+        metadata = {'timings': dict(self.timings, total=total)}
+        if total > 0:
+            if rows is not None:
+                metadata['rows_per_second'] = rows / total
+            if quota is not None:
+                metadata['quota_per_second'] = quota / total
+        return metadata
@@ -76,7 +76,7 @@ def read_carto(source, credentials=None, limit=None, retry_times=3, schema=None,
 @send_metrics('data_uploaded')
 def to_carto(dataframe, table_name, credentials=None, if_exists='fail', geom_col=None, index=False, index_label=None,
              cartodbfy=True, log_enabled=True, retry_times=3, max_upload_size=MAX_UPLOAD_SIZE_BYTES,
-             skip_quota_warning=False):
+             skip_quota_warning=False, atomic=False):
     """Upload a DataFrame to CARTO. The geometry's CRS must be WGS 84 (EPSG:4326) so you can use it on CARTO.
 
     Args:
@@ -99,6 +99,10 @@ def to_carto(dataframe, table_name, credentials=None, if_exists='fail', geom_col
         skip_quota_warning (bool, optional): skip the quota exceeded check and force the upload.
             (The upload will still fail if the size of the dataset exceeds the remaining DB quota).
             Default is False.
+        atomic (bool, optional): when replacing a table, upload the data to a shadow table and swap
+            it with the existing table in a single transaction, so the table is never seen empty or
+            partially uploaded. The new table doesn't keep the privacy of the replaced one.
+            Default is False.
 
     Returns:
         string: the table name normalized.
@@ -166,10 +170,13 @@ def to_carto(dataframe, table_name, credentials=None, if_exists='fail', geom_col
     chunk_row_size = int(math.ceil(len(gdf) / chunk_count))
     chunked_gdf = [gdf[i:i + chunk_row_size] for i in range(0, gdf.shape[0], chunk_row_size)]
 
-    for i, chunk in enumerate(chunked_gdf):
-        if i > 0:
-            if_exists = 'append'
-        table_name = context_manager.copy_from(chunk, table_name, if_exists, cartodbfy, retry_times)
+    if atomic and if_exists == 'replace':
+        table_name = context_manager.copy_from_shadow(chunked_gdf, table_name, cartodbfy, retry_times)
+    else:
+        for i, chunk in enumerate(chunked_gdf):
+            if i > 0:
+                if_exists = 'append'
+            table_name = context_manager.copy_from(chunk, table_name, if_exists, cartodbfy, retry_times)
 
     if log_enabled:
         log.info('Success! Data uploaded to table "{}" correctly'.format(table_name))
@@ -275,7 +282,8 @@ def rename_table(table_name, new_table_name, credentials=None, if_exists='fail',
         log.info('Success! Table "{0}" renamed to table "{1}" correctly'.format(table_name, new_table_name))
 
 
-def copy_table(table_name, new_table_name, credentials=None, if_exists='fail', log_enabled=True, cartodbfy=True):
+def copy_table(table_name, new_table_name, credentials=None, if_exists='fail', log_enabled=True, cartodbfy=True,
+               inline_cartodbfy=False, observer=None):
     """Copy a table into a new table in the CARTO account.
 
     Args:
@@ -287,6 +295,12 @@ def copy_table(table_name, new_table_name, credentials=None, if_exists='fail', l
         log_enabled (bool, optional): enable the logging mechanism. Default is True.
         cartodbfy (bool, optional): convert the table to CARTO format. Default True. More info
             `here <https://carto.com/developers/sql-api/guides/creating-tables/#create-tables>`.
+        inline_cartodbfy (bool, optional): create the table directly in CARTO format (with the
+            `cartodb_id`, `the_geom` and `the_geom_webmercator` columns) in the same statement that
+            copies the data, and run both steps in a single batch job, so the table is not rewritten
+            to convert it. Only used when `cartodbfy` is True. Default False.
+        observer (callable, optional): function called with the name ('create' or 'cartodbfy') and
+            the elapsed time in seconds of each step of the batch job when it finishes.
     Raises:
         ValueError: if the table names provided are wrong or the if_exists param is not valid.
 
@@ -304,7 +318,8 @@ def copy_table(table_name, new_table_name, credentials=None, if_exists='fail', l
     query = 'SELECT * FROM {}'.format(table_name)
 
     context_manager = ContextManager(credentials)
-    new_table_name = context_manager.create_table_from_query(query, new_table_name, if_exists, cartodbfy)
+    new_table_name = context_manager.create_table_from_query(query, new_table_name, if_exists, cartodbfy,
+                                                             inline_cartodbfy, observer)
 
     if log_enabled:
         log.info('Success! Table "{0}" copied to table "{1}" correctly'.format(table_name, new_table_name))
@@ -316,7 +331,9 @@ def create_table_from_query(
         credentials=None,
         if_exists='fail',
         log_enabled=True,
-        cartodbfy=True):
+        cartodbfy=True,
+        inline_cartodbfy=False,
+        observer=None):
     """Create a new table from an SQL query in the CARTO account.
 
     Args:
@@ -328,6 +345,12 @@ def create_table_from_query(
         log_enabled (bool, optional): enable the logging mechanism. Default is True.
         cartodbfy (bool, optional): convert the table to CARTO format. Default True. More info
             `here <https://carto.com/developers/sql-api/guides/creating-tables/#create-tables>`.
+        inline_cartodbfy (bool, optional): create the table directly in CARTO format (with the
+            `cartodb_id`, `the_geom` and `the_geom_webmercator` columns) in the same statement that
+            copies the data, and run both steps in a single batch job, so the table is not rewritten
+            to convert it. Only used when `cartodbfy` is True. Default False.
+        observer (callable, optional): function called with the name ('create' or 'cartodbfy') and
+            the elapsed time in seconds of each step of the batch job when it finishes.
     Raises:
         ValueError: if the query or table name provided is wrong or the if_exists param is not valid.
 
@@ -343,7 +366,8 @@ def create_table_from_query(
             ', '.join(IF_EXISTS_OPTIONS)))
 
     context_manager = ContextManager(credentials)
-    new_table_name = context_manager.create_table_from_query(query, new_table_name, if_exists, cartodbfy)
+    new_table_name = context_manager.create_table_from_query(query, new_table_name, if_exists, cartodbfy,
+                                                             inline_cartodbfy, observer)
 
     if log_enabled:
         log.info('Success! Table "{0}" created correctly'.format(new_table_name))
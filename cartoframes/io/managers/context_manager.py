@@ -2,12 +2,15 @@ import time
 
 import pandas as pd
 
+from collections import OrderedDict
+
 from warnings import warn
 
 from carto.auth import APIKeyAuthClient
 from carto.datasets import DatasetManager
 from carto.exceptions import CartoException, CartoRateLimitException
-from carto.sql import SQLClient, BatchSQLClient, CopySQLClient
+from carto.sql import (SQLClient, BatchSQLClient, CopySQLClient, BATCH_JOBS_PENDING_STATUSES,
+                       BATCH_JOBS_FAILED_STATUSES, BATCH_READ_STATUS_AFTER_SECONDS)
 from pyrestcli.exceptions import NotFoundException
 
 from ..dataset_info import DatasetInfo
@@ -22,6 +25,9 @@ from ...utils.columns import (get_dataframe_columns_info, get_query_columns_info
 
 DEFAULT_RETRY_TIMES = 3
 BATCH_API_PAYLOAD_THRESHOLD = 12000
+MAX_TABLE_NAME_LENGTH = 63
+RESERVED_COLUMNS = ['cartodb_id', 'the_geom', 'the_geom_webmercator']
+CREATE_TABLE_PHASES = ['create', 'cartodbfy']
 
 
 def retry_copy(func):
@@ -76,8 +82,38 @@ class ContextManager:
         return self.sql_client.send(query.strip(), parse_json, do_post, format, **request_args)
 
     @not_found
-    def execute_long_running_query(self, query):
-        return self.batch_sql_client.create_and_wait_for_completion(query.strip())
+    def execute_long_running_query(self, query, observer=None, phases=None):
+        """Run a query, or a list of queries, as a Batch API job and wait for its completion.
+        The observer, if any, is called with the phase name (by default, the position of the query)
+        and the elapsed time in seconds of each query of the job when it finishes."""
+        query = query.strip() if isinstance(query, str) else [q.strip() for q in query]
+
+        if observer is None:
+            return self.batch_sql_client.create_and_wait_for_completion(query)
+
+        job = self.batch_sql_client.create(query)
+        start = time.time()
+        finished = 0
+
+        while True:
+            statuses = _get_batch_job_statuses(job)
+            while finished < len(statuses) and statuses[finished] == 'done':
+                now = time.time()
+                observer(phases[finished] if phases else finished, now - start)
+                log.debug('Batch job {} query {}/{} done'.format(job['job_id'], finished + 1, len(statuses)))
+                start = now
+                finished += 1
+
+            if job['status'] not in BATCH_JOBS_PENDING_STATUSES:
+                break
+
+            time.sleep(BATCH_READ_STATUS_AFTER_SECONDS)
+            job = self.batch_sql_client.read(job['job_id'])
+
+        if job['status'] in BATCH_JOBS_FAILED_STATUSES:
+            raise CartoException('Batch SQL job failed with result: {}'.format(job))
+
+        return job
 
     def copy_to(self, source, schema=None, limit=None, retry_times=DEFAULT_RETRY_TIMES):
         query = self.compute_query(source, schema)
@@ -100,8 +136,8 @@ class ContextManager:
                     # Equal columns: truncate table
                     self._truncate_table(table_name, schema)
                 else:
-                    # Diff columns: truncate table and drop + add columns
-                    self._truncate_and_drop_add_columns(
+                    # Diff columns: truncate table and alter the changed columns
+                    self._truncate_and_alter_columns(
                         table_name, schema, df_columns, table_columns)
 
             elif if_exists == 'fail':
@@ -122,27 +158,59 @@ class ContextManager:
 
         return table_name
 
-    def create_table_from_query(self, query, table_name, if_exists, cartodbfy=True):
+    def copy_from_shadow(self, chunks, table_name, cartodbfy=True, retry_times=DEFAULT_RETRY_TIMES):
+        """Upload the dataframe chunks to a shadow table, and swap it with the table in a single
+        transaction. The table keeps serving the previous data until the new one is ready."""
         schema = self.get_schema()
         table_name = self.normalize_table_name(table_name)
+        shadow_table_name = _create_shadow_table_name(table_name)
+        df_columns = None
+
+        try:
+            for chunk in chunks:
+                if df_columns is None:
+                    df_columns = get_dataframe_columns_info(chunk)
+                    self._create_table_from_columns(shadow_table_name, schema, df_columns)
+                self._copy_from(chunk, shadow_table_name, df_columns, retry_times)
+
+            if cartodbfy is True:
+                cartodbfy_query = _cartodbfy_query(shadow_table_name, schema)
+                self.execute_long_running_query(cartodbfy_query)
+
+            self._swap_table(table_name, shadow_table_name)
+        except Exception:
+            self.delete_table(shadow_table_name)
+            raise
+
+        return table_name
+
+    def create_table_from_query(self, query, table_name, if_exists, cartodbfy=True, inline_cartodbfy=False,
+                                observer=None):
+        schema = self.get_schema()
+        table_name = self.normalize_table_name(table_name)
+        create_table = True
 
         if self.has_table(table_name, schema):
-            if if_exists == 'replace':
-                # TODO: review logic copy_from
-                self._drop_create_table_from_query(table_name, schema, query)
-            elif if_exists == 'fail':
+            if if_exists == 'fail':
                 raise Exception('Table "{schema}.{table_name}" already exists in your CARTO account. '
                                 'Please choose a different `table_name` or use '
                                 'if_exists="replace" to overwrite it.'.format(
                                     table_name=table_name, schema=schema))
-            else:  # 'append'
-                pass
-        else:
-            self._drop_create_table_from_query(table_name, schema, query)
+            # TODO: review logic copy_from
+            create_table = if_exists == 'replace'
+
+        if create_table and cartodbfy is True and inline_cartodbfy is True:
+            # The table is created in CARTO format, so the cartodbfy step doesn't need to rewrite it,
+            # and both steps run in the same batch job
+            self._drop_create_cartodbfied_table_from_query(table_name, schema, query, observer)
+            return table_name
+
+        if create_table:
+            self._drop_create_table_from_query(table_name, schema, query, observer)
 
         if cartodbfy is True:
             cartodbfy_query = _cartodbfy_query(table_name, schema)
-            self.execute_long_running_query(cartodbfy_query)
+            self.execute_long_running_query(cartodbfy_query, observer, CREATE_TABLE_PHASES[1:])
 
         return table_name
 
@@ -170,25 +238,6 @@ class ContextManager:
         output = self.execute_query(query)
         return not ('notices' in output and 'does not exist' in output['notices'][0])
 
-    def _delete_function(self, function_name):
-        query = _drop_function_query(function_name)
-        self.execute_query(query)
-        return function_name
-
-    def _create_function(self, schema, statement,
-                         function_name=None, columns_types=None, return_value='VOID', language='plpgsql'):
-        function_name = function_name or create_tmp_name(base='tmp_func')
-        safe_schema = double_quote(schema)
-        query, qualified_func_name = _create_function_query(
-            schema=safe_schema,
-            function_name=function_name,
-            statement=statement,
-            columns_types=columns_types or '',
-            return_value=return_value,
-            language=language)
-        self.execute_query(query)
-        return qualified_func_name
-
     def rename_table(self, table_name, new_table_name, if_exists='fail'):
         new_table_name = self.normalize_table_name(new_table_name)
 
@@ -292,20 +341,23 @@ class ContextManager:
         return tables
 
     def _compare_columns(self, a, b):
-        a_copy = [i for i in a if _not_reserved(i.name)]
-        b_copy = [i for i in b if _not_reserved(i.name)]
+        return not any(_diff_columns(a, b))
 
-        a_copy.sort()
-        b_copy.sort()
-
-        return a_copy == b_copy
-
-    def _drop_create_table_from_query(self, table_name, schema, query):
+    def _drop_create_table_from_query(self, table_name, schema, query, observer=None):
         log.debug('DROP + CREATE table "{}"'.format(table_name))
         query = 'BEGIN; {drop}; {create}; COMMIT;'.format(
             drop=_drop_table_query(table_name),
             create=_create_table_from_query_query(table_name, query))
-        self.execute_long_running_query(query)
+        self.execute_long_running_query(query, observer, CREATE_TABLE_PHASES[:1])
+
+    def _drop_create_cartodbfied_table_from_query(self, table_name, schema, query, observer=None):
+        log.debug('DROP + CREATE cartodbfied table "{}"'.format(table_name))
+        columns = self._get_query_columns_info(query)
+        create_query = 'BEGIN; {drop}; {create}; COMMIT;'.format(
+            drop=_drop_table_query(table_name),
+            create=_create_table_from_query_query(table_name, _cartodbfied_query(query, columns)))
+        self.execute_long_running_query(
+            [create_query, _cartodbfy_query(table_name, schema)], observer, CREATE_TABLE_PHASES)
 
     def _create_table_from_columns(self, table_name, schema, columns):
         log.debug('CREATE table "{}"'.format(table_name))
@@ -319,40 +371,32 @@ class ContextManager:
             truncate=_truncate_table_query(table_name))
         self.execute_query(query)
 
-    def _truncate_and_drop_add_columns(self, table_name, schema, df_columns, table_columns):
-        log.debug('TRUNCATE AND DROP + ADD columns table "{}"'.format(table_name))
-        drop_columns = _drop_columns_query(table_name, table_columns)
-        add_columns = _add_columns_query(table_name, df_columns)
-
-        drop_add_columns = 'ALTER TABLE {table_name} {drop_columns},{add_columns};'.format(
-            table_name=table_name, drop_columns=drop_columns, add_columns=add_columns)
-
-        query = '{regenerate}; BEGIN; {truncate}; {drop_add_columns}; COMMIT;'.format(
-            regenerate=_regenerate_table_query(table_name, schema) if self._check_regenerate_table_exists() else '',
+    def _truncate_and_alter_columns(self, table_name, schema, df_columns, table_columns):
+        drop_columns, add_columns, alter_columns = _diff_columns(df_columns, table_columns)
+        if not (drop_columns or add_columns or alter_columns):
+            self._truncate_table(table_name, schema)
+            return
+
+        log.debug('TRUNCATE AND ALTER columns table "{}"'.format(table_name))
+        # The table is regenerated once it is empty, so the rows are not copied, to release
+        # the slots of the dropped columns (PostgreSQL keeps them, up to 1600 per table)
+        regenerate = drop_columns and self._check_regenerate_table_exists()
+        query = 'BEGIN; {truncate}; {alter_columns}; COMMIT;{regenerate}'.format(
             truncate=_truncate_table_query(table_name),
-            drop_add_columns=drop_add_columns)
-
-        query_length_over_threshold = len(query) > BATCH_API_PAYLOAD_THRESHOLD
-
-        if query_length_over_threshold:
-            qualified_func_name = self._create_function(
-                schema=schema, statement=drop_add_columns)
-            drop_add_func_sql = 'SELECT {}'.format(qualified_func_name)
-            query = '''
-                {regenerate};
-                BEGIN;
-                {truncate};
-                {drop_add_func_sql};
-                COMMIT;'''.format(
-                regenerate=_regenerate_table_query(
-                    table_name, schema) if self._check_regenerate_table_exists() else '',
-                truncate=_truncate_table_query(table_name),
-                drop_add_func_sql=drop_add_func_sql)
-        try:
+            alter_columns=_alter_columns_query(table_name, drop_columns, add_columns, alter_columns),
+            regenerate=' {};'.format(_regenerate_table_query(table_name, schema)) if regenerate else '')
+
+        if len(query) > BATCH_API_PAYLOAD_THRESHOLD:
+            # The statements run on an empty table, so they don't need the Batch API
+            self.execute_query(query)
+        else:
             self.execute_long_running_query(query)
-        finally:
-            if query_length_over_threshold:
-                self._delete_function(qualified_func_name)
+
+    def _swap_table(self, table_name, shadow_table_name):
+        log.debug('SWAP table "{}"'.format(table_name))
+        query = 'BEGIN; {swap}; COMMIT;'.format(
+            swap=_swap_table_query(table_name, shadow_table_name))
+        self.execute_query(query)
 
     def compute_query(self, source, schema=None):
         if is_sql_query(source):
@@ -453,61 +497,34 @@ def _drop_table_query(table_name, if_exists=True):
         if_exists='IF EXISTS' if if_exists else '')
 
 
-def _drop_function_query(function_name, columns_types=None, if_exists=True):
-    if columns_types and not isinstance(columns_types, dict):
-        raise ValueError('The columns_types parameter should be a dictionary of column names and types.')
-    columns_types = columns_types or {}
-    columns = ['{0} {1}'.format(cname, ctype) for cname, ctype in columns_types.items()]
-    columns_str = ','.join(columns)
-    return 'DROP FUNCTION {if_exists} {function_name}{columns_str_call}'.format(
-        function_name=function_name,
-        if_exists='IF EXISTS' if if_exists else '',
-        columns_str_call='({columns_str})'.format(columns_str=columns_str) if columns else '')
-
-
 def _truncate_table_query(table_name):
     return 'TRUNCATE TABLE {table_name}'.format(
         table_name=table_name)
 
 
-def _create_function_query(schema, function_name, statement, columns_types, return_value, language):
-    if columns_types and not isinstance(columns_types, dict):
-        raise ValueError('The columns_types parameter should be a dictionary of column names and types.')
-    columns_types = columns_types or {}
-    columns = ['{0} {1}'.format(cname, ctype) for cname, ctype in columns_types.items()]
-    columns_str = ','.join(columns) if columns else ''
-    function_query = '''
-        CREATE FUNCTION {schema}.{function_name}({columns_str})
-        RETURNS {return_value} AS $$
-        BEGIN
-        {statement}
-        END;
-        $$ LANGUAGE {language}
-    '''.format(schema=schema,
-               function_name=function_name,
-               statement=statement,
-               columns_str=columns_str,
-               return_value=return_value,
-               language=language)
-    qualified_func_name = '{schema}.{function_name}({columns_str})'.format(
-            schema=schema, function_name=function_name, columns_str=columns_str)
-    return function_query, qualified_func_name
-
-
-def _drop_columns_query(table_name, columns):
-    columns = ['DROP COLUMN {name}'.format(name=double_quote(c.dbname))
-               for c in columns if _not_reserved(c.dbname)]
-    return ','.join(columns)
-
-
-def _add_columns_query(table_name, columns):
-    columns = ['ADD COLUMN {name} {type}'.format(name=double_quote(c.dbname), type=c.dbtype)
-               for c in columns if _not_reserved(c.dbname)]
-    return ','.join(columns)
+def _diff_columns(df_columns, table_columns):
+    """Return the table columns to drop, and the dataframe columns to add and to change their type."""
+    df_columns = OrderedDict((c.dbname, c) for c in df_columns if _not_reserved(c.dbname))
+    table_columns = OrderedDict((c.dbname, c) for c in table_columns if _not_reserved(c.dbname))
+
+    drop_columns = [c for name, c in table_columns.items() if name not in df_columns]
+    add_columns = [c for name, c in df_columns.items() if name not in table_columns]
+    alter_columns = [c for name, c in df_columns.items()
+                     if name in table_columns and c.dbtype != table_columns[name].dbtype]
+
+    return drop_columns, add_columns, alter_columns
+
+
+def _alter_columns_query(table_name, drop_columns, add_columns, alter_columns):
+    # The table is empty when it is altered, so the type changes don't need to cast the values
+    actions = ['DROP COLUMN {name}'.format(name=double_quote(c.dbname)) for c in drop_columns]
+    actions += ['ADD COLUMN {name} {type}'.format(name=double_quote(c.dbname), type=c.dbtype) for c in add_columns]
+    actions += ['ALTER COLUMN {name} TYPE {type} USING NULL::{type}'.format(
+        name=double_quote(c.dbname), type=c.dbtype) for c in alter_columns]
+    return 'ALTER TABLE {table_name} {actions}'.format(table_name=table_name, actions=','.join(actions))
 
 
 def _not_reserved(column):
-    RESERVED_COLUMNS = ['cartodb_id', 'the_geom', 'the_geom_webmercator']
     return column not in RESERVED_COLUMNS
 
 
@@ -522,6 +539,30 @@ def _create_table_from_query_query(table_name, query):
     return 'CREATE TABLE {table_name} AS ({query})'.format(table_name=table_name, query=query)
 
 
+def _cartodbfied_query(query, columns):
+    """Return the query with the CARTO columns: the cartodb_id of the query rows (or a new one
+    for each row if the query has none), the_geom in EPSG:4326 and the_geom_webmercator computed from it."""
+    column_names = [c.name for c in columns]
+    cartodb_id = '_q."cartodb_id"' if 'cartodb_id' in column_names else 'row_number() OVER ()'
+    the_geom = '_q."the_geom"' if 'the_geom' in column_names else 'NULL'
+    columns = ['_q.{}'.format(double_quote(name)) for name in column_names if _not_reserved(name)]
+    return ('SELECT {cartodb_id} AS cartodb_id, '
+            '{the_geom}::geometry(Geometry, 4326) AS the_geom, '
+            'CDB_TransformToWebmercator({the_geom}::geometry(Geometry, 4326))::geometry(Geometry, 3857) '
+            'AS the_geom_webmercator{columns} FROM ({query}) _q').format(
+                cartodb_id=cartodb_id, the_geom=the_geom, columns=''.join(', ' + c for c in columns), query=query)
+
+
+def _get_batch_job_statuses(job):
+    """Return the status of each query of a batch job."""
+    queries = job.get('query')
+    if isinstance(queries, dict):
+        queries = queries.get('query')
+    if isinstance(queries, list):
+        return [q.get('status') for q in queries]
+    return [job.get('status')]
+
+
 def _cartodbfy_query(table_name, schema):
     return "SELECT CDB_CartodbfyTable('{schema}', '{table_name}')".format(
         schema=schema, table_name=table_name)
@@ -537,6 +578,17 @@ def _rename_table_query(table_name, new_table_name):
         table_name=table_name, new_table_name=new_table_name)
 
 
+def _swap_table_query(table_name, shadow_table_name):
+    return '{drop}; ALTER TABLE {shadow_table_name} RENAME TO {table_name}'.format(
+        drop=_drop_table_query(table_name),
+        table_name=table_name, shadow_table_name=shadow_table_name)
+
+
+def _create_shadow_table_name(table_name):
+    # Keep the name within the PostgreSQL identifiers length: base + '_' + 10 hex characters
+    return create_tmp_name(base=table_name[:MAX_TABLE_NAME_LENGTH - 11])
+
+
 def _create_auth_client(credentials, public=False):
     return APIKeyAuthClient(
         base_url=credentials.base_url,
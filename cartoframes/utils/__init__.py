@@ -1,6 +1,12 @@
 from .logger import set_log_level
 from .geom_utils import decode_geometry
 from .metrics import setup_metrics
+from .utils import check_package
+
+# Check installed packages versions
+check_package('carto', '>=1.11.2')
+check_package('pandas', '>=0.25.0')
+check_package('geopandas', '>=0.6.0')
 
 __all__ = [
     'setup_metrics',
@@ -2,6 +2,7 @@
 
 import re
 
+from functools import lru_cache
 from unidecode import unidecode
 
 from .utils import dtypes2pg, pg2dtypes, PG_NULL
@@ -24,6 +25,15 @@ RESERVED_WORDS = ('ALL', 'ANALYSE', 'ANALYZE', 'AND', 'ANY', 'ARRAY', 'AS', 'ASC
                   'REFERENCES', 'RIGHT', 'SELECT', 'SESSION_USER', 'SIMILAR', 'SOME', 'SYMMETRIC', 'TABLE', 'THEN',
                   'TO', 'TRAILING', 'TRUE', 'UNION', 'UNIQUE', 'USER', 'USING', 'VERBOSE', 'WHEN', 'WHERE',
                   'XMIN', 'XMAX', 'FORMAT', 'CONTROLLER', 'ACTION')
+RESERVED_WORDS_SET = frozenset(RESERVED_WORDS)
+NORMALIZE_CACHE_SIZE = 65536
+
+TAG_PATTERN = re.compile(r'<[^>]+>')
+ENTITY_PATTERN = re.compile(r'&.+?;')
+UNSUPPORTED_CHAR_PATTERN = re.compile(r'[^a-z0-9 _-]')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+DASHES_PATTERN = re.compile(r'-+')
+SUPPORTED_NAME_PATTERN = re.compile(r'^[a-z_]+[a-z_0-9]*$')
 
 
 class ColumnInfo:
@@ -58,10 +68,11 @@ class ColumnInfo:
 
 def get_dataframe_columns_info(df):
     columns = []
+    dtypes = df.dtypes
 
     for name in df.columns:
         if _is_valid_column(name):
-            dbtype = dtypes2pg(str(df.dtypes[name]))
+            dbtype = dtypes2pg(str(dtypes[name]))
             columns.append(_create_column_info(name, dbtype))
 
     return columns
@@ -96,7 +107,7 @@ def normalize_name(column_name):
     if column_name is None:
         return None
 
-    return normalize_names([column_name])[0]
+    return _normalize(column_name)
 
 
 def normalize_names(column_names):
@@ -129,34 +140,40 @@ def normalize_names(column_names):
             list: List of SQL-normalized column names
     """
     result = []
+    used_names = set()
+    # Last collision suffix (and name) tried for each normalized name. The names are
+    # never released, so the next collision of the same name can resume from there
+    collisions = {}
 
     for column_name in column_names:
-        result.append(_normalize(column_name, forbidden_column_names=result))
+        base_name = _normalize(column_name)
+        i, name = collisions.get(base_name, (0, base_name))
+        while name in used_names:
+            i += 1
+            name = '{}_{}'.format(_truncate(name, length=MAX_COLLISION_LENGTH), i)
+        collisions[base_name] = (i, name)
+        used_names.add(name)
+        result.append(name)
 
     return result
 
 
-def _normalize(column_name, forbidden_column_names=None):
-    column_name = _truncate(_sanitize(_slugify(column_name)))
+def _normalize(column_name):
+    return _normalize_str(str(column_name))
 
-    if forbidden_column_names:
-        i = 1
-        while column_name in forbidden_column_names:
-            column_name = '{}_{}'.format(_truncate(column_name, length=MAX_COLLISION_LENGTH), i)
-            i += 1
 
-    return column_name
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _normalize_str(column_name):
+    return _truncate(_sanitize(_slugify(column_name)))
 
 
 def _slugify(value):
     value = unidecode(str(value).lower())
-    value = re.sub(r'<[^>]+>', '', value)
-    value = re.sub(r'&.+?;', '-', value)
-    value = re.sub(r'[^a-z0-9 _-]', '-', value).strip().lower()
-    value = re.sub(r'\s+', '-', value)
-    value = re.sub(r' ', '-', value)
-    value = re.sub(r'-+', '-', value)
-    value = re.sub(r'-', '_', value)
+    value = TAG_PATTERN.sub('', value)
+    value = ENTITY_PATTERN.sub('-', value)
+    value = UNSUPPORTED_CHAR_PATTERN.sub('-', value).strip().lower()
+    value = WHITESPACE_PATTERN.sub('-', value)
+    value = DASHES_PATTERN.sub('_', value)
     return value
 
 
@@ -169,11 +186,11 @@ def _truncate(value, length=MAX_LENGTH):
 
 
 def _is_reserved(value):
-    return value.upper() in RESERVED_WORDS
+    return value.upper() in RESERVED_WORDS_SET
 
 
 def _is_unsupported(value):
-    return not re.match(r'^[a-z_]+[a-z_0-9]*$', value)
+    return not SUPPORTED_NAME_PATTERN.match(value)
 
 
 def obtain_converters(columns):
@@ -1,7 +1,11 @@
 import os
+import time
 import uuid
+import queue
+import atexit
 import requests
 import functools
+import threading
 
 from urllib.parse import urlparse
 
@@ -24,6 +28,11 @@ STAG_DOMAIN_TLD = 'carto-staging.com'
 PROD_METRICS_SERVER = 'https://bmetrics.cartodb.net'
 STAG_METRICS_SERVER = 'https://bmetrics-staging.cartodb.net'
 
+METRICS_QUEUE_SIZE = 100
+METRICS_BATCH_SIZE = 20
+METRICS_FLUSH_INTERVAL = 5  # seconds
+METRICS_EXIT_TIMEOUT = 2  # seconds
+
 _metrics_config = None
 
 
@@ -34,7 +43,7 @@ def setup_metrics(enabled):
         enabled (bool): flag to enable/disable metrics.
 
     '''
-    global _metrics_config
+    init_metrics_config()
 
     _metrics_config[ENABLED_KEY] = enabled
 
@@ -45,9 +54,9 @@ def setup_metrics(enabled):
 def init_metrics_config():
     global _metrics_config
 
-    filepath = default_config_path(METRICS_FILENAME)
-
+    # The config is read (or created) on first use instead of at import time
     if _metrics_config is None:
+        filepath = default_config_path(METRICS_FILENAME)
         if os.path.exists(filepath):
             _metrics_config = read_from_config(filepath=filepath)
 
@@ -64,11 +73,13 @@ def create_metrics_config():
 
 
 def get_metrics_uuid():
+    init_metrics_config()
     if _metrics_config is not None:
         return _metrics_config.get(UUID_KEY)
 
 
 def get_metrics_enabled():
+    init_metrics_config()
     if _metrics_config is not None:
         return _metrics_config.get(ENABLED_KEY)
 
@@ -95,12 +106,123 @@ def build_metrics_data(event_name, extra_metrics_data, server_domain_tld):
     return metrics_data
 
 
+class MetricsEmitter:
+    """Send the metrics events from a background thread, so they never delay the caller.
+
+    The events are queued and sent in batches, when the batch is full, every ``flush_interval``
+    seconds and when the process exits. If the queue is full, the new events are dropped.
+    Only one thread sends events at a time, so the HTTP session is never shared between threads.
+
+    """
+
+    def __init__(self, queue_size=METRICS_QUEUE_SIZE, batch_size=METRICS_BATCH_SIZE,
+                 flush_interval=METRICS_FLUSH_INTERVAL):
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._session = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._deadline = None
+
+    def emit(self, metrics_server, json_data):
+        try:
+            self._queue.put_nowait((metrics_server, json_data))
+        except queue.Full:
+            log.debug('Metrics dropped: {}'.format(json_data))
+            return
+
+        self._start()
+
+    def flush(self, timeout=None):
+        """Send the queued events, during ``timeout`` seconds at most. If the background thread is
+        running, it is stopped after sending its current batch and the queued events."""
+        self._deadline = time.time() + timeout if timeout is not None else None
+
+        with self._lock:
+            thread = self._thread
+            if thread is not None and thread.is_alive():
+                self._stop.set()
+                try:
+                    # Wake up the thread if it is waiting for events
+                    self._queue.put_nowait(None)
+                except queue.Full:
+                    pass
+
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+        else:
+            self._send(self._drain(), self._deadline)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._deadline = None
+                self._thread = threading.Thread(target=self._run, name='cartoframes-metrics', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=self._flush_interval))
+                while len(batch) < self._batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            self._send(batch, self._deadline)
+
+        # Stopped by flush: the events queued until now are sent before exiting
+        self._send(self._drain(), self._deadline)
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def _send(self, batch, deadline=None):
+        if not batch:
+            return
+
+        # The metrics server receives an event per request: the batch reuses the connection
+        if self._session is None:
+            self._session = requests.Session()
+
+        for event in batch:
+            if event is None:
+                continue
+            metrics_server, json_data = event
+            timeout = 2
+            if deadline is not None:
+                timeout = min(timeout, deadline - time.time())
+                if timeout <= 0:
+                    break
+            try:
+                result = self._session.post(metrics_server, json=json_data, timeout=timeout)
+                log.debug('Metrics sent! {0} {1}'.format(result.status_code, json_data))
+            except Exception:
+                pass
+
+
+_metrics_emitter = MetricsEmitter()
+
+
+@atexit.register
+def _flush_metrics():
+    _metrics_emitter.flush(timeout=METRICS_EXIT_TIMEOUT)
+
+
 @silent_fail
 def post_metrics(event_name, extra_metrics_data, server_domain_tld):
     metrics_server = STAG_METRICS_SERVER if server_domain_tld == STAG_DOMAIN_TLD else PROD_METRICS_SERVER
     json_data = build_metrics_data(event_name, extra_metrics_data, server_domain_tld)
-    result = requests.post(metrics_server, json=json_data, timeout=2)
-    log.debug('Metrics sent! {0} {1}'.format(result.status_code, json_data))
+    _metrics_emitter.emit(metrics_server, json_data)
 
 
 def send_metrics(event_name):
@@ -143,7 +265,3 @@ def get_server_domain_tld(server_url):
 
 def get_api_used(server_domain_tld):
     return CLOUD_API if server_domain_tld in [PROD_DOMAIN_TLD, STAG_DOMAIN_TLD] else CUSTOM_API
-
-
-# Run this once
-init_metrics_config()
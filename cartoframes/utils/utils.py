@@ -15,7 +15,6 @@ import warnings
 import functools
 import geopandas
 import numpy as np
-import pkg_resources
 import semantic_version
 
 
@@ -28,6 +27,15 @@ from pandas.api.types import is_datetime64_any_dtype as is_datetime
 from .logger import log
 from ..exceptions import DOError
 
+try:
+    from importlib.metadata import version as get_package_version, PackageNotFoundError
+except ImportError:  # Python < 3.8
+    import pkg_resources
+    from pkg_resources import DistributionNotFound as PackageNotFoundError
+
+    def get_package_version(pkg_name):
+        return pkg_resources.get_distribution(pkg_name).version
+
 GEOM_TYPE_POINT = 'point'
 GEOM_TYPE_LINE = 'line'
 GEOM_TYPE_POLYGON = 'polygon'
@@ -446,12 +454,12 @@ def timelogger(method):
 def check_package(pkg_name, spec='*', is_optional=False):
     try:
         spec_pattern = semantic_version.SimpleSpec(spec)
-        pkg_version = pkg_resources.get_distribution(pkg_name).version
+        pkg_version = get_package_version(pkg_name)
         version = semantic_version.Version(pkg_version)
         if not spec_pattern.match(version):
             raise Exception('Package "{0}" version ({1}) does not match "{2}" '.format(pkg_name, version, spec) +
                             'Please run: pip install -U {0}'.format(pkg_name))
-    except pkg_resources.DistributionNotFound:
+    except PackageNotFoundError:
         if is_optional:
             raise Exception('Optional package "{0}" is not installed. '.format(pkg_name) +
                             'Please run: pip install {0}'.format(pkg_name))
@@ -549,7 +557,7 @@ def get_parameter_from_decorator(parameter_name, decorated_function, *args, **kw
         parameter = kwargs[parameter_name]
     except KeyError:
         try:
-            parameter_args = inspect.getargspec(decorated_function).args
+            parameter_args = get_function_args(decorated_function)
             if parameter_name in parameter_args:
                 parameter_arg_index = parameter_args.index(parameter_name)
                 parameter = args[parameter_arg_index]
@@ -559,6 +567,12 @@ def get_parameter_from_decorator(parameter_name, decorated_function, *args, **kw
     return parameter
 
 
+@functools.lru_cache(maxsize=None)
+def get_function_args(function):
+    """Names of the positional arguments of a function, inspected once per function."""
+    return inspect.getfullargspec(function).args
+
+
 def deprecated(message=''):
     def decorator(func):
 
@@ -1,4 +1,5 @@
 from cartoframes.utils import setup_metrics
+from cartoframes.data.observatory import set_metadata_cache
 
 
 def pytest_configure(config):
@@ -8,6 +9,7 @@ def pytest_configure(config):
     file after command line options have been parsed.
     """
     setup_metrics(False)
+    set_metadata_cache(None)
 
 
 def pytest_sessionstart(session):
@@ -1,6 +1,7 @@
 import pytest
 
 from unittest.mock import patch
+from shapely import wkt
 
 from cartoframes.auth import Credentials
 from cartoframes.exceptions import CatalogError
@@ -212,3 +213,26 @@ class TestGeographyRepo(object):
 
         # Then
         assert geographies == expected_geographies
+
+    @patch.object(RepoClient, 'get_geographies')
+    def test_get_geographies_ids_by_geometry(self, mocked_repo):
+        # Given
+        mocked_repo.return_value = [
+            {'id': 'geography1', 'geom_coverage': 'POLYGON((0 0, 0 2, 2 2, 2 0, 0 0))'},
+            {'id': 'geography2', 'geom_coverage': 'POLYGON((1 1, 1 3, 3 3, 3 1, 1 1))'},
+            {'id': 'geography3', 'geom_coverage': None}
+        ]
+        repo = GeographyRepository()
+
+        # When
+        ids = repo.get_geographies_ids_by_geometry([
+            wkt.loads('POINT(0.5 0.5)'),
+            wkt.loads('POINT(1.5 1.5)'),
+            wkt.loads('POINT(5 5)'),
+            None
+        ])
+        repo.get_geographies_ids_by_geometry([wkt.loads('POINT(2.5 2.5)')])
+
+        # Then
+        assert ids == [['geography1'], ['geography1', 'geography2'], [], []]
+        mocked_repo.assert_called_once_with({'get_geoms_coverage': True})
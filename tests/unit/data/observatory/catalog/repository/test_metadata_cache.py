@@ -0,0 +1,156 @@
+import os
+
+from cartoframes.data.observatory.catalog.repository import metadata_cache
+from cartoframes.data.observatory.catalog.repository.metadata_cache import MetadataCache, set_metadata_cache
+from cartoframes.data.observatory.catalog.repository.repo_client import RepoClient
+
+
+def test_get_or_fetch_memory_hit(mocker, tmp_path):
+    # Given
+    cache = MetadataCache(path=str(tmp_path), persistent=True)
+    fetch = mocker.Mock(return_value=[{'id': 'usa'}])
+
+    # When
+    first = cache.get_or_fetch(['scope'], 'countries', {'id': 'usa'}, fetch)
+    second = cache.get_or_fetch(['scope'], 'countries', {'id': 'usa'}, fetch)
+
+    # Then
+    assert first == second == [{'id': 'usa'}]
+    fetch.assert_called_once_with()
+
+
+def test_get_or_fetch_disk_hit(mocker, tmp_path):
+    # Given
+    cache = MetadataCache(path=str(tmp_path), persistent=True)
+    cache.get_or_fetch(['scope'], 'countries', None, lambda: [{'id': 'usa'}])
+    fetch = mocker.Mock()
+
+    # When
+    value = MetadataCache(path=str(tmp_path), persistent=True).get_or_fetch(['scope'], 'countries', None, fetch)
+
+    # Then
+    assert value == [{'id': 'usa'}]
+    fetch.assert_not_called()
+
+
+def test_get_or_fetch_scopes_and_filters(mocker, tmp_path):
+    # Given
+    cache = MetadataCache(path=str(tmp_path), persistent=True)
+    fetch = mocker.Mock(return_value=[])
+
+    # When
+    cache.get_or_fetch(['scope'], 'datasets', {'country': 'usa'}, fetch)
+    cache.get_or_fetch(['scope'], 'datasets', {'country': 'esp'}, fetch)
+    cache.get_or_fetch(['other'], 'datasets', {'country': 'usa'}, fetch)
+
+    # Then
+    assert fetch.call_count == 3
+
+
+def test_get_or_fetch_expired(mocker, tmp_path):
+    # Given
+    cache = MetadataCache(ttl=60, path=str(tmp_path), persistent=True)
+    time_mock = mocker.patch.object(metadata_cache.time, 'time', return_value=1000)
+    cache.get_or_fetch(['scope'], 'countries', None, lambda: [{'id': 'usa'}])
+    time_mock.return_value = 1061
+    fetch = mocker.Mock(return_value=[{'id': 'esp'}])
+
+    # When
+    value = cache.get_or_fetch(['scope'], 'countries', None, fetch)
+
+    # Then
+    assert value == [{'id': 'esp'}]
+    fetch.assert_called_once_with()
+
+
+def test_get_expired_is_removed(mocker, tmp_path):
+    # Given
+    cache = MetadataCache(ttl=60, path=str(tmp_path), persistent=True)
+    time_mock = mocker.patch.object(metadata_cache.time, 'time', return_value=1000)
+    cache.set('a', 1)
+    time_mock.return_value = 1061
+
+    # When
+    value = cache.get('a')
+
+    # Then
+    assert value is None
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_get_returns_a_copy():
+    # Given
+    cache = MetadataCache()
+    value = [{'id': 'usa'}]
+    cache.set('a', value)
+
+    # When
+    value[0]['id'] = 'esp'
+    cache.get('a')[0]['id'] = 'can'
+
+    # Then
+    assert cache.get('a') == [{'id': 'usa'}]
+
+
+def test_default_cache_is_not_persistent(mocker, tmp_path):
+    # Given
+    mocker.patch.object(metadata_cache, 'DEFAULT_CACHE_DIR', str(tmp_path))
+    cache = MetadataCache()
+    fetch = mocker.Mock(return_value=[{'id': 'usa'}])
+
+    # When
+    cache.get_or_fetch(['scope'], 'countries', None, fetch)
+    value = cache.get_or_fetch(['scope'], 'countries', None, fetch)
+
+    # Then
+    assert value == [{'id': 'usa'}]
+    assert cache.path is None
+    assert os.listdir(str(tmp_path)) == []
+    fetch.assert_called_once_with()
+
+
+def test_memory_lru_eviction():
+    # Given
+    cache = MetadataCache(maxsize=2, persistent=False)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+
+    # When
+    cache.set('c', 3)
+
+    # Then
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+
+def test_clear(tmp_path):
+    # Given
+    cache = MetadataCache(path=str(tmp_path), persistent=True)
+    cache.set('a', 1)
+
+    # When
+    cache.clear()
+
+    # Then
+    assert cache.get('a') is None
+    assert MetadataCache(path=str(tmp_path), persistent=True).get('a') is None
+
+
+def test_repo_client_uses_cache(mocker):
+    # Given
+    set_metadata_cache(metadata_cache._create_default_metadata_cache())
+    metadata_mock = mocker.patch('carto.do_dataset.DODataset.metadata', return_value=[{'id': 'usa'}])
+
+    try:
+        # When
+        repo = RepoClient()
+        repo.get_countries({'category': 'demographics'})
+        countries = repo.get_countries({'category': 'demographics'})
+    finally:
+        set_metadata_cache(None)
+
+    # Then
+    assert countries == [{'id': 'usa'}]
+    metadata_mock.assert_called_once_with('countries', {'category': 'demographics'})
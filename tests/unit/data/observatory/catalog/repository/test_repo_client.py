@@ -1,5 +1,9 @@
+import pytest
+
 from unittest.mock import patch
 
+from carto.do_dataset import DODataset
+from carto.exceptions import CartoException
 from cartoframes.data.observatory.catalog.repository.repo_client import RepoClient
 
 
@@ -157,3 +161,40 @@ class TestRepoClient:
         fetch_entity_mock.assert_any_call('datasets/c')
         fetch_entity_mock.assert_any_call('datasets/x')
         assert datasets == ['datasets/a', 'datasets/b', 'datasets/c']
+
+    @patch.object(RepoClient, '_fetch_entity')
+    def test_get_datasets_id_and_slug_list(self, fetch_entity_mock):
+        fetch_entity_mock.side_effect = lambda _id: _id
+        repo = RepoClient()
+        filters = {'id': ['id_1'], 'slug': ['slug_2']}
+        datasets = repo.get_datasets(filters)
+
+        assert fetch_entity_mock.call_count == 2
+        assert datasets == ['datasets/id_1', 'datasets/slug_2']
+
+    @patch.object(DODataset, 'metadata')
+    def test_fetch_entity_id_list_not_found(self, metadata_mock):
+        def metadata(entity, filters):
+            if entity == 'datasets/x':
+                raise CartoException('404 Client Error: Entity not found')
+            return entity
+        metadata_mock.side_effect = metadata
+        repo = RepoClient()
+        filters = {'id': ['a', 'x', 'b']}
+        datasets = repo.get_datasets(filters)
+
+        assert metadata_mock.call_count == 3
+        assert datasets == ['datasets/a', 'datasets/b']
+
+    @patch.object(DODataset, 'metadata')
+    def test_fetch_entity_id_list_error(self, metadata_mock):
+        def metadata(entity, filters):
+            if entity == 'datasets/x':
+                raise CartoException('500 Server Error')
+            return entity
+        metadata_mock.side_effect = metadata
+        repo = RepoClient()
+        filters = {'id': ['a', 'x', 'b']}
+
+        with pytest.raises(CartoException):
+            repo.get_datasets(filters)
@@ -0,0 +1,171 @@
+import os
+
+from cartoframes.auth import Credentials
+from cartoframes.data.observatory.catalog.repository import search_index
+from cartoframes.data.observatory.catalog.repository.metadata_cache import MetadataCache, set_metadata_cache
+from cartoframes.data.observatory.catalog.repository.search_index import SearchIndex, clear_search_indexes, \
+    get_search_index, register_entities, save_search_indexes
+from cartoframes.data.observatory.catalog.variable import Variable
+from cartoframes.data.observatory.catalog.repository.variable_repo import VariableRepository
+from cartoframes.data.observatory.catalog.repository.repo_client import RepoClient
+
+income = {'id': 'carto.acs.median_income', 'slug': 'median_income_a1', 'name': 'Median household income',
+          'description': 'Median income of the households', 'column_name': 'median_income'}
+population = {'id': 'carto.acs.total_pop', 'slug': 'total_pop_b2', 'name': 'Total population',
+              'description': 'Total population of the area', 'column_name': 'total_pop'}
+households = {'id': 'carto.acs.households', 'slug': 'households_c3', 'name': 'Households',
+              'description': 'Number of households', 'column_name': 'households'}
+
+
+def test_search_ranking():
+    # Given
+    index = SearchIndex()
+    index.add([population, households, income])
+
+    # When
+    results = index.search('median household income')
+
+    # Then
+    assert results[0] == income
+    assert population not in results
+    assert index.search('unknown words') == []
+
+
+def test_add_replaces_documents():
+    # Given
+    index = SearchIndex()
+    index.add([income, population])
+
+    # When
+    changed = index.add([dict(income, name='Median earnings', description='Earnings', column_name='earnings')])
+    unchanged = index.add([population])
+
+    # Then
+    assert changed is True
+    assert unchanged is False
+    assert len(index) == 2
+    assert index.search('income')[0]['name'] == 'Median earnings'
+    assert index.search('household') == []
+
+
+def test_add_keeps_only_the_search_fields():
+    # Given
+    index = SearchIndex()
+
+    # When
+    index.add([dict(income, summary_json={'head': [1, 2, 3]}, db_type='FLOAT')])
+
+    # Then
+    assert index.search('income') == [income]
+
+
+def test_save_and_load(tmp_path):
+    # Given
+    path = os.path.join(str(tmp_path), 'variable.json')
+    index = SearchIndex()
+    index.add([income, population])
+
+    # When
+    index.save(path)
+    loaded_index = SearchIndex.load(path)
+
+    # Then
+    assert len(loaded_index) == 2
+    assert loaded_index.search('population') == [population]
+
+
+def test_repository_updates_the_persisted_index(mocker, tmp_path):
+    # Given
+    set_metadata_cache(MetadataCache(path=str(tmp_path), persistent=True))
+    clear_search_indexes()
+    mocker.patch.object(RepoClient, 'get_variables', return_value=[income, population])
+
+    try:
+        # When
+        VariableRepository().get_all()
+        built_before_search = 'variable' in search_index._search_indexes
+        get_search_index('variable')
+        save_search_indexes()
+        search_index._search_indexes.clear()
+        loaded_index = get_search_index('variable')
+
+        # Then
+        assert built_before_search is False
+        assert os.path.exists(os.path.join(str(tmp_path), 'search_index', 'variable.json'))
+        assert loaded_index.search('income')[0]['id'] == income['id']
+    finally:
+        clear_search_indexes()
+        set_metadata_cache(None)
+
+
+def test_nothing_is_saved_without_a_search(mocker, tmp_path):
+    # Given
+    set_metadata_cache(MetadataCache(path=str(tmp_path), persistent=True))
+    clear_search_indexes()
+    mocker.patch.object(RepoClient, 'get_variables', return_value=[income, population])
+
+    try:
+        # When
+        VariableRepository().get_all()
+        save_search_indexes()
+
+        # Then
+        assert not os.path.exists(os.path.join(str(tmp_path), 'search_index', 'variable.json'))
+    finally:
+        clear_search_indexes()
+        set_metadata_cache(None)
+
+
+def test_register_entities_keeps_only_the_last_search_fields(mocker):
+    # Given
+    clear_search_indexes()
+    mocker.patch.object(search_index, 'MAX_PENDING_ENTITIES', 2)
+    variables = [Variable(dict(data, summary_json={'head': [1, 2, 3]})) for data in [income, population, households]]
+
+    try:
+        # When
+        register_entities('variable', variables)
+        pending = dict(search_index._pending_entities['variable'])
+
+        # Then
+        assert pending == {population['id']: population, households['id']: households}
+    finally:
+        clear_search_indexes()
+
+
+def test_entities_fetched_with_user_credentials_are_not_indexed(mocker):
+    # Given
+    clear_search_indexes()
+    mocker.patch.object(RepoClient, 'get_variables', return_value=[income, population])
+    repo = VariableRepository()
+    repo.client.set_user_credentials(Credentials('fake_user', 'fake_api_key'))
+
+    try:
+        # When
+        repo.get_all()
+
+        # Then
+        assert search_index._pending_entities == {}
+    finally:
+        repo.client.reset_user_credentials()
+        clear_search_indexes()
+
+
+def test_the_save_hook_is_registered_when_an_index_is_built(mocker):
+    # Given
+    clear_search_indexes()
+    mocker.patch.object(search_index, '_save_registered', False)
+    register_mock = mocker.patch('atexit.register')
+
+    try:
+        # When
+        register_entities('variable', [Variable(income)])
+        registered_before_build = register_mock.call_count
+        get_search_index('variable')
+        get_search_index('dataset')
+
+        # Then
+        assert registered_before_build == 0
+        register_mock.assert_called_once_with(save_search_indexes)
+    finally:
+        clear_search_indexes()
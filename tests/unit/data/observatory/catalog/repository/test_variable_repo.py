@@ -11,7 +11,7 @@ from cartoframes.data.observatory.catalog.repository.constants import (
     CATEGORY_FILTER, COUNTRY_FILTER, DATASET_FILTER, GEOGRAPHY_FILTER, PROVIDER_FILTER, VARIABLE_FILTER,
     VARIABLE_GROUP_FILTER
 )
-from ..examples import test_variable1, test_variables, db_variable1, db_variable2
+from ..examples import test_variable1, test_variable2, test_variables, db_variable1, db_variable2
 
 
 class TestVariableRepo(object):
@@ -151,6 +151,21 @@ class TestVariableRepo(object):
         assert isinstance(variables, CatalogList)
         assert variables == test_variables
 
+    @patch.object(RepoClient, 'get_variables')
+    def test_get_by_id_list_keeps_order_and_reports_missing(self, mocked_repo, mocker):
+        # Given
+        mocked_repo.return_value = [db_variable1, db_variable2]
+        log_mock = mocker.patch('cartoframes.data.observatory.catalog.repository.entity_repo.log')
+        repo = VariableRepository()
+
+        # When
+        variables = repo.get_by_id_list([db_variable2['slug'], 'missing_id', db_variable1['id']])
+
+        # Then
+        assert variables == CatalogList([test_variable2, test_variable1])
+        log_mock.warning.assert_called_once_with(
+            'The following ids do not correspond with any existing entity in the catalog: missing_id')
+
     @patch.object(RepoClient, 'get_variables')
     def test_missing_fields_are_mapped_as_None(self, mocked_repo):
         # Given
@@ -1,8 +1,9 @@
 import pytest
 
-from unittest.mock import patch
+from unittest.mock import patch, PropertyMock
 
 from cartoframes.auth import Credentials
+from cartoframes.data.observatory.catalog.entity import CatalogList
 from cartoframes.data.observatory.catalog.dataset import Dataset
 from cartoframes.data.observatory.catalog.geography import Geography
 from cartoframes.data.observatory.catalog.country import Country
@@ -10,7 +11,10 @@ from cartoframes.data.observatory.catalog.category import Category
 from cartoframes.data.observatory.catalog.provider import Provider
 from cartoframes.data.observatory.catalog.catalog import Catalog
 from cartoframes.data.observatory.catalog.subscriptions import Subscriptions
+from cartoframes.data.observatory.catalog.repository.dataset_repo import DatasetRepository
 from cartoframes.data.observatory.catalog.repository.geography_repo import GeographyRepository
+from cartoframes.data.observatory.catalog.repository.search_index import clear_search_indexes, get_search_index, \
+    register_entities
 from cartoframes.data.observatory.catalog.repository.constants import (
     CATEGORY_FILTER, COUNTRY_FILTER, GEOGRAPHY_FILTER, PUBLIC_FILTER
 )
@@ -279,3 +283,59 @@ class TestCatalog(object):
         assert str(e.value) == ('Credentials attribute is required. '
                                 'Please pass a `Credentials` instance '
                                 'or use the `set_default_credentials` function.')
+
+    @patch.object(Dataset, 'variables', new_callable=PropertyMock)
+    @patch.object(Geography, 'get_all')
+    @patch.object(Dataset, 'get_all')
+    def test_prefetch(self, mocked_datasets, mocked_geographies, mocked_variables):
+        # Given
+        mocked_datasets.return_value = test_datasets
+        mocked_geographies.return_value = test_geographies
+        catalog = Catalog().public()
+
+        # When
+        datasets = catalog.prefetch(countries=['usa', 'esp'], categories=['demographics'])
+
+        # Then
+        assert mocked_datasets.call_count == 2
+        mocked_datasets.assert_any_call({PUBLIC_FILTER: 'true', COUNTRY_FILTER: 'usa', CATEGORY_FILTER: 'demographics'})
+        mocked_datasets.assert_any_call({PUBLIC_FILTER: 'true', COUNTRY_FILTER: 'esp', CATEGORY_FILTER: 'demographics'})
+        assert mocked_geographies.call_count == 2
+        assert mocked_variables.call_count == 4
+        assert datasets == test_datasets + test_datasets
+
+    @patch.object(DatasetRepository, 'get_by_id_list')
+    def test_search(self, mocked_datasets):
+        # Given
+        clear_search_indexes()
+        register_entities('dataset', [test_dataset1, test_dataset2])
+        mocked_datasets.return_value = CatalogList([test_dataset2])
+
+        # When
+        datasets = Catalog().search('municipalities stats', entity='dataset', limit=1)
+        clear_search_indexes()
+
+        # Then
+        mocked_datasets.assert_called_once_with([test_dataset2.id])
+        assert datasets == [test_dataset2]
+        assert isinstance(datasets[0], Dataset)
+
+    @patch.object(DatasetRepository, 'get_by_id_list')
+    def test_search_fetches_the_entities_indexed_in_previous_sessions(self, mocked_datasets):
+        # Given
+        clear_search_indexes()
+        get_search_index('dataset').add([test_dataset1.data, test_dataset2.data])
+        mocked_datasets.return_value = CatalogList([test_dataset2])
+
+        # When
+        datasets = Catalog().search('municipalities stats', entity='dataset', limit=1)
+        clear_search_indexes()
+
+        # Then
+        mocked_datasets.assert_called_once_with([test_dataset2.id])
+        assert datasets == [test_dataset2]
+
+    def test_search_wrong_entity(self):
+        # When / Then
+        with pytest.raises(ValueError):
+            Catalog().search('income', entity='wrong')
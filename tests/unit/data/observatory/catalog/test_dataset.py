@@ -1,26 +1,37 @@
+import io
 import os
 
 import pytest
 import pandas as pd
 
 from unittest.mock import patch, ANY
+from shapely.geometry import Point
 from pyrestcli.exceptions import ServerErrorException
 
 from cartoframes.auth import Credentials
 from cartoframes.data.observatory.catalog.entity import CatalogList
 from cartoframes.data.observatory.catalog.dataset import Dataset
+from cartoframes.data.observatory.catalog.variable import Variable
 from cartoframes.data.observatory.catalog.repository.variable_repo import VariableRepository
 from cartoframes.data.observatory.catalog.repository.variable_group_repo import VariableGroupRepository
 from cartoframes.data.observatory.catalog.repository.dataset_repo import DatasetRepository
+from cartoframes.data.observatory.catalog.repository.geography_repo import GeographyRepository
 from cartoframes.data.observatory.catalog.subscription_info import SubscriptionInfo
 from cartoframes.data.observatory.catalog.repository.constants import DATASET_FILTER
 from .examples import (
     test_dataset1, test_datasets, test_variables, test_variables_groups, db_dataset1, test_dataset2,
-    db_dataset2, test_subscription_info
+    db_dataset2, test_subscription_info, db_variable1, db_variable2
 )
 from carto.do_dataset import DODataset
 
 
+class DoCredentials(object):
+    def __init__(self, public_project):
+        self.bq_public_project = public_project
+        self.bq_project = 'user_project'
+        self.bq_dataset = 'user_dataset'
+
+
 class TestDataset(object):
 
     @patch.object(DatasetRepository, 'get_by_id')
@@ -225,6 +236,23 @@ class TestDataset(object):
         assert isinstance(summary, pd.DataFrame)
         mocked_set.assert_not_called()
 
+    @patch.object(VariableRepository, 'get_by_id_list')
+    def test_summary_describe_variables(self, mocked_repo):
+        # Given
+        dataset = Dataset(db_dataset2)
+        summary_json = {'stats': {'avg': 1.5}, 'quantiles': {'q1': 1}}
+        variable1 = Variable(dict(db_variable1, summary_json=summary_json))
+        variable2 = Variable(dict(db_variable2, summary_json=summary_json))
+        mocked_repo.return_value = CatalogList([variable2])
+
+        # When
+        summary = dataset.describe(autoformat=False, variables=[variable1, db_variable2['slug'], 'unknown'])
+
+        # Then
+        mocked_repo.assert_called_once_with([db_variable2['slug'], 'unknown'])
+        assert list(summary.columns) == [db_variable1['column_name'], db_variable2['column_name']]
+        assert summary[db_variable1['column_name']].tolist() == [1.5, 1]
+
     @patch.object(DatasetRepository, 'get_all')
     def test_get_all_datasets(self, mocked_repo):
         # Given
@@ -320,6 +348,82 @@ class TestDataset(object):
         assert isinstance(sliced_dataset, pd.Series)
         assert sliced_dataset.equals(expected_dataset_df)
 
+    def test_datasets_filter(self):
+        # Given
+        datasets = test_datasets
+
+        # When
+        public_datasets = datasets.filter(provider_id='bbva', is_public_data=True)
+        any_datasets = datasets.filter(slug=[db_dataset1['slug'], db_dataset2['slug']])
+        mask_datasets = datasets.filter(id=lambda ids: ids.str.endswith('municipalities'))
+
+        # Then
+        assert isinstance(public_datasets, CatalogList)
+        assert public_datasets == [test_dataset1]
+        assert any_datasets == test_datasets
+        assert mask_datasets == [test_dataset2]
+
+    def test_datasets_filter_wrong_field(self):
+        # Given
+        datasets = test_datasets
+
+        # When / Then
+        with pytest.raises(ValueError):
+            datasets.filter(wrong_field='bbva')
+
+    def test_datasets_search(self):
+        # Given
+        datasets = test_datasets
+
+        # When
+        found_datasets = datasets.search('MUNICIPALITIES')
+        no_datasets = datasets.search('income')
+
+        # Then
+        assert isinstance(found_datasets, CatalogList)
+        assert found_datasets == [test_dataset2]
+        assert no_datasets == []
+
+    def test_datasets_sort_by(self):
+        # Given
+        datasets = CatalogList([test_dataset1, test_dataset2])
+
+        # When
+        sorted_datasets = datasets.sort_by('name', ascending=False)
+
+        # Then
+        assert isinstance(sorted_datasets, CatalogList)
+        assert sorted_datasets == [test_dataset2, test_dataset1]
+        assert datasets == [test_dataset1, test_dataset2]
+
+    def test_datasets_list_sort(self):
+        # Given
+        datasets = CatalogList([test_dataset1, test_dataset2])
+
+        # When
+        result = datasets.sort(key=lambda dataset: dataset.slug, reverse=True)
+
+        # Then
+        assert result is None
+        assert datasets == [test_dataset2, test_dataset1]
+        assert datasets.to_dataframe()['id'].tolist() == [db_dataset2['id'], db_dataset1['id']]
+
+    def test_datasets_to_dataframe_is_shared_until_the_list_is_modified(self):
+        # Given
+        datasets = CatalogList([test_dataset1])
+
+        # When
+        dataframe = datasets.to_dataframe()
+        shared_dataframe = datasets.to_dataframe()
+        datasets.append(test_dataset2)
+        modified_dataframe = datasets.to_dataframe()
+        datasets[1] = test_dataset1
+
+        # Then
+        assert shared_dataframe is dataframe
+        assert modified_dataframe['name'].tolist() == [db_dataset1['name'], db_dataset2['name']]
+        assert datasets.to_dataframe()['name'].tolist() == [db_dataset1['name'], db_dataset1['name']]
+
     @patch('cartoframes.data.observatory.catalog.subscriptions.get_subscription_ids')
     @patch.object(DatasetRepository, 'get_by_id')
     @patch.object(DODataset, 'download_stream')
@@ -327,7 +431,7 @@ class TestDataset(object):
         # Given
         mock_get_by_id.return_value = test_dataset1
         dataset = Dataset.get(test_dataset1.id)
-        mock_download_stream.return_value = []
+        mock_download_stream.return_value = io.BytesIO()
         mock_subscription_ids.return_value = [test_dataset1.id]
         credentials = Credentials('fake_user', '1234')
 
@@ -359,7 +463,7 @@ class TestDataset(object):
         # Given
         mock_get_by_id.return_value = test_dataset1  # is public
         dataset = Dataset.get(test_dataset1.id)
-        mock_download_stream.return_value = []
+        mock_download_stream.return_value = io.BytesIO()
         credentials = Credentials('fake_user', '1234')
 
         dataset.to_csv('fake_path', credentials)
@@ -546,3 +650,171 @@ class TestDataset(object):
             'We are sorry, the Data Observatory is not enabled for your account yet. '
             'Please contact your customer success manager or send an email to '
             'sales@carto.com to request access to it.')
+
+    @patch.object(DatasetRepository, 'get_all')
+    @patch.object(GeographyRepository, 'get_geographies_ids_by_geometry')
+    def test_get_datasets_spatial_filtered_batch(self, mocked_geographies_ids, mocked_datasets):
+        # Given
+        geography1 = db_dataset1['geography_id']
+        geography2 = db_dataset2['geography_id']
+        mocked_geographies_ids.return_value = [[geography2], [], [geography1, geography2]]
+        mocked_datasets.return_value = test_datasets
+
+        # When
+        datasets = Dataset.get_datasets_spatial_filtered_batch(['POINT(0 0)', 'POINT(1 1)', 'POINT(2 2)'])
+
+        # Then
+        mocked_datasets.assert_called_once_with({'geography_id': sorted([geography1, geography2])})
+        assert datasets == [
+            CatalogList([test_dataset2]),
+            CatalogList([]),
+            CatalogList([test_dataset1, test_dataset2])
+        ]
+
+    @patch.object(DODataset, 'download_stream')
+    def test_dataset_download_resume(self, mock_download_stream, tmp_path):
+        # Given
+        file_path = str(tmp_path / 'dataset.csv')
+        with open(file_path, 'wb') as f:
+            f.write(b'id,value\n1,a')
+        mock_download_stream.return_value = io.BytesIO(b'id,value\n1,a\n2,b\n')
+        dataset = Dataset(db_dataset1)
+
+        # When
+        dataset._download(Credentials('fake_user', '1234'), file_path, resume=True)
+
+        # Then
+        with open(file_path, 'rb') as f:
+            assert f.read() == b'id,value\n1,a\n2,b\n'
+
+    @patch.object(DODataset, 'download_stream')
+    def test_dataset_download_compression(self, mock_download_stream, tmp_path):
+        # Given
+        file_path = str(tmp_path / 'dataset.csv.gz')
+        mock_download_stream.return_value = io.BytesIO(b'id,value\n1,a\n2,b\n')
+        dataset = Dataset(db_dataset1)
+
+        # When
+        dataset._download(Credentials('fake_user', '1234'), file_path, compression='gzip')
+
+        # Then
+        assert pd.read_csv(file_path)['value'].tolist() == ['a', 'b']
+
+    def test_dataset_download_wrong_compression(self):
+        # Given
+        dataset = Dataset(db_dataset1)
+
+        # When
+        with pytest.raises(ValueError) as e:
+            dataset._download(Credentials('fake_user', '1234'), 'fake_path', compression='zip')
+
+        # Then
+        assert str(e.value) == 'Wrong compression "zip". Valid values are: gzip, bz2, xz'
+
+    @patch.object(DODataset, 'download_stream')
+    def test_dataset_download_chunks(self, mock_download_stream):
+        # Given
+        mock_download_stream.return_value = io.BytesIO(
+            b'id,geom\n1,POINT (0 0)\n2,POINT (1 1)\n3,POINT (2 2)\n')
+        dataset = Dataset(db_dataset1)
+
+        # When
+        chunks = list(dataset._download(Credentials('fake_user', '1234'), chunksize=2))
+
+        # Then
+        assert [len(chunk) for chunk in chunks] == [2, 1]
+        assert chunks[1].geometry[2].wkt == 'POINT (2 2)'
+
+    @patch.object(Credentials, '_get_do_credentials')
+    @patch.object(VariableRepository, 'get_all')
+    @patch.object(DODataset, 'download_stream')
+    def test_dataset_download_pushdown(self, mock_download_stream, mocked_variables, mocked_do_credentials):
+        # Given
+        mocked_variables.return_value = test_variables
+        mocked_do_credentials.return_value = DoCredentials('carto-do-public-data')
+        mock_download_stream.return_value = io.BytesIO(b'geoid,pop\n01,10\n')
+        dataset = Dataset(db_dataset1)
+
+        # When
+        dataset.to_dataframe(Credentials('fake_user', '1234'), columns=['pop'], where='pop > 5',
+                             bbox=(0, 0, 1, 1))
+
+        # Then
+        mock_download_stream.assert_called_once_with(
+            limit=None, order_by=None, add_geom=None, is_geography=False, sql_query=(
+                'SELECT geoid, pop FROM $dataset$ WHERE (pop > 5) AND '
+                '(geoid IN (SELECT geoid FROM `{}` WHERE ST_INTERSECTS(geom, ST_GEOGFROMTEXT('
+                "'POLYGON ((1 0, 1 1, 0 1, 0 0, 1 0))'))))".format(db_dataset1['geography_id'])))
+
+    @patch.object(Credentials, '_get_do_credentials')
+    @patch.object(DODataset, 'download_stream')
+    def test_dataset_download_pushdown_premium_geography(self, mock_download_stream, mocked_do_credentials):
+        # Given
+        mocked_do_credentials.return_value = DoCredentials('carto-do')
+        mock_download_stream.return_value = io.BytesIO(b'geoid,pop\n')
+        dataset = Dataset(db_dataset1)
+
+        # When
+        dataset.to_dataframe(Credentials('fake_user', '1234'), geometry='POINT (1 2)')
+
+        # Then
+        assert mock_download_stream.call_args[1]['sql_query'] == (
+            'SELECT * FROM $dataset$ WHERE (geoid IN (SELECT geoid FROM '
+            "`user_project.user_dataset.view_tiger_geography_esp_census_2019` "
+            "WHERE ST_INTERSECTS(geom, ST_GEOGFROMTEXT('POINT (1 2)'))))")
+
+    @patch.object(Credentials, '_get_do_credentials')
+    @patch.object(DODataset, 'download_stream')
+    def test_dataset_download_pushdown_large_area(self, mock_download_stream, mocked_do_credentials):
+        # Given
+        mocked_do_credentials.return_value = DoCredentials('carto-do-public-data')
+        # Thousands of geoids intersect the area, but none of them is sent in the query
+        mock_download_stream.return_value = io.BytesIO(
+            ('geoid,pop\n' + ''.join('{:012d},1\n'.format(i) for i in range(20000))).encode())
+        dataset = Dataset(db_dataset1)
+
+        # When
+        gdf = dataset.to_dataframe(Credentials('fake_user', '1234'), bbox=(-75, 40, -73, 41.5))
+
+        # Then
+        assert len(gdf) == 20000
+        mock_download_stream.assert_called_once()
+        assert len(mock_download_stream.call_args[1]['sql_query']) < 500
+
+    def test_dataset_download_pushdown_geometry_too_complex(self):
+        # Given
+        dataset = Dataset(db_dataset1)
+        geometry = Point(0, 0).buffer(1, 2000)
+
+        # When
+        with pytest.raises(ValueError) as e:
+            dataset.to_dataframe(Credentials('fake_user', '1234'), geometry=geometry)
+
+        # Then
+        assert str(e.value).startswith('The geometry is too complex to filter the download')
+
+    @patch.object(VariableRepository, 'get_all')
+    def test_dataset_download_pushdown_wrong_columns(self, mocked_variables):
+        # Given
+        mocked_variables.return_value = test_variables
+        dataset = Dataset(db_dataset1)
+
+        # When
+        with pytest.raises(ValueError) as e:
+            dataset.to_dataframe(Credentials('fake_user', '1234'), columns=['pop', 'wrong'])
+
+        # Then
+        assert str(e.value) == 'The following columns are not valid for the dataset {}: wrong'.format(
+            db_dataset1['id'])
+
+    def test_dataset_download_pushdown_with_sql_query(self):
+        # Given
+        dataset = Dataset(db_dataset1)
+
+        # When
+        with pytest.raises(ValueError) as e:
+            dataset.to_dataframe(Credentials('fake_user', '1234'), sql_query='SELECT * FROM $dataset$',
+                                 where='pop > 5')
+
+        # Then
+        assert str(e.value) == 'The sql_query argument can not be combined with columns, where, bbox or geometry.'
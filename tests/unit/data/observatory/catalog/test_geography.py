@@ -1,3 +1,4 @@
+import io
 import os
 
 import pytest
@@ -227,7 +228,7 @@ class TestGeography(object):
         # Given
         mock_get_by_id.return_value = test_geography1
         geography = Geography.get(test_geography1.id)
-        mock_download_stream.return_value = []
+        mock_download_stream.return_value = io.BytesIO()
         mock_subscription_ids.return_value = [test_geography1.id]
         credentials = Credentials('fake_user', '1234')
 
@@ -258,7 +259,7 @@ class TestGeography(object):
         # Given
         mock_get_by_id.return_value = test_geography1  # is public
         geography = Geography.get(test_geography1.id)
-        mock_download_stream.return_value = []
+        mock_download_stream.return_value = io.BytesIO()
         credentials = Credentials('fake_user', '1234')
 
         geography.to_csv('fake_path', credentials)
@@ -446,3 +447,18 @@ class TestGeography(object):
             'We are sorry, the Data Observatory is not enabled for your account yet. '
             'Please contact your customer success manager or send an email to '
             'sales@carto.com to request access to it.')
+
+    @patch.object(DODataset, 'download_stream')
+    def test_geography_download_pushdown(self, mock_download_stream):
+        # Given
+        mock_download_stream.return_value = io.BytesIO(b'geoid,geom\n')
+        geography = Geography(db_geography1)
+
+        # When
+        geography.to_dataframe(Credentials('fake_user', '1234'), columns=['name'], geometry='POINT (1 2)')
+
+        # Then
+        mock_download_stream.assert_called_once_with(
+            limit=None, order_by=None, add_geom=None, is_geography=True, sql_query=(
+                'SELECT geoid, geom, name FROM $geography$ WHERE '
+                "(ST_INTERSECTS(geom, ST_GEOGFROMTEXT('POINT (1 2)')))"))
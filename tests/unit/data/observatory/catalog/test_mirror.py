@@ -0,0 +1,133 @@
+import io
+import os
+
+import pytest
+import geopandas as gpd
+
+from unittest.mock import patch
+from shapely.geometry import Point
+
+from carto.do_dataset import DODataset
+from cartoframes.auth import Credentials
+from cartoframes.exceptions import DOError
+from cartoframes.data.observatory.catalog.dataset import Dataset
+from cartoframes.data.observatory.catalog.mirror import _quadkeys, read_manifest
+from .examples import db_dataset1
+
+CSV_DATA = b'geoid,pop,geom\n1,10,POINT (-3.7 40.4)\n2,20,POINT (2.1 41.3)\n3,30,POINT (-73.9 40.7)\n'
+
+
+def test_quadkeys():
+    # Given
+    points = gpd.GeoSeries([Point(-3.7, 40.4), Point(-73.9, 40.7), None])
+
+    # When
+    quadkeys = _quadkeys(points, 4)
+
+    # Then
+    assert quadkeys.tolist() == ['0331', '0320', '']
+
+
+@patch.object(DODataset, 'download_stream')
+def test_sync(mock_download_stream, tmp_path):
+    # Given
+    pytest.importorskip('pyarrow')
+    mock_download_stream.return_value = io.BytesIO(CSV_DATA)
+    dataset = Dataset(db_dataset1)
+    credentials = Credentials('fake_user', '1234')
+
+    # When
+    mirror = dataset.sync(str(tmp_path), credentials)
+    dataset.sync(str(tmp_path), credentials)
+
+    # Then
+    manifest = read_manifest(mirror)
+    assert mirror == os.path.join(str(tmp_path), db_dataset1['id'])
+    assert manifest['version'] == db_dataset1['version']
+    assert manifest['rows'] == 3
+    assert [part['path'] for part in manifest['parts']] == [
+        os.path.join('quadkey=0320', 'part-00000.parquet'),
+        os.path.join('quadkey=0331', 'part-00000.parquet'),
+        os.path.join('quadkey=1202', 'part-00000.parquet')
+    ]
+    mock_download_stream.assert_called_once()
+
+
+@patch.object(DODataset, 'download_stream')
+def test_to_dataframe_from_mirror(mock_download_stream, tmp_path):
+    # Given
+    pytest.importorskip('pyarrow')
+    mock_download_stream.return_value = io.BytesIO(CSV_DATA)
+    dataset = Dataset(db_dataset1)
+    dataset.sync(str(tmp_path), Credentials('fake_user', '1234'))
+
+    # When
+    gdf = dataset.to_dataframe(Credentials('fake_user', '1234'), mirror_path=str(tmp_path), columns=['pop'],
+                               bbox=(-10, 35, 10, 45))
+
+    # Then
+    assert gdf.columns.tolist() == ['geoid', 'pop', 'geom']
+    assert sorted(gdf['pop'].tolist()) == [10, 20]
+    assert gdf.geometry.name == 'geom'
+    mock_download_stream.assert_called_once()
+
+
+@patch.object(DODataset, 'download_stream')
+def test_to_dataframe_from_mirror_without_geom(mock_download_stream, tmp_path):
+    # Given
+    pytest.importorskip('pyarrow')
+    mock_download_stream.return_value = io.BytesIO(CSV_DATA)
+    dataset = Dataset(db_dataset1)
+    dataset.sync(str(tmp_path), Credentials('fake_user', '1234'))
+
+    # When
+    gdf = dataset.to_dataframe(Credentials('fake_user', '1234'), mirror_path=str(tmp_path), add_geom=False)
+
+    # Then
+    assert gdf.columns.tolist() == ['geoid', 'pop']
+    mock_download_stream.assert_called_once()
+
+
+def test_to_dataframe_mirror_not_used_by_default(tmp_path, mocker):
+    # Given
+    pytest.importorskip('pyarrow')
+    dataset = Dataset(db_dataset1)
+    mocker.patch('cartoframes.data.observatory.catalog.dataset.get_mirror_path', return_value=str(tmp_path))
+    mock_read_manifest = mocker.patch('cartoframes.data.observatory.catalog.dataset.read_manifest')
+
+    # When
+    with patch.object(DODataset, 'download_stream', return_value=io.BytesIO(CSV_DATA)) as mock_download_stream:
+        dataset.to_dataframe(Credentials('fake_user', '1234'))
+
+    # Then
+    mock_read_manifest.assert_not_called()
+    mock_download_stream.assert_called_once()
+
+
+def test_to_dataframe_mirror_not_subscribed(tmp_path, mocker):
+    # Given
+    pytest.importorskip('pyarrow')
+    dataset = Dataset(db_dataset1)
+    with patch.object(DODataset, 'download_stream', return_value=io.BytesIO(CSV_DATA)):
+        dataset.sync(str(tmp_path), Credentials('fake_user', '1234'))
+    mocker.patch.object(Dataset, 'is_subscribed', return_value=False)
+
+    # When
+    with pytest.raises(DOError):
+        dataset.to_dataframe(Credentials('fake_user', '1234'), mirror_path=str(tmp_path))
+
+
+def test_to_dataframe_outdated_mirror(tmp_path):
+    # Given
+    pytest.importorskip('pyarrow')
+    dataset = Dataset(db_dataset1)
+    with patch.object(DODataset, 'download_stream', return_value=io.BytesIO(CSV_DATA)):
+        dataset.sync(str(tmp_path), Credentials('fake_user', '1234'))
+    new_dataset = Dataset(dict(db_dataset1, version='new_version'))
+
+    # When
+    with patch.object(DODataset, 'download_stream', return_value=io.BytesIO(CSV_DATA)) as mock_download_stream:
+        new_dataset.to_dataframe(Credentials('fake_user', '1234'), mirror_path=str(tmp_path))
+
+    # Then
+    mock_download_stream.assert_called_once()
@@ -0,0 +1,86 @@
+import pytest
+
+from unittest.mock import Mock
+
+from carto.do_subscriptions import DOSubscriptionManager, DOSubscriptionCreationManager
+from cartoframes.auth import Credentials
+from cartoframes.data.observatory.catalog import subscriptions
+from cartoframes.data.observatory.catalog.subscriptions import Subscriptions, get_subscription_ids, \
+    invalidate_subscriptions, trigger_subscription
+
+credentials = Credentials('fake_user', '1234')
+
+
+def _subscription(id, type, status='active'):
+    return Mock(id=id, type=type, status=status)
+
+
+@pytest.fixture(autouse=True)
+def subscriptions_all(mocker):
+    invalidate_subscriptions()
+    yield mocker.patch.object(DOSubscriptionManager, 'all', return_value=[
+        _subscription('dataset1', 'dataset'),
+        _subscription('dataset2', 'dataset', 'requested'),
+        _subscription('geography1', 'geography')
+    ])
+    invalidate_subscriptions()
+
+
+def test_get_subscription_ids_is_cached(subscriptions_all):
+    # When
+    dataset_ids = get_subscription_ids(credentials, 'dataset')
+    geography_ids = get_subscription_ids(credentials, 'geography')
+    all_ids = get_subscription_ids(credentials)
+
+    # Then
+    assert dataset_ids == frozenset(['dataset1'])
+    assert geography_ids == frozenset(['geography1'])
+    assert all_ids == frozenset(['dataset1', 'geography1'])
+    assert get_subscription_ids(credentials, 'dataset') is dataset_ids
+    assert subscriptions_all.call_count == 1
+
+
+def test_get_subscription_ids_by_credentials(subscriptions_all):
+    # When
+    get_subscription_ids(credentials, 'dataset')
+    get_subscription_ids(Credentials('other_user', '1234'), 'dataset')
+
+    # Then
+    assert subscriptions_all.call_count == 2
+
+
+def test_get_subscription_ids_expires(mocker, subscriptions_all):
+    # Given
+    get_subscription_ids(credentials, 'dataset')
+    mocker.patch.object(subscriptions.time, 'time', return_value=subscriptions.time.time() + 3600)
+
+    # When
+    get_subscription_ids(credentials, 'dataset')
+
+    # Then
+    assert subscriptions_all.call_count == 2
+
+
+def test_trigger_subscription_invalidates(mocker, subscriptions_all):
+    # Given
+    mocker.patch.object(DOSubscriptionCreationManager, 'create', return_value=Mock())
+    get_subscription_ids(credentials, 'dataset')
+
+    # When
+    trigger_subscription('dataset2', 'dataset', credentials)
+    get_subscription_ids(credentials, 'dataset')
+
+    # Then
+    assert subscriptions_all.call_count == 2
+
+
+def test_subscriptions_refresh(subscriptions_all):
+    # Given
+    get_subscription_ids(credentials, 'dataset')
+
+    # When
+    Subscriptions(credentials).refresh()
+    get_subscription_ids(credentials, 'dataset')
+
+    # Then
+    assert subscriptions_all.call_count == 2
@@ -7,6 +7,7 @@ from cartoframes.data.observatory.catalog.variable import Variable
 from cartoframes.data.observatory.catalog.repository.variable_repo import VariableRepository
 from cartoframes.data.observatory.catalog.repository.dataset_repo import DatasetRepository
 from cartoframes.data.observatory.catalog.repository.constants import VARIABLE_FILTER
+from cartoframes.data.observatory.catalog.summary import variable_describe
 from .examples import test_datasets, test_variable1, test_variables, db_variable1, test_variable2, db_variable2
 
 
@@ -177,6 +178,31 @@ class TestVariable(object):
         assert isinstance(sliced_variable, pd.Series)
         assert sliced_variable.equals(expected_variable_df)
 
+    def test_summary_is_memoized(self):
+        # Given
+        variable = Variable(dict(db_variable1, summary_json={
+            'stats': {'avg': 1.5, 'max': 2, 'min': 1},
+            'quantiles': {'q1': 1, 'q3': 2},
+            'head': [1, 2],
+            'counts': {'all': 2, 'null': 0}
+        }))
+
+        # When
+        with patch('cartoframes.data.observatory.catalog.variable.variable_describe',
+                   wraps=variable_describe) as mocked_describe:
+            first_describe = variable.describe(autoformat=False)
+            first_describe['avg'] = 0
+            second_describe = variable.describe(autoformat=False)
+        first_counts = variable.counts()
+        second_counts = variable.counts()
+
+        # Then
+        mocked_describe.assert_called_once()
+        assert second_describe['avg'] == 1.5
+        assert second_describe['q1'] == 1
+        assert first_counts.equals(second_counts)
+        assert first_counts is not second_counts
+
     @patch.object(pd, 'set_option')
     @patch.object(VariableRepository, 'get_all')
     def test_summary_describe(self, mocked_repo, mocked_set):
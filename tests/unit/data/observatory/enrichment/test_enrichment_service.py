@@ -0,0 +1,191 @@
+import io
+import pytest
+import pandas as pd
+import geopandas as gpd
+
+from shapely.geometry import Point
+
+from cartoframes.auth import Credentials
+from cartoframes.exceptions import EnrichmentError
+from cartoframes.data.observatory.catalog.variable import Variable
+from cartoframes.data.observatory.enrichment.enrichment_service import EnrichmentService, _ENRICHMENT_ID
+
+credentials = Credentials('fake_user', '1234')
+
+
+def _mock_remote_enrichment(mocker, failures=None):
+    failures = failures or {}
+
+    def upload_data(temp_table_name, geodataframe):
+        return geodataframe
+
+    def execute_enrichment(dataset, temp_table_name, geom_type, variables, filters, aggregation, dtypes=None):
+        first_id = dataset[_ENRICHMENT_ID].iloc[0]
+        if failures.get(first_id, 0) > 0:
+            failures[first_id] -= 1
+            raise EnrichmentError('Couldn\'t enrich the dataframe')
+        ids = dataset[_ENRICHMENT_ID].values
+        return pd.DataFrame({_ENRICHMENT_ID: ids, 'pop': ids * 10})
+
+    mocker.patch.object(Variable, 'get_list', return_value=[])
+    upload = mocker.patch.object(EnrichmentService, '_upload_data', side_effect=upload_data)
+    mocker.patch.object(EnrichmentService, '_execute_enrichment', side_effect=execute_enrichment)
+    return upload
+
+
+def _points(n):
+    return gpd.GeoDataFrame({'name': range(n)}, geometry=[Point(i, i) for i in range(n)], crs='epsg:4326')
+
+
+def test_enrich_in_chunks(mocker):
+    # Given
+    upload = _mock_remote_enrichment(mocker)
+    service = EnrichmentService(credentials, chunk_size=3, max_workers=2)
+
+    # When
+    result = service._enrich('points', _points(10), ['pop'])
+
+    # Then
+    assert upload.call_count == 4
+    assert sorted(len(call[0][1]) for call in upload.call_args_list) == [1, 3, 3, 3]
+    assert result['name'].tolist() == list(range(10))
+    assert result['pop'].tolist() == [i * 10 for i in range(10)]
+
+
+def test_enrich_retries_failed_chunks(mocker):
+    # Given
+    upload = _mock_remote_enrichment(mocker, failures={3: 2})
+    service = EnrichmentService(credentials, chunk_size=3, retry_times=3)
+
+    # When
+    result = service._enrich('points', _points(6), ['pop'])
+
+    # Then
+    assert upload.call_count == 4
+    assert result['pop'].tolist() == [i * 10 for i in range(6)]
+
+
+def test_enrich_raises_when_retries_are_exhausted(mocker):
+    # Given
+    _mock_remote_enrichment(mocker, failures={0: 3})
+    service = EnrichmentService(credentials, chunk_size=3, retry_times=3)
+
+    # When / Then
+    with pytest.raises(EnrichmentError):
+        service._enrich('points', _points(6), ['pop'])
+
+
+def test_enrich_duplicated_geometries_once(mocker):
+    # Given
+    upload = _mock_remote_enrichment(mocker)
+    service = EnrichmentService(credentials)
+    df = gpd.GeoDataFrame({'sku': ['a', 'b', 'c', 'd', 'e']},
+                          geometry=[Point(0, 0), Point(1, 1), Point(0, 0), None, Point(1, 1)], crs='epsg:4326')
+
+    # When
+    result = service._enrich('points', df, ['pop'])
+
+    # Then
+    assert upload.call_count == 1
+    assert upload.call_args[0][1][_ENRICHMENT_ID].tolist() == [0, 1]
+    assert result['sku'].tolist() == ['a', 'b', 'c', 'd', 'e']
+    assert result['pop'].tolist()[:3] == [0, 10, 0]
+    assert pd.isnull(result['pop'][3])
+    assert result['pop'][4] == 10
+
+
+def test_merge_aligns_by_position():
+    # Given
+    service = EnrichmentService(credentials)
+    df = _points(4)
+    geodataframe = service._prepare_data(df, None)
+    enriched = pd.DataFrame({_ENRICHMENT_ID: [2, 0, 1], 'pop': [20, 0, 10]})
+
+    # When
+    result = service._merge(geodataframe, enriched)
+
+    # Then
+    assert list(result.columns) == ['name', 'geometry', 'pop']
+    assert result['pop'].tolist()[:3] == [0, 10, 20]
+    assert pd.isnull(result['pop'][3])
+    assert list(df.columns) == ['name', 'geometry']
+
+
+def test_merge_several_rows_per_geometry_keeps_the_index():
+    # Given
+    service = EnrichmentService(credentials)
+    df = _points(3)
+    df.index = ['x', 'y', 'z']
+    geodataframe = service._prepare_data(df, None)
+    enriched = pd.DataFrame({_ENRICHMENT_ID: [0, 2, 0], 'pop': [1, 2, 3]})
+
+    # When
+    result = service._merge(geodataframe, enriched)
+
+    # Then
+    assert result.index.tolist() == ['x', 'x', 'y', 'z']
+    assert result['name'].tolist() == [0, 0, 1, 2]
+    assert result['pop'].tolist()[:2] == [1, 3]
+    assert pd.isnull(result['pop'].iloc[2])
+
+
+def test_merge_by_position_keeps_the_index():
+    # Given
+    service = EnrichmentService(credentials)
+    df = _points(3)
+    df.index = ['x', 'y', 'z']
+    geodataframe = service._prepare_data(df, None)
+    enriched = pd.DataFrame({_ENRICHMENT_ID: [0, 1, 2], 'pop': [1, 2, 3]})
+
+    # When
+    result = service._merge(geodataframe, enriched)
+
+    # Then
+    assert result.index.tolist() == ['x', 'y', 'z']
+
+
+def test_get_dtypes(mocker):
+    # Given
+    mocker.patch.object(Variable, 'get_list', return_value=[
+        Variable({'id': 'pop', 'slug': 'pop', 'column_name': 'pop', 'db_type': 'INTEGER', 'agg_method': 'SUM'}),
+        Variable({'id': 'cat', 'slug': 'cat', 'column_name': 'cat', 'db_type': 'STRING', 'agg_method': None}),
+        Variable({'id': 'inc', 'slug': 'inc', 'column_name': 'inc', 'db_type': 'FLOAT', 'agg_method': 'AVG'})
+    ])
+    service = EnrichmentService(credentials)
+
+    # When
+    dtypes = service._get_dtypes(['pop', 'cat', 'inc'], {'inc': 'STRING_AGG'})
+
+    # Then
+    assert dtypes == {_ENRICHMENT_ID: 'int64', 'pop': 'Int64'}
+
+
+def test_get_dtypes_integer_average(mocker):
+    # Given
+    mocker.patch.object(Variable, 'get_list', return_value=[
+        Variable({'id': 'pop', 'slug': 'pop', 'column_name': 'pop', 'db_type': 'INT64', 'agg_method': 'SUM'})
+    ])
+    service = EnrichmentService(credentials)
+
+    # When
+    dtypes = service._get_dtypes(['pop'], 'AVG')
+
+    # Then
+    assert dtypes == {_ENRICHMENT_ID: 'int64', 'pop': 'float64'}
+
+
+def test_merge_integer_columns_with_nulls():
+    # Given
+    service = EnrichmentService(credentials)
+    geodataframe = service._prepare_data(_points(3), None)
+    enriched = pd.read_csv(io.StringIO('{},pop\n0,10\n2,30\n'.format(_ENRICHMENT_ID)),
+                           dtype={_ENRICHMENT_ID: 'int64', 'pop': 'Int64'})
+
+    # When
+    result = service._merge(geodataframe, enriched)
+
+    # Then
+    assert str(result['pop'].dtype) == 'Int64'
+    assert result['pop'].tolist()[0] == 10
+    assert pd.isna(result['pop'][1])
+    assert result['pop'][2] == 30
@@ -0,0 +1,173 @@
+import pytest
+import pandas as pd
+import geopandas as gpd
+
+from shapely.geometry import Point, box
+
+from cartoframes.auth import Credentials
+from cartoframes.exceptions import EnrichmentError
+from cartoframes.data.observatory import Enrichment
+from cartoframes.data.observatory.catalog.dataset import Dataset
+from cartoframes.data.observatory.catalog.variable import Variable
+from cartoframes.data.observatory.enrichment.enrichment_service import EnrichmentService
+
+db_variable_pop = {
+    'id': 'carto-do.project.dataset1.pop',
+    'slug': 'pop',
+    'name': 'pop',
+    'column_name': 'pop',
+    'db_type': 'INTEGER',
+    'dataset_id': 'dataset1',
+    'agg_method': 'SUM'
+}
+db_variable_income = {
+    'id': 'carto-do.project.dataset1.income',
+    'slug': 'income',
+    'name': 'income',
+    'column_name': 'income',
+    'db_type': 'FLOAT',
+    'dataset_id': 'dataset1',
+    'agg_method': 'AVG'
+}
+variables = [Variable(db_variable_pop), Variable(db_variable_income)]
+
+# Two adjacent geographies of 1x1 degree
+do_gdf = gpd.GeoDataFrame({
+    'geoid': ['a', 'b'],
+    'pop': [100, 200],
+    'income': [10.0, 20.0]
+}, geometry=[box(0, 0, 1, 1), box(1, 0, 2, 1)], crs='epsg:4326')
+
+credentials = Credentials('fake_user', '1234')
+
+
+def _enrich(mocker, method, df, variables_list=None, **kwargs):
+    mocker.patch.object(Variable, 'get_list', return_value=variables_list or variables)
+    mocker.patch.object(Dataset, 'get', return_value=Dataset({'id': 'dataset1'}))
+    to_dataframe = mocker.patch.object(Dataset, 'to_dataframe', return_value=do_gdf.copy())
+
+    enrichment = Enrichment(credentials=credentials, engine='local')
+    result = getattr(enrichment, method)(df, variables=['pop', 'income'], **kwargs)
+
+    return result, to_dataframe
+
+
+def test_wrong_engine():
+    with pytest.raises(ValueError):
+        EnrichmentService(credentials, engine='wrong')
+
+
+def test_enrich_points(mocker):
+    # Given
+    df = gpd.GeoDataFrame({'name': ['p1', 'p2', 'p3']},
+                          geometry=[Point(0.5, 0.5), Point(1.5, 0.5), Point(5, 5)], crs='epsg:4326')
+
+    # When
+    result, to_dataframe = _enrich(mocker, 'enrich_points', df)
+
+    # Then
+    to_dataframe.assert_called_once_with(credentials, columns=['pop', 'income'], bbox=(0.5, 0.5, 5.0, 5.0),
+                                         mirror_path=None, use_mirror=True)
+    assert result['name'].tolist() == ['p1', 'p2', 'p3']
+    assert result['pop'].tolist()[:2] == [100, 200]
+    assert pd.isnull(result['pop'][2])
+    assert result['do_area'][0] > 0
+
+
+def test_enrich_points_in_a_shared_boundary(mocker):
+    # Given
+    df = gpd.GeoDataFrame({'name': ['boundary', 'p2']}, geometry=[Point(1, 0.5), Point(1.5, 0.5)], crs='epsg:4326')
+
+    # When
+    result, _ = _enrich(mocker, 'enrich_points', df)
+
+    # Then
+    assert result['name'].tolist() == ['boundary', 'boundary', 'p2']
+    assert result['pop'].tolist() == [100, 200, 200]
+    assert result.index.tolist() == [0, 0, 1]
+
+
+def test_enrich_polygons_sum_is_weighted(mocker):
+    # Given
+    df = gpd.GeoDataFrame({'name': ['half_a', 'a_and_b']},
+                          geometry=[box(0, 0, 0.5, 1), box(0, 0, 2, 1)], crs='epsg:4326')
+
+    # When
+    result, _ = _enrich(mocker, 'enrich_polygons', df)
+
+    # Then
+    assert result['pop'].round(6).tolist() == [50, 300]
+    assert result['income'].tolist() == [10.0, 15.0]
+
+
+def test_enrich_polygons_custom_aggregations(mocker):
+    # Given
+    df = gpd.GeoDataFrame({'name': ['a_and_b']}, geometry=[box(0, 0, 2, 1)], crs='epsg:4326')
+
+    # When
+    result, _ = _enrich(mocker, 'enrich_polygons', df, aggregation={'pop': ['max', 'count'], 'income': 'min'})
+
+    # Then
+    assert result['max_pop'].tolist() == [200]
+    assert result['count_pop'].tolist() == [2]
+    assert result['income'].tolist() == [10.0]
+
+
+def test_enrich_polygons_without_aggregation(mocker):
+    # Given
+    df = gpd.GeoDataFrame({'name': ['a_and_b']}, geometry=[box(0, 0, 2, 1)], crs='epsg:4326')
+
+    # When
+    result, _ = _enrich(mocker, 'enrich_polygons', df, aggregation=None)
+
+    # Then
+    assert result['name'].tolist() == ['a_and_b', 'a_and_b']
+    assert result['do_geoid'].tolist() == ['a', 'b']
+    assert result['pop'].tolist() == [100, 200]
+    assert (result['intersected_area'].round() == result['do_area'].round()).all()
+    assert (result['user_area'] > result['do_area']).all()
+
+
+def test_enrich_polygons_with_filters(mocker):
+    # Given
+    df = gpd.GeoDataFrame({'name': ['a_and_b']}, geometry=[box(0, 0, 2, 1)], crs='epsg:4326')
+
+    # When
+    result, _ = _enrich(mocker, 'enrich_polygons', df, filters={'income': '> 15'})
+
+    # Then
+    assert result['pop'].round(6).tolist() == [200]
+    assert result['income'].tolist() == [20.0]
+
+
+def test_enrich_polygons_unsupported_filter(mocker):
+    # Given
+    df = gpd.GeoDataFrame({'name': ['a']}, geometry=[box(0, 0, 1, 1)], crs='epsg:4326')
+
+    # When / Then
+    with pytest.raises(EnrichmentError):
+        _enrich(mocker, 'enrich_polygons', df, filters={'income': "LIKE '%a%'"})
+
+
+def test_enrich_polygons_unsupported_aggregation(mocker):
+    # Given
+    df = gpd.GeoDataFrame({'name': ['a']}, geometry=[box(0, 0, 1, 1)], crs='epsg:4326')
+
+    # When / Then
+    with pytest.raises(EnrichmentError):
+        _enrich(mocker, 'enrich_polygons', df, aggregation='STDDEV')
+
+
+def test_enrich_polygons_column_names(mocker):
+    # Given
+    df = gpd.GeoDataFrame({'name': ['a_and_b']}, geometry=[box(0, 0, 2, 1)], crs='epsg:4326')
+    aggregation = {'pop': ['max', 'count'], 'income': 'min'}
+
+    # When
+    result, _ = _enrich(mocker, 'enrich_polygons', df, aggregation=aggregation)
+
+    # Then: the columns are named like the aggregated columns of the remote engine
+    assert list(result.columns) == ['name', 'geometry', 'max_pop', 'count_pop', 'income']
+    assert result.drop(columns='geometry').to_dict('records') == [
+        {'name': 'a_and_b', 'max_pop': 200, 'count_pop': 2, 'income': 10.0}
+    ]
@@ -0,0 +1,94 @@
+import hashlib
+
+from pandas import DataFrame
+from geopandas import GeoDataFrame
+from shapely.geometry import Point
+
+from cartoframes.auth import Credentials
+from cartoframes.data.services import Geocoding
+from cartoframes.data.services import geocoding as geocoding_module
+from cartoframes.data.services.service import Service
+from cartoframes.data.services.utils.geocoding_constants import HASH_COLUMN
+from cartoframes.data.services.utils.geocoding_utils import local_hashes
+
+CREDENTIALS = Credentials('fake_user', 'fake_api_key')
+
+
+def _execute_query(query):
+    if 'cdb_service_quota_info' in query:
+        return {'rows': [{'service': 'hires_geocoder', 'monthly_quota': 10, 'used_quota': 0, 'provider': 'here'}]}
+    if 'pg_try_advisory_lock' in query:
+        return {'rows': [{'pg_try_advisory_lock': True}]}
+    if 'pg_advisory_unlock' in query:
+        return {'rows': [{'pg_advisory_unlock': True}]}
+    if 'gc_state' in query:
+        return {'rows': [{'gc_state': 'new_geocoded', 'count': 2}]}
+    if 'count' in query.lower():
+        return {'total_rows': 1, 'rows': [{'count': 0}]}
+    return {'total_rows': 0, 'rows': []}
+
+
+def test_geocode_timings(mocker):
+    # Given
+    query_mock = mocker.patch.object(Service, '_execute_query', side_effect=_execute_query)
+    mocker.patch.object(Service, '_execute_long_running_query')
+    mocker.patch.object(Service, '_schema', return_value='public')
+    mocker.patch.object(geocoding_module, 'to_carto')
+    mocker.patch.object(geocoding_module, 'delete_table')
+    mocker.patch.object(geocoding_module, 'read_carto', return_value=GeoDataFrame(
+        {'address': ['a', 'b']}, geometry=[Point(0, 0), Point(1, 1)]))
+    observer = mocker.Mock()
+    df = DataFrame({'address': ['a', 'b']})
+
+    # When
+    result = Geocoding(credentials=CREDENTIALS, observer=observer).geocode(df, street='address')
+
+    # Then
+    assert result.metadata['required_quota'] == 2
+    assert set(result.metadata['timings']) == {
+        'upload', 'summary', 'quota', 'lock', 'alter', 'geocode', 'download', 'cleanup', 'total'}
+    assert 'rows_per_second' in result.metadata
+    assert 'quota_per_second' in result.metadata
+    assert observer.call_count == 9
+    assert len([c for c in query_mock.call_args_list if 'cdb_service_quota_info' in c[0][0]]) == 1
+
+
+def test_geocode_dry_run_dataframe_is_not_uploaded(mocker):
+    # Given
+    query_mock = mocker.patch.object(Service, '_execute_query', side_effect=_execute_query)
+    to_carto_mock = mocker.patch.object(geocoding_module, 'to_carto')
+    df = DataFrame({'address': ['a', 'b', 'c', None], 'city': ['x', 'y', 'z', 'w']})
+    # md5(concat(address, '<>', 'x', '<>', '', '<>', '')) of the second row
+    df[HASH_COLUMN] = [None, hashlib.md5(b'b<>x<><>').hexdigest(), 'outdated', None]
+    gdf = GeoDataFrame(df, geometry=[None, Point(0, 0), Point(1, 1), None])
+
+    # When
+    result = Geocoding(credentials=CREDENTIALS).geocode(gdf, street='address', city={'value': 'x'}, dry_run=True)
+
+    # Then
+    to_carto_mock.assert_not_called()
+    query_mock.assert_not_called()
+    assert result.data is None
+    assert result.metadata['estimated'] is True
+    assert result.metadata['total_rows'] == 4
+    assert result.metadata['required_quota'] == 3
+    assert result.metadata['previously_geocoded'] == 1
+    assert result.metadata['records_with_geometry'] == 2
+
+
+def test_local_hashes_use_the_postgresql_text_output():
+    # Given: the output of `SELECT concat(...)` in PostgreSQL 12+ for the same values
+    df = DataFrame({
+        'float': [1.5, 1.0, 1e15, 1e14, 1e-05, 1 / 3, float('nan')],
+        'int': [1, -2, 3, 4, 5, 6, 7],
+        'bool': [True, False, True, False, True, False, True],
+        'text': ['a', None, 'c', 'd', 'e', 'f', 'g']
+    })
+    texts = ['1.5<>1<>true<>a', '1<>-2<>false<>', '1e+15<>3<>true<>c', '100000000000000<>4<>false<>d',
+             '1e-05<>5<>true<>e', '0.3333333333333333<>6<>false<>f', '<>7<>true<>g']
+
+    # When
+    hashes = local_hashes(df, 'float', 'int', 'bool', 'text')
+
+    # Then
+    assert hashes == [hashlib.md5(text.encode()).hexdigest() for text in texts]
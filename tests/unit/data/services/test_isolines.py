@@ -0,0 +1,142 @@
+from geopandas import GeoDataFrame
+from shapely.geometry import Point, box
+
+from cartoframes.auth import Credentials
+from cartoframes.data.services import Isolines, IsolinesCache
+from cartoframes.data.services import isolines as isolines_module
+from cartoframes.data.services.service import Service
+
+CREDENTIALS = Credentials('fake_user', 'fake_api_key')
+
+
+def _areas(source_ids, ranges):
+    return GeoDataFrame({
+        'cartodb_id': range(1, len(source_ids) * len(ranges) + 1),
+        'source_id': [s for s in source_ids for _ in ranges],
+        'data_range': [r for _ in source_ids for r in ranges],
+        'the_geom': [box(-r, -r, r, r) for _ in source_ids for r in ranges]
+    }, geometry='the_geom', crs='epsg:4326')
+
+
+def _mock_service(mocker):
+    mocker.patch.object(Service, 'provider', return_value='heremaps')
+    mocker.patch.object(Service, 'available_quota', return_value=1000)
+    mocker.patch.object(isolines_module, 'to_carto')
+    mocker.patch.object(isolines_module, 'delete_table')
+
+
+def test_isolines_cache_get_set(tmp_path):
+    # Given
+    cache = IsolinesCache(path=str(tmp_path / 'cache.sqlite'))
+    origin = cache.origin(Point(1.123456789, 2))
+
+    # When
+    cache.set({origin: {300: box(0, 0, 1, 1)}}, 'params')
+
+    # Then
+    assert origin == '1.12346,2.00000'
+    assert cache.get([origin], 'params') == {origin: {300: box(0, 0, 1, 1)}}
+    assert cache.get([origin], 'other_params') == {}
+
+
+def test_isolines_cache_ttl(tmp_path):
+    # Given
+    cache = IsolinesCache(path=str(tmp_path / 'cache.sqlite'), ttl=-1)
+
+    # When
+    cache.set({'0,0': {300: box(0, 0, 1, 1)}}, 'params')
+
+    # Then
+    assert cache.get(['0,0'], 'params') == {}
+    cache.purge()
+    assert IsolinesCache(path=cache.path).get(['0,0'], 'params') == {}
+
+
+def test_isochrones_cache_sends_only_misses(mocker, tmp_path):
+    # Given
+    _mock_service(mocker)
+    read_mock = mocker.patch.object(isolines_module, 'read_carto', return_value=_areas([1], [300, 600]))
+    cache = IsolinesCache(path=str(tmp_path / 'cache.sqlite'))
+    gdf = GeoDataFrame({'name': ['a', 'b', 'c']}, geometry=[Point(0, 0), Point(1, 1), Point(0, 0)], crs='epsg:4326')
+
+    # When
+    result = Isolines(credentials=CREDENTIALS).isochrones(gdf, [300, 600], cache=cache)
+
+    # Then
+    assert read_mock.call_count == 1
+    assert result.metadata['required_quota'] == 4
+    assert result.metadata['cached_rows'] == 0
+    assert len(result.data) == 4
+    assert list(result.data['source_id']) == [0, 0, 2, 2]
+
+    # When
+    result = Isolines(credentials=CREDENTIALS).isochrones(gdf, [300, 600], cache=cache, dry_run=True)
+
+    # Then
+    assert result.metadata == {'required_quota': 2, 'cached_rows': 2}
+
+
+def test_isochrones_cache_exclusive(mocker, tmp_path):
+    # Given
+    _mock_service(mocker)
+    mocker.patch.object(isolines_module, 'read_carto', return_value=_areas([1], [300, 600]))
+    cache = IsolinesCache(path=str(tmp_path / 'cache.sqlite'))
+    gdf = GeoDataFrame({'name': ['a']}, geometry=[Point(0, 0)], crs='epsg:4326')
+
+    # When
+    result = Isolines(credentials=CREDENTIALS).isochrones(gdf, [300, 600], cache=cache, exclusive=True)
+
+    # Then
+    assert list(result.data['lower_data_range']) == [0, 300]
+    assert list(result.data['range_label']) == ['5 min.', '10 min.']
+    assert result.data.geometry[0].equals(box(-300, -300, 300, 300))
+    assert result.data.geometry[1].area == 1200 ** 2 - 600 ** 2
+
+
+def test_isochrones_local_rings(mocker):
+    # Given
+    _mock_service(mocker)
+    read_mock = mocker.patch.object(isolines_module, 'read_carto', return_value=_areas([1, 2], [600, 300]))
+    gdf = GeoDataFrame({'name': ['a', 'b']}, geometry=[Point(0, 0), Point(1, 1)], crs='epsg:4326')
+
+    # When
+    result = Isolines(credentials=CREDENTIALS).isochrones(gdf, [600, 300], exclusive=True, local_rings=True)
+
+    # Then
+    assert 'ST_DIFFERENCE' not in read_mock.call_args[0][0]
+    assert list(result.data['source_id']) == [1, 1, 2, 2]
+    assert list(result.data['data_range']) == [600, 300, 600, 300]
+    assert list(result.data['lower_data_range']) == [300, 0, 300, 0]
+    assert list(result.data['range_label']) == ['10 min.', '5 min.', '10 min.', '5 min.']
+    assert result.data.geometry[0].area == 1200 ** 2 - 600 ** 2
+    assert result.data.geometry[1].equals(box(-300, -300, 300, 300))
+
+
+def test_isolines_rings():
+    # Given
+    areas = _areas([1], [300, 600])
+
+    # When
+    rings = Isolines(credentials=CREDENTIALS).rings(areas)
+
+    # Then
+    assert list(rings['range_label']) == ['5 min.', '10 min.']
+    assert rings.geometry[1].area == 1200 ** 2 - 600 ** 2
+    assert areas.geometry[1].area == 1200 ** 2
+
+
+def test_isochrones_timings(mocker):
+    # Given
+    _mock_service(mocker)
+    mocker.patch.object(isolines_module, 'read_carto', return_value=_areas([1], [300]))
+    observer = mocker.Mock()
+    gdf = GeoDataFrame({'name': ['a']}, geometry=[Point(0, 0)], crs='epsg:4326')
+
+    # When
+    result = Isolines(credentials=CREDENTIALS, observer=observer).isochrones(gdf, [300])
+
+    # Then
+    assert set(result.metadata['timings']) == {'quota', 'upload', 'isolines', 'cleanup', 'total'}
+    assert 'rows_per_second' in result.metadata
+    assert 'quota_per_second' in result.metadata
+    assert [c[0][0] for c in observer.call_args_list] == ['quota', 'upload', 'isolines', 'cleanup']
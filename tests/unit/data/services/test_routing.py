@@ -0,0 +1,102 @@
+import re
+
+from geopandas import GeoDataFrame
+from shapely.geometry import Point
+
+from cartoframes.auth import Credentials
+from cartoframes.data.services import Routing
+from cartoframes.io.managers.context_manager import ContextManager
+
+CREDENTIALS = Credentials('fake_user', 'fake_api_key')
+
+QUOTA_INFO = {
+    'rows': [
+        {'service': 'routing', 'monthly_quota': 100, 'used_quota': 0, 'soft_limit': False, 'provider': 'heremaps'}
+    ]
+}
+
+
+def _execute_query(query):
+    if 'cdb_service_quota_info' in query:
+        return QUOTA_INFO
+    values = re.findall(r'\((\d+), ([-\d.]+), ([-\d.]+), ([-\d.]+), ([-\d.]+)\)', query)
+    return {
+        'rows': [
+            {'pair_id': int(i), 'duration': int(float(dx) - float(ox)) * 60, 'length': abs(float(dx) - float(ox))}
+            for i, ox, oy, dx, dy in values
+        ]
+    }
+
+
+def _points(xs):
+    return GeoDataFrame({'name': xs}, geometry=[Point(x, 0) for x in xs], crs='epsg:4326')
+
+
+def test_routing_matrix(mocker):
+    # Given
+    query_mock = mocker.patch.object(ContextManager, 'execute_query', side_effect=_execute_query)
+
+    # When
+    result = Routing(credentials=CREDENTIALS).matrix(_points([0, 1, 3]), geometry=False, chunk_size=2)
+
+    # Then
+    assert query_mock.call_count == 4
+    assert result.metadata == {'required_quota': 6}
+    assert list(result.data.columns) == ['origin_id', 'destination_id', 'duration', 'length']
+    assert list(result.data['origin_id']) == [0, 0, 0, 1, 1, 1, 2, 2, 2]
+    assert list(result.data['destination_id']) == [0, 1, 2, 0, 1, 2, 0, 1, 2]
+    assert list(result.data['duration']) == [0, 60, 180, -60, 0, 120, -180, -120, 0]
+
+
+def test_routing_matrix_symmetric(mocker):
+    # Given
+    mocker.patch.object(ContextManager, 'execute_query', side_effect=_execute_query)
+
+    # When
+    result = Routing(credentials=CREDENTIALS).matrix(_points([0, 1, 3]), geometry=False, symmetric=True)
+
+    # Then
+    assert result.metadata == {'required_quota': 3}
+    assert list(result.data['length']) == [0, 1, 3, 1, 0, 2, 3, 2, 0]
+
+
+def test_routing_iter_matrix(mocker):
+    # Given
+    mocker.patch.object(ContextManager, 'execute_query', side_effect=_execute_query)
+
+    # When
+    chunks = list(Routing(credentials=CREDENTIALS).iter_matrix(
+        _points([0, 1]), _points([2, 3, 4]), geometry=False, chunk_size=2))
+
+    # Then
+    assert len(chunks) == 3
+    assert sum(len(chunk) for chunk in chunks) == 6
+
+
+def test_routing_routes_dry_run(mocker):
+    # Given
+    query_mock = mocker.patch.object(ContextManager, 'execute_query', side_effect=_execute_query)
+
+    # When
+    result = Routing(credentials=CREDENTIALS).routes(_points([0, 1]), _points([2, 1]), dry_run=True)
+
+    # Then
+    assert query_mock.call_count == 0
+    assert result.data is None
+    assert result.metadata == {'required_quota': 1}
+
+
+def test_routing_routes_query(mocker):
+    # Given
+    query_mock = mocker.patch.object(ContextManager, 'execute_query', side_effect=_execute_query)
+
+    # When
+    Routing(credentials=CREDENTIALS).routes(_points([0]), _points([2]), geometry=True)
+
+    # Then
+    queries = [call[0][0] for call in query_mock.call_args_list if 'cdb_route_point_to_point' in call[0][0]]
+    assert len(queries) == 1
+    query = queries[0]
+    assert '(_route).shape AS the_geom' in query
+    assert '(_route).the_geom' not in query
+    assert '(0, 0.0, 0.0, 2.0, 0.0)' in query
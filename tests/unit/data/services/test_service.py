@@ -0,0 +1,70 @@
+from geopandas import GeoDataFrame
+from shapely.geometry import Point
+
+from cartoframes.auth import Credentials
+from cartoframes.data.services import Isolines, preflight
+from cartoframes.data.services.service import Service
+
+CREDENTIALS = Credentials('fake_user', 'fake_api_key')
+
+QUOTA_INFO = {
+    'rows': [
+        {'service': 'isolines', 'monthly_quota': 100, 'used_quota': 10, 'soft_limit': False, 'provider': 'heremaps'},
+        {'service': 'hires_geocoder', 'monthly_quota': 0, 'used_quota': 0, 'soft_limit': False, 'provider': 'google'}
+    ]
+}
+
+
+def test_service_quota_info_snapshot(mocker):
+    # Given
+    query_mock = mocker.patch.object(Service, '_execute_query', return_value=QUOTA_INFO)
+    service = Isolines(credentials=CREDENTIALS)
+
+    # When
+    provider = service.provider()
+    available_quota = service.available_quota()
+    used_quota = service.used_quota()
+
+    # Then
+    assert (provider, available_quota, used_quota) == ('heremaps', 90, 10)
+    query_mock.assert_called_once_with('SELECT * FROM cdb_service_quota_info()')
+
+    # When
+    service._reset_quota_info()
+    service.provider()
+
+    # Then
+    assert query_mock.call_count == 2
+
+
+def test_service_quota_info_snapshot_is_not_shared_by_services(mocker):
+    # Given
+    query_mock = mocker.patch.object(Service, '_execute_query', return_value=QUOTA_INFO)
+    service = Isolines(credentials=CREDENTIALS)
+
+    # When
+    service.available_quota()
+    service.available_quota()
+    Isolines(credentials=CREDENTIALS).available_quota()
+
+    # Then
+    assert query_mock.call_count == 2
+
+
+def test_preflight(mocker):
+    # Given
+    query_mock = mocker.patch.object(Service, '_execute_query', return_value=QUOTA_INFO)
+    gdf = GeoDataFrame({'name': ['a', 'b']}, geometry=[Point(0, 0), Point(1, 1)], crs='epsg:4326')
+
+    # When
+    df = preflight([
+        ('isochrones', {'source': gdf, 'ranges': [300, 600]}),
+        ('isodistances', {'source': gdf, 'ranges': [1000] * 50}),
+    ], CREDENTIALS)
+
+    # Then
+    query_mock.assert_called_once_with('SELECT * FROM cdb_service_quota_info()')
+    assert list(df['required_quota']) == [4, 100]
+    assert list(df['cumulative_quota']) == [4, 104]
+    assert list(df['available_quota']) == [90, 90]
+    assert list(df['fits']) == [True, False]
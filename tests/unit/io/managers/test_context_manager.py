@@ -4,7 +4,7 @@ import pytest
 
 from carto.datasets import DatasetManager
 from carto.sql import SQLClient, BatchSQLClient, CopySQLClient
-from carto.exceptions import CartoRateLimitException
+from carto.exceptions import CartoException, CartoRateLimitException
 
 from pandas import DataFrame
 from geopandas import GeoDataFrame
@@ -94,12 +94,12 @@ class TestContextManager(object):
                                 'Please choose a different `table_name` or use '
                                 'if_exists="replace" to overwrite it.')
 
-    def test_copy_from_exists_replace_truncate_and_drop_add_columns(self, mocker):
+    def test_copy_from_exists_replace_truncate_and_alter_columns(self, mocker):
         # Given
         mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
         mocker.patch.object(ContextManager, 'has_table', return_value=True)
         mocker.patch.object(ContextManager, 'get_schema', return_value='schema')
-        mock = mocker.patch.object(ContextManager, '_truncate_and_drop_add_columns')
+        mock = mocker.patch.object(ContextManager, '_truncate_and_alter_columns')
         df = DataFrame({'A': [1]})
         columns = [ColumnInfo('A', 'a', 'bigint', False)]
 
@@ -126,6 +126,139 @@ class TestContextManager(object):
         # Then
         mock.assert_called_once_with('table_name', 'schema')
 
+    def test_copy_from_shadow(self, mocker):
+        # Given
+        mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
+        mocker.patch('cartoframes.io.managers.context_manager.create_tmp_name', return_value='table_name_shadow')
+        mocker.patch.object(ContextManager, 'get_schema', return_value='schema')
+        mock_query = mocker.patch.object(ContextManager, 'execute_query')
+        mock_batch = mocker.patch.object(ContextManager, 'execute_long_running_query')
+        mock = mocker.patch.object(ContextManager, '_copy_from')
+        chunks = [DataFrame({'A': [1]}), DataFrame({'A': [2]})]
+        columns = [ColumnInfo('A', 'a', 'bigint', False)]
+
+        # When
+        cm = ContextManager(self.credentials)
+        result = cm.copy_from_shadow(chunks, 'TABLE NAME')
+
+        # Then
+        assert result == 'table_name'
+        assert mock.call_count == 2
+        mock.assert_called_with(chunks[1], 'table_name_shadow', columns, DEFAULT_RETRY_TIMES)
+        mock_batch.assert_called_once_with("SELECT CDB_CartodbfyTable('schema', 'table_name_shadow')")
+        assert [c[0][0] for c in mock_query.call_args_list] == [
+            'BEGIN; CREATE TABLE table_name_shadow ("a" bigint); COMMIT;',
+            'BEGIN; DROP TABLE IF EXISTS table_name; ALTER TABLE table_name_shadow RENAME TO table_name; COMMIT;'
+        ]
+
+    def test_copy_from_shadow_error(self, mocker):
+        # Given
+        mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
+        mocker.patch('cartoframes.io.managers.context_manager.create_tmp_name', return_value='table_name_shadow')
+        mocker.patch.object(ContextManager, 'get_schema', return_value='schema')
+        mocker.patch.object(ContextManager, 'execute_query')
+        mocker.patch.object(ContextManager, '_copy_from', side_effect=CartoException('error'))
+        mock_swap = mocker.patch.object(ContextManager, '_swap_table')
+        mock_delete = mocker.patch.object(ContextManager, 'delete_table')
+
+        # When
+        cm = ContextManager(self.credentials)
+        with pytest.raises(CartoException):
+            cm.copy_from_shadow([DataFrame({'A': [1]})], 'TABLE NAME', cartodbfy=False)
+
+        # Then
+        mock_swap.assert_not_called()
+        mock_delete.assert_called_once_with('table_name_shadow')
+
+    def test_truncate_and_alter_columns(self, mocker):
+        # Given
+        mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
+        mocker.patch.object(ContextManager, '_check_regenerate_table_exists', return_value=False)
+        mock = mocker.patch.object(ContextManager, 'execute_long_running_query')
+        df_columns = [
+            ColumnInfo('the_geom', 'the_geom', 'geometry(Geometry, 4326)', True),
+            ColumnInfo('A', 'a', 'bigint', False),
+            ColumnInfo('B', 'b', 'text', False),
+            ColumnInfo('C', 'c', 'text', False),
+            ColumnInfo('D', 'd', 'text', False),
+            ColumnInfo('E', 'e', 'boolean', False)
+        ]
+        table_columns = [
+            ColumnInfo('cartodb_id', 'cartodb_id', 'bigint', False),
+            ColumnInfo('the_geom', 'the_geom', 'text', False),
+            ColumnInfo('a', 'a', 'bigint', False),
+            ColumnInfo('b', 'b', 'text', False),
+            ColumnInfo('c', 'c', 'text', False),
+            ColumnInfo('d', 'd', 'double precision', False),
+            ColumnInfo('f', 'f', 'text', False)
+        ]
+
+        # When
+        cm = ContextManager(self.credentials)
+        cm._truncate_and_alter_columns('table_name', 'schema', df_columns, table_columns)
+
+        # Then
+        mock.assert_called_once_with(
+            'BEGIN; TRUNCATE TABLE table_name; '
+            'ALTER TABLE table_name DROP COLUMN "f",ADD COLUMN "e" boolean,'
+            'ALTER COLUMN "d" TYPE text USING NULL::text; COMMIT;')
+
+    def test_truncate_and_alter_columns_regenerate(self, mocker):
+        # Given
+        mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
+        mocker.patch.object(ContextManager, '_check_regenerate_table_exists', return_value=True)
+        mock = mocker.patch.object(ContextManager, 'execute_long_running_query')
+        df_columns = [ColumnInfo('A', 'a', 'bigint', False), ColumnInfo('B', 'b', 'text', False),
+                      ColumnInfo('C', 'c', 'text', False)]
+        table_columns = df_columns + [ColumnInfo('d', 'd', 'text', False)]
+
+        # When
+        cm = ContextManager(self.credentials)
+        cm._truncate_and_alter_columns('table_name', 'schema', df_columns, table_columns)
+
+        # Then
+        mock.assert_called_once_with(
+            'BEGIN; TRUNCATE TABLE table_name; ALTER TABLE table_name DROP COLUMN "d"; COMMIT; '
+            'SELECT CDB_RegenerateTable(\'schema.table_name\'::regclass);')
+
+    def test_truncate_and_alter_columns_sql_api(self, mocker):
+        # Given
+        mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
+        mocker.patch.object(ContextManager, '_check_regenerate_table_exists', return_value=False)
+        mock_batch = mocker.patch.object(ContextManager, 'execute_long_running_query')
+        mock = mocker.patch.object(ContextManager, 'execute_query')
+        df_columns = [ColumnInfo(str(i), 'column_{}'.format(i), 'text', False) for i in range(1000)]
+        table_columns = [ColumnInfo('a', 'a', 'bigint', False)]
+
+        # When
+        cm = ContextManager(self.credentials)
+        cm._truncate_and_alter_columns('table_name', 'schema', df_columns, table_columns)
+
+        # Then
+        mock_batch.assert_not_called()
+        query = mock.call_args[0][0]
+        assert query.startswith('BEGIN; TRUNCATE TABLE table_name; ALTER TABLE table_name DROP COLUMN "a",')
+        assert query.endswith('ADD COLUMN "column_999" text; COMMIT;')
+
+    def test_truncate_and_alter_columns_no_changes(self, mocker):
+        # Given
+        mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
+        mock_truncate = mocker.patch.object(ContextManager, '_truncate_table')
+        mock = mocker.patch.object(ContextManager, 'execute_long_running_query')
+        df_columns = [ColumnInfo('CARTODB_ID', 'cartodb_id', 'bigint', False),
+                      ColumnInfo('geom', 'geom', 'text', True)]
+        table_columns = [ColumnInfo('geom', 'geom', 'text', False)]
+
+        # When
+        cm = ContextManager(self.credentials)
+        equal = cm._compare_columns(df_columns, table_columns)
+        cm._truncate_and_alter_columns('table_name', 'schema', df_columns, table_columns)
+
+        # Then
+        assert equal is True
+        mock.assert_not_called()
+        mock_truncate.assert_called_once_with('table_name', 'schema')
+
     def test_internal_copy_from(self, mocker):
         # Given
         from shapely.geometry import Point
@@ -290,7 +423,7 @@ class TestContextManager(object):
         cm.create_table_from_query('SELECT * FROM table_name', '__new_table_name__', if_exists='fail', cartodbfy=True)
 
         # Then
-        mock.assert_called_with("SELECT CDB_CartodbfyTable('schema', '__new_table_name__')")
+        mock.assert_called_with("SELECT CDB_CartodbfyTable('schema', '__new_table_name__')", None, ['cartodbfy'])
 
     def test_create_table_from_query_cartodbfy_default(self, mocker):
         # Given
@@ -303,4 +436,86 @@ class TestContextManager(object):
         cm.create_table_from_query('SELECT * FROM table_name', '__new_table_name__', if_exists='fail')
 
         # Then
-        mock.assert_called_with("SELECT CDB_CartodbfyTable('schema', '__new_table_name__')")
+        mock.assert_called_with("SELECT CDB_CartodbfyTable('schema', '__new_table_name__')", None, ['cartodbfy'])
+
+    def test_create_table_from_query_inline_cartodbfy(self, mocker):
+        # Given
+        mocker.patch.object(ContextManager, 'has_table', return_value=False)
+        mocker.patch.object(ContextManager, 'get_schema', return_value='schema')
+        mocker.patch.object(ContextManager, '_get_query_columns_info', return_value=[
+            ColumnInfo('cartodb_id', 'cartodb_id', 'bigint', False),
+            ColumnInfo('the_geom', 'the_geom', 'text', False),
+            ColumnInfo('the_geom_webmercator', 'the_geom_webmercator', 'text', False),
+            ColumnInfo('name', 'name', 'text', False)
+        ])
+        mock = mocker.patch.object(ContextManager, 'execute_long_running_query')
+        observer = mocker.Mock()
+
+        # When
+        cm = ContextManager(self.credentials)
+        cm.create_table_from_query('SELECT * FROM table_name', '__new_table_name__', if_exists='fail',
+                                   inline_cartodbfy=True, observer=observer)
+
+        # Then
+        mock.assert_called_once_with([
+            'BEGIN; DROP TABLE IF EXISTS __new_table_name__; CREATE TABLE __new_table_name__ AS ('
+            'SELECT _q."cartodb_id" AS cartodb_id, _q."the_geom"::geometry(Geometry, 4326) AS the_geom, '
+            'CDB_TransformToWebmercator(_q."the_geom"::geometry(Geometry, 4326))::geometry(Geometry, 3857) '
+            'AS the_geom_webmercator, _q."name" FROM (SELECT * FROM table_name) _q); COMMIT;',
+            "SELECT CDB_CartodbfyTable('schema', '__new_table_name__')"
+        ], observer, ['create', 'cartodbfy'])
+
+    def test_create_table_from_query_inline_cartodbfy_no_geom(self, mocker):
+        # Given
+        mocker.patch.object(ContextManager, 'has_table', return_value=False)
+        mocker.patch.object(ContextManager, 'get_schema', return_value='schema')
+        mocker.patch.object(ContextManager, '_get_query_columns_info', return_value=[
+            ColumnInfo('name', 'name', 'text', False)
+        ])
+        mock = mocker.patch.object(ContextManager, 'execute_long_running_query')
+
+        # When
+        cm = ContextManager(self.credentials)
+        cm.create_table_from_query('SELECT * FROM table_name', '__new_table_name__', if_exists='fail',
+                                   inline_cartodbfy=True)
+
+        # Then
+        assert 'SELECT row_number() OVER () AS cartodb_id, ' in mock.call_args[0][0][0]
+        assert 'NULL::geometry(Geometry, 4326) AS the_geom' in mock.call_args[0][0][0]
+
+    def test_execute_long_running_query_observer(self, mocker):
+        # Given
+        mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
+        mocker.patch('cartoframes.io.managers.context_manager.time.sleep')
+        mocker.patch.object(BatchSQLClient, 'create', return_value={
+            'job_id': 'job', 'status': 'pending', 'query': [{'status': 'pending'}, {'status': 'pending'}]})
+        mocker.patch.object(BatchSQLClient, 'read', side_effect=[
+            {'job_id': 'job', 'status': 'running', 'query': [{'status': 'done'}, {'status': 'running'}]},
+            {'job_id': 'job', 'status': 'done', 'query': [{'status': 'done'}, {'status': 'done'}]}
+        ])
+        observer = mocker.Mock()
+
+        # When
+        cm = ContextManager(self.credentials)
+        job = cm.execute_long_running_query([' query1 ', 'query2'], observer, ['create', 'cartodbfy'])
+
+        # Then
+        BatchSQLClient.create.assert_called_once_with(['query1', 'query2'])
+        assert job['status'] == 'done'
+        assert [c[0][0] for c in observer.call_args_list] == ['create', 'cartodbfy']
+
+    def test_execute_long_running_query_observer_failed(self, mocker):
+        # Given
+        mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
+        mocker.patch('cartoframes.io.managers.context_manager.time.sleep')
+        mocker.patch.object(BatchSQLClient, 'create', return_value={'job_id': 'job', 'status': 'running'})
+        mocker.patch.object(BatchSQLClient, 'read', return_value={'job_id': 'job', 'status': 'failed'})
+        observer = mocker.Mock()
+
+        # When
+        cm = ContextManager(self.credentials)
+        with pytest.raises(CartoException):
+            cm.execute_long_running_query('query', observer)
+
+        # Then
+        observer.assert_not_called()
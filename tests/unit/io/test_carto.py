@@ -11,6 +11,7 @@ from carto.exceptions import CartoException
 from cartoframes.auth import Credentials
 from cartoframes.io.managers.context_manager import ContextManager
 from cartoframes.io.carto import read_carto, to_carto, copy_table, create_table_from_query
+from cartoframes.utils.columns import ColumnInfo
 
 
 CREDENTIALS = Credentials('fake_user', 'fake_api_key')
@@ -439,6 +440,22 @@ def test_to_carto_if_exists_replace(mocker):
     assert cm_mock.call_args[0][2] == 'replace'
 
 
+def test_to_carto_if_exists_replace_atomic(mocker):
+    # Given
+    cm_mock = mocker.patch.object(ContextManager, 'copy_from')
+    cm_shadow_mock = mocker.patch.object(ContextManager, 'copy_from_shadow')
+    df = GeoDataFrame({'geometry': [Point([0, 0])]})
+
+    # When
+    to_carto(df, '__table_name__', CREDENTIALS, if_exists='replace', atomic=True, skip_quota_warning=True)
+
+    # Then
+    cm_mock.assert_not_called()
+    assert len(cm_shadow_mock.call_args[0][0]) == 1
+    assert cm_shadow_mock.call_args[0][1] == '__table_name__'
+    assert cm_shadow_mock.call_args[0][2] is True
+
+
 def test_to_carto_no_cartodbfy(mocker):
     # Given
     cm_mock = mocker.patch.object(ContextManager, 'copy_from')
@@ -533,6 +550,41 @@ def test_copy_table_cartodbfy_default(mocker):
     assert cm_mock.call_args[0][3] is True
 
 
+def test_copy_table_inline_cartodbfy(mocker):
+    # Given
+    cm_mock = mocker.patch.object(ContextManager, 'create_table_from_query')
+    observer = mocker.Mock()
+
+    # When
+    copy_table('__table_name__', '__new_table_name__', CREDENTIALS, inline_cartodbfy=True, observer=observer)
+
+    # Then
+    assert cm_mock.call_args[0][0] == 'SELECT * FROM __table_name__'
+    assert cm_mock.call_args[0][4] is True
+    assert cm_mock.call_args[0][5] is observer
+
+
+def test_copy_table_inline_cartodbfy_keeps_cartodb_id(mocker):
+    # Given
+    mocker.patch.object(ContextManager, 'has_table', return_value=False)
+    mocker.patch.object(ContextManager, 'get_schema', return_value='schema')
+    mocker.patch.object(ContextManager, '_get_query_columns_info', return_value=[
+        ColumnInfo('cartodb_id', 'cartodb_id', 'bigint', False),
+        ColumnInfo('the_geom', 'the_geom', 'geometry', True),
+        ColumnInfo('name', 'name', 'text', False)
+    ])
+    mock = mocker.patch.object(ContextManager, 'execute_long_running_query')
+
+    # When
+    copy_table('__table_name__', '__new_table_name__', CREDENTIALS, inline_cartodbfy=True)
+
+    # Then
+    create_query = mock.call_args[0][0][0]
+    assert 'SELECT _q."cartodb_id" AS cartodb_id, ' in create_query
+    assert 'row_number()' not in create_query
+    assert 'FROM (SELECT * FROM __table_name__) _q' in create_query
+
+
 def test_create_table_from_query_wrong_query(mocker):
     # When
     with pytest.raises(ValueError) as e:
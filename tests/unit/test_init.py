@@ -0,0 +1,31 @@
+import sys
+import pytest
+import subprocess
+
+import cartoframes
+
+
+def test_import_is_lazy():
+    # When
+    code = 'import sys, cartoframes; print(any(m in sys.modules for m in ["pandas", "geopandas", "carto"]))'
+    output = subprocess.check_output([sys.executable, '-c', code])
+
+    # Then
+    assert output.strip() == b'False'
+
+
+def test_lazy_attributes():
+    # When
+    from cartoframes import read_carto
+    from cartoframes.io.carto import read_carto as io_read_carto
+
+    # Then
+    assert read_carto is io_read_carto
+    assert cartoframes.viz.__name__ == 'cartoframes.viz'
+    assert 'to_carto' in dir(cartoframes)
+
+
+def test_wrong_attribute():
+    # When / Then
+    with pytest.raises(AttributeError):
+        cartoframes.wrong_attribute
@@ -6,8 +6,8 @@ from pandas import DataFrame
 from geopandas import GeoDataFrame
 
 from cartoframes.utils.geom_utils import set_geometry
-from cartoframes.utils.columns import ColumnInfo, get_dataframe_columns_info, normalize_names, \
-                                      obtain_converters, _convert_int, _convert_float, \
+from cartoframes.utils.columns import ColumnInfo, get_dataframe_columns_info, normalize_name, \
+                                      normalize_names, obtain_converters, _convert_int, _convert_float, \
                                       _convert_bool, _convert_generic
 
 
@@ -62,6 +62,23 @@ class TestColumns(object):
     def test_normalize_names_unchanged(self):
         assert normalize_names(self.cols_ans) == self.cols_ans
 
+    def test_normalize_names_repeated_collisions(self):
+        cols = ['a', 'a', 'a_1', 'a', 'A', 'a_1_2']
+        assert normalize_names(cols) == ['a', 'a_1', 'a_1_1', 'a_1_2', 'a_1_2_3', 'a_1_2_1']
+
+    def test_normalize_names_wide(self):
+        cols = ['Column {}'.format(i % 5000) for i in range(10000)]
+
+        result = normalize_names(cols)
+
+        assert len(set(result)) == 10000
+        assert result[:2] == ['column_0', 'column_1']
+        assert result[5000:5002] == ['column_0_1', 'column_1_1']
+
+    def test_normalize_name(self):
+        assert normalize_name('Field: 2') == 'field_2'
+        assert normalize_name(None) is None
+
     def test_column_info_with_geom(self):
         gdf = GeoDataFrame(
             [['Gran Vía 46', 'Madrid', 'POINT (0 0)'], ['Ebro 1', 'Sevilla', 'POINT (1 1)']],
@@ -0,0 +1,112 @@
+import time
+import threading
+
+from cartoframes.utils import metrics
+from cartoframes.utils.metrics import MetricsEmitter, send_metrics
+from cartoframes.utils.utils import get_function_args, get_parameter_from_decorator
+
+
+def test_send_metrics_does_not_post(mocker):
+    # Given
+    mocker.patch.object(metrics, 'get_metrics_enabled', return_value=True)
+    emit = mocker.patch.object(metrics._metrics_emitter, 'emit')
+    post = mocker.patch('requests.Session.post')
+
+    @send_metrics('data_downloaded')
+    def read(source, credentials=None):
+        return source
+
+    # When
+    result = read('table')
+
+    # Then
+    assert result == 'table'
+    emit.assert_called_once()
+    assert emit.call_args[0][1]['event_name'] == 'data_downloaded'
+    post.assert_not_called()
+
+
+def test_emitter_sends_in_background(mocker):
+    # Given
+    post = mocker.patch('requests.Session.post')
+    emitter = MetricsEmitter(flush_interval=0.01)
+
+    # When
+    emitter.emit('https://metrics', {'event_name': 'a'})
+    emitter.emit('https://metrics', {'event_name': 'b'})
+    for _ in range(100):
+        if post.call_count == 2:
+            break
+        time.sleep(0.01)
+
+    # Then
+    assert [call[1]['json'] for call in post.call_args_list] == [{'event_name': 'a'}, {'event_name': 'b'}]
+
+
+def test_emitter_drops_events_when_full(mocker):
+    # Given
+    mocker.patch.object(MetricsEmitter, '_start')
+    post = mocker.patch('requests.Session.post')
+    emitter = MetricsEmitter(queue_size=2)
+
+    # When
+    for event_name in ['a', 'b', 'c']:
+        emitter.emit('https://metrics', {'event_name': event_name})
+    emitter.flush(timeout=1)
+
+    # Then
+    assert [call[1]['json'] for call in post.call_args_list] == [{'event_name': 'a'}, {'event_name': 'b'}]
+
+
+def test_emitter_flush_drains_the_background_thread(mocker):
+    # Given
+    threads = []
+
+    def post(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        time.sleep(0.02)
+
+    post_mock = mocker.patch('requests.Session.post', side_effect=post)
+    emitter = MetricsEmitter(batch_size=1, flush_interval=10)
+
+    # When
+    for event_name in ['a', 'b', 'c']:
+        emitter.emit('https://metrics', {'event_name': event_name})
+    emitter.flush(timeout=2)
+
+    # Then
+    assert [call[1]['json']['event_name'] for call in post_mock.call_args_list] == ['a', 'b', 'c']
+    assert threads == ['cartoframes-metrics'] * 3
+    assert not emitter._thread.is_alive()
+
+
+def test_emitter_flush_waits_for_the_worker_to_wake_up(mocker):
+    # Given
+    post = mocker.patch('requests.Session.post')
+    emitter = MetricsEmitter(flush_interval=10)
+    emitter.emit('https://metrics', {'event_name': 'a'})
+    time.sleep(0.05)
+
+    # When
+    start = time.time()
+    emitter.flush(timeout=2)
+
+    # Then
+    assert time.time() - start < 1
+    assert [call[1]['json'] for call in post.call_args_list] == [{'event_name': 'a'}]
+
+
+def test_get_parameter_from_decorator():
+    # Given
+    def func(source, credentials=None):
+        pass
+
+    # When
+    positional = get_parameter_from_decorator('credentials', func, 'table', 'creds')
+    keyword = get_parameter_from_decorator('credentials', func, 'table', credentials='creds')
+    missing = get_parameter_from_decorator('credentials', func, 'table')
+
+    # Then
+    assert positional == keyword == 'creds'
+    assert missing is None
+    assert get_function_args.cache_info().hits >= 1